@@ -0,0 +1,206 @@
+"""
+六兵棋批量模拟 Hexapawn NumPy lockstep batch simulator
+
+一批对局同步推进：每局棋盘是int8数组的一行（0=空，1=玩家，2=电脑），
+每一步对所有未结束的对局同时按合法走法掩码随机选棋，到达末线用棋盘与末线向量的乘积判定，
+走到末线、对方无棋可走和电脑认输的规则与HexapawnController.check_result一致。
+电脑方可以随机走棋，也可以按AI库走棋：AI库展开成以规范局势编码为下标的走法掩码表（与hpstore的掩码相同）。
+本模块需要numpy（已列入requirements.txt），游戏窗口本身不导入它。
+"""
+import argparse
+import time
+
+import numpy as np
+
+import hpengine
+import hpstore
+
+INIT_BOARD = np.array([2, 2, 2, 0, 0, 0, 1, 1, 1], dtype=np.int8)
+GOAL_ROWS = {
+    1: np.array([hpengine.TOP_ROW >> i & 1 for i in range(9)], dtype=np.int8),
+    2: np.array([hpengine.BOTTOM_ROW >> i & 1 for i in range(9)], dtype=np.int8)
+}
+POWERS = np.array([3 ** (8 - i) for i in range(9)], dtype=np.int32)  # 各格在局势编码中的权重
+SYMMETRY_INDEX = np.array(hpengine.SYMMETRIES, dtype=np.intp)
+MOVE_BITS = np.arange(9 * 3, dtype=np.uint32)
+MOVE_STARTS = MOVE_BITS.astype(np.intp) // 3  # 掩码第b位对应走法的起点格下标
+MOVE_ENDS = MOVE_STARTS + hpstore.BOARD_WIDTH - 1 + MOVE_BITS.astype(np.intp) % 3  # 掩码第b位对应走法的终点格下标
+TABLE_SIZE = 3 ** 9
+
+
+def _candidate_moves(side):
+    """
+    走棋方所有可能的走法（不考虑棋盘上的棋子）
+    :return: (起点格下标数组, 终点格下标数组, 是否斜吃数组)
+    """
+    starts, ends, captures = [], [], []
+    for i in range(9):
+        for table, capture in ((hpengine.PUSH_TABLES[side], False), (hpengine.CAPTURE_TABLES[side], True)):
+            for j in range(9):
+                if table[i] >> j & 1:
+                    starts.append(i)
+                    ends.append(j)
+                    captures.append(capture)
+    return np.array(starts, dtype=np.intp), np.array(ends, dtype=np.intp), np.array(captures, dtype=bool)
+
+
+CANDIDATES = {1: _candidate_moves(1), 2: _candidate_moves(2)}
+
+
+def policy_table(ai_dict):
+    """
+    把AI库字典展开成走法掩码表，下标为规范局势编码，0表示无此局势（电脑认输）
+    """
+    table = np.zeros(TABLE_SIZE, dtype=np.uint32)
+    for board_key, solutions in ai_dict.items():
+        table[hpstore.encode_key(board_key)] = hpstore.encode_moves(solutions)
+    return table
+
+
+def _pick(legal, rng):
+    """
+    每行在合法走法中等概率随机选一个
+    :param legal: 每行的合法走法布尔矩阵，每行至少有一个合法走法
+    :return: 每行选中的列号
+    """
+    scores = rng.random(legal.shape)
+    scores[~legal] = -1.0
+    return scores.argmax(axis=1)
+
+
+def _legal(boards, side):
+    """
+    每行棋盘中走棋方各候选走法是否合法
+    """
+    starts, ends, captures = CANDIDATES[side]
+    targets = boards[:, ends]
+    return (boards[:, starts] == side) & np.where(captures, targets == 3 - side, targets == 0)
+
+
+def _check(boards, last_char):
+    """
+    判定结果，规则同HexapawnController.check_result
+    :return: 每行结果 2=电脑赢，1=玩家赢，0=继续走
+    """
+    results = np.zeros(len(boards), dtype=np.int8)
+    player_goal = (boards == 1).astype(np.int8) @ GOAL_ROWS[1] > 0
+    computer_goal = (boards == 2).astype(np.int8) @ GOAL_ROWS[2] > 0
+    blocked = ~_legal(boards, 3 - last_char).any(axis=1)  # 对方已无棋可走
+    results[blocked] = last_char
+    results[computer_goal] = 2
+    results[player_goal] = 1
+    return results
+
+
+def play_games(count, rng, table=None):
+    """
+    同步下完一批对局，玩家方随机走棋先走
+    :param count: 对局数
+    :param rng: numpy随机数生成器
+    :param table: 电脑方的走法掩码表，None表示电脑方也随机走棋
+    :return: (结果数组 2=电脑赢 1=玩家赢, 电脑最后一步的规范局势编码（-1表示未走过）, 电脑最后一步的走法掩码位号,
+              电脑是否认输的布尔数组（认输的结果也为1）)
+    """
+    boards = np.tile(INIT_BOARD, (count, 1))
+    results = np.zeros(count, dtype=np.int8)
+    last_keys = np.full(count, -1, dtype=np.int32)
+    last_moves = np.zeros(count, dtype=np.int8)
+    resigned = np.zeros(count, dtype=bool)
+    side = 1
+    while True:
+        active = np.flatnonzero(results == 0)
+        if active.size == 0:
+            break
+        sub = boards[active]
+        if side == 2 and table is not None:
+            codes = sub[:, SYMMETRY_INDEX].astype(np.int32) @ POWERS  # 每种对称变换下的局势编码
+            symmetry = codes.argmin(axis=1)
+            canon = codes[np.arange(active.size), symmetry]
+            masks = table[canon]
+            resign = masks == 0
+            results[active[resign]] = 1  # 如果无棋可走自动判电脑认输
+            resigned[active[resign]] = True
+            active, sub, symmetry, canon, masks = (
+                active[~resign], sub[~resign], symmetry[~resign], canon[~resign], masks[~resign])
+            moves = _pick((masks[:, None] >> MOVE_BITS & 1).astype(bool), rng)
+            starts = SYMMETRY_INDEX[symmetry, MOVE_STARTS[moves]]
+            ends = SYMMETRY_INDEX[symmetry, MOVE_ENDS[moves]]
+            last_keys[active] = canon
+            last_moves[active] = moves
+        else:
+            picks = _pick(_legal(sub, side), rng)
+            starts, ends = CANDIDATES[side][0][picks], CANDIDATES[side][1][picks]
+        rows = np.arange(active.size)
+        sub[rows, starts] = 0
+        sub[rows, ends] = side
+        boards[active] = sub
+        results[active] = _check(sub, side)
+        side = 3 - side
+    return results, last_keys, last_moves, resigned
+
+
+def train(games, batch=10000, seed=None, ai_file_name="hp_ai_file.txt"):
+    """
+    批量训练电脑AI：每批结束后把输棋局的最后一步按remove_wrong_solution规则剪除，结束时写一次AI文件
+    :return: 训练报告字典
+    """
+    rng = np.random.default_rng(seed)
+    controller = hpengine.HexapawnController(ai_file_name)
+    controller.init_ai()
+    ai = hpengine.HexapawnAI.shared(ai_file_name)
+    table = policy_table(ai.snapshot())
+    counts = {1: 0, 2: 0}
+    resignations = 0
+    last_loss = 0
+    played = 0
+    start_time = time.perf_counter()
+    while played < games:
+        size = min(batch, games - played)
+        results, last_keys, last_moves, resigned = play_games(size, rng, table)
+        for result in counts:
+            counts[result] += int((results == result).sum())
+        resignations += int(resigned.sum())
+        losses = np.flatnonzero((results == 1) & ~resigned)  # 认输不算输棋：收敛后的AI在必败局势中一直认输
+        if losses.size > 0:
+            last_loss = played + int(losses[-1]) + 1
+        lost = (results == 1) & (last_keys >= 0)
+        for key_code, move in sorted(set(zip(last_keys[lost].tolist(), last_moves[lost].tolist()))):
+            ai.remove_wrong_solution(hpstore.decode_key(key_code), int(MOVE_STARTS[move]) + 1, int(MOVE_ENDS[move]) + 1)
+            table[key_code] = int(table[key_code]) & ~(1 << move)
+        played += size
+    elapsed = time.perf_counter() - start_time
+    controller.update_ai()
+    return {
+        "games": games,
+        "wins": counts[2],
+        "losses": counts[1] - resignations,
+        "resignations": resignations,
+        "seconds": elapsed,
+        "games_per_second": games / elapsed if elapsed > 0 else 0.0,
+        "last_loss": last_loss
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="六兵棋批量模拟")
+    parser.add_argument("--games", type=int, default=1000000)
+    parser.add_argument("--batch", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--ai-file", default="hp_ai_file.txt")
+    parser.add_argument("--train", action="store_true", help="电脑方按AI库走棋并剪枝，否则双方随机走棋")
+    args = parser.parse_args()
+    if args.train:
+        report = train(args.games, args.batch, args.seed, args.ai_file)
+        print("对局%d：电脑赢%d，输%d，认输%d，最后一次输棋在第%d局" % (
+            report["games"], report["wins"], report["losses"], report["resignations"], report["last_loss"]))
+        print("用时%.2f秒，每秒%.0f局" % (report["seconds"], report["games_per_second"]))
+    else:
+        start = time.perf_counter()
+        generator = np.random.default_rng(args.seed)
+        total = np.zeros(2, dtype=np.int64)
+        for offset in range(0, args.games, args.batch):
+            outcome = play_games(min(args.batch, args.games - offset), generator)[0]
+            total += [(outcome == 1).sum(), (outcome == 2).sum()]
+        seconds = time.perf_counter() - start
+        print("对局%d：先手赢%d，后手赢%d" % (args.games, total[0], total[1]))
+        print("用时%.2f秒，每秒%.0f局" % (seconds, args.games / seconds))
@@ -1,29 +1,342 @@
 """
 六兵棋 Hexapawn
 """
+import os
 import random
 import sys
 
+import hpstore
+
+MIN_BOARD_SIZE = 3
+MAX_BOARD_SIZE = 8
+CELL_CHARS = "012"  # 格子对应的局势编码字符，下标为 玩家位 | 电脑位 << 1
+
+
+class HexapawnRules:
+    """
+    N×M六兵棋规则：宽width列、高height行（3到8）的棋盘，各格从左上角起按行编号，
+    玩家棋子从最下一行向上走，电脑棋子从最上一行向下走
+    位棋盘：玩家和电脑各用一个整数，第i位表示第i格有子，直走和斜吃都用移位计算
+    局势编码字串：各格数字（0=空，1=玩家，2=电脑）依次组成的宽×高位字串
+    """
+
+    def __init__(self, width=3, height=3):
+        if not MIN_BOARD_SIZE <= width <= MAX_BOARD_SIZE or not MIN_BOARD_SIZE <= height <= MAX_BOARD_SIZE:
+            raise ValueError("棋盘宽和高须在%d到%d之间" % (MIN_BOARD_SIZE, MAX_BOARD_SIZE))
+        self.__width = width
+        self.__height = height
+        self.__size = width * height
+        self.__full_mask = (1 << self.__size) - 1
+        self.__top_row = (1 << width) - 1
+        self.__bottom_row = self.__top_row << (self.__size - width)
+        self.__left_column = sum(1 << (row * width) for row in range(height))
+        self.__right_column = self.__left_column << (width - 1)
+        """
+        棋盘的对称变换（恒等和左右镜像）：变换后局势第i格取原局势第symmetries[t][i]格
+        """
+        self.__symmetries = (
+            tuple(range(self.__size)),
+            tuple(i - i % width + width - 1 - i % width for i in range(self.__size))
+        )
+
+    @property
+    def width(self):
+        return self.__width
+
+    @property
+    def height(self):
+        return self.__height
+
+    @property
+    def size(self):
+        """
+        棋盘格数
+        """
+        return self.__size
+
+    @property
+    def top_row(self):
+        return self.__top_row
+
+    @property
+    def bottom_row(self):
+        return self.__bottom_row
+
+    @property
+    def symmetries(self):
+        return self.__symmetries
+
+    @property
+    def init_bits(self):
+        """
+        开局的(玩家位棋盘, 电脑位棋盘)
+        """
+        return self.__bottom_row, self.__top_row
+
+    def __targets(self, own_bits, enemy_bits, empty_bits, side):
+        """
+        走棋方棋子直走、向左斜吃、向右斜吃的目标格位及各自的移位量
+        :return: ((目标格位, 移位量), ...)，玩家方起点 = 终点 + 移位量，电脑方起点 = 终点 - 移位量
+        """
+        width = self.__width
+        if side == 1:
+            return (((own_bits >> width) & empty_bits, width),
+                    (((own_bits & ~self.__left_column) >> (width + 1)) & enemy_bits, width + 1),
+                    (((own_bits & ~self.__right_column) >> (width - 1)) & enemy_bits, width - 1))
+        return (((own_bits << width) & empty_bits, width),
+                (((own_bits & ~self.__right_column) << (width + 1)) & enemy_bits, width + 1),
+                (((own_bits & ~self.__left_column) << (width - 1)) & enemy_bits, width - 1))
+
+    def legal_moves(self, player_bits, computer_bits, side):
+        """
+        生成走棋方的全部合法走法
+        :param side: 走棋方，1=玩家，2=电脑
+        :return: 按起点、终点排序的(起点格编号, 终点格编号) 列表
+        """
+        own_bits, enemy_bits = (player_bits, computer_bits) if side == 1 else (computer_bits, player_bits)
+        empty_bits = self.__full_mask & ~(player_bits | computer_bits)
+        direction = 1 if side == 1 else -1
+        moves = []
+        for targets, shift in self.__targets(own_bits, enemy_bits, empty_bits, side):
+            while targets:
+                end_bit = targets & -targets
+                end = end_bit.bit_length()
+                moves.append((end + direction * shift, end))
+                targets ^= end_bit
+        moves.sort()
+        return moves
+
+    def has_moves(self, player_bits, computer_bits, side):
+        """
+        判断走棋方是否还有棋可走
+        :param side: 走棋方，1=玩家，2=电脑
+        """
+        own_bits, enemy_bits = (player_bits, computer_bits) if side == 1 else (computer_bits, player_bits)
+        empty_bits = self.__full_mask & ~(player_bits | computer_bits)
+        return any(targets for targets, _ in self.__targets(own_bits, enemy_bits, empty_bits, side))
+
+    def is_legal(self, player_bits, computer_bits, side, start_pos, end_pos):
+        """
+        判断走棋方从起点格走到终点格是否合法，起点格须有走棋方的棋子
+        """
+        own_bits, enemy_bits = (player_bits, computer_bits) if side == 1 else (computer_bits, player_bits)
+        start_bit, end_bit = 1 << (start_pos - 1), 1 << (end_pos - 1)
+        if not own_bits & start_bit:
+            return False
+        empty_bits = self.__full_mask & ~(player_bits | computer_bits)
+        return any(targets & end_bit for targets, _ in self.__targets(start_bit, enemy_bits, empty_bits, side))
+
+    def board_key(self, player_bits, computer_bits):
+        """
+        位棋盘转换为局势编码字串
+        """
+        return "".join([CELL_CHARS[(player_bits >> i & 1) | (computer_bits >> i & 1) << 1] for i in range(self.__size)])
+
+    def board_bits(self, board_key):
+        """
+        局势编码字串转换为位棋盘
+        :return: (玩家位棋盘, 电脑位棋盘)
+        """
+        player_bits = sum(1 << i for i, char in enumerate(board_key) if char == "1")
+        computer_bits = sum(1 << i for i, char in enumerate(board_key) if char == "2")
+        return player_bits, computer_bits
+
+    def canonical_board(self, board_key):
+        """
+        求局势的规范形式：所有对称变换下编码最小的局势
+        :param board_key: 局势编码字串
+        :return: (规范局势编码字串, 对称变换编号)，规范局势第i格即原局势第symmetries[编号][i]格
+        """
+        canon_key, canon_index = board_key, 0
+        for index in range(1, len(self.__symmetries)):
+            key = "".join([board_key[i] for i in self.__symmetries[index]])
+            if key < canon_key:
+                canon_key, canon_index = key, index
+        return canon_key, canon_index
+
+    def canonical_dict(self, ai_dict):
+        """
+        把AI库字典的局势换成规范形式，互为对称的局势合并后只保留都未被剪除的走法（按等价走法比较），没有这样的走法时为空列表（认输）
+        """
+        result = dict()
+        for board_key, solutions in ai_dict.items():
+            canon_key, index = self.canonical_board(board_key)
+            symmetry = self.__symmetries[index]
+            canon_solutions = [_transform_solution(symmetry, solution) for solution in solutions]
+            if canon_key in result:
+                # 各朝向剪除的走法都是输棋的走法，交集为空时也不能恢复；按规范局势的自身对称变换比较走法
+                equivalents = self.__equivalent_solutions(canon_key, canon_solutions)
+                result[canon_key] = [solution for solution in result[canon_key] if solution in equivalents]
+            else:
+                result[canon_key] = canon_solutions
+        return result
+
+    def __equivalent_solutions(self, canon_key, solutions):
+        """
+        走法在规范局势的自身对称变换下的全部等价走法：规范局势自身对称时，不同朝向的同一步棋换算到不同的格
+        :return: “起点-终点”走法字串的集合
+        """
+        stabilizer = [symmetry for symmetry in self.__symmetries
+                      if "".join([canon_key[i] for i in symmetry]) == canon_key]
+        return {_transform_solution(symmetry, solution) for symmetry in stabilizer for solution in solutions}
+
+
+def _transform_solution(symmetry, solution):
+    """
+    把原局势的“起点-终点”走法换成规范局势中的走法
+    """
+    start, end = (int(pos) for pos in solution.split("-"))
+    return "%d-%d" % (symmetry.index(start - 1) + 1, symmetry.index(end - 1) + 1)
+
+
+STANDARD_RULES = HexapawnRules()  # 标准3×3六兵棋
+
+"""
+标准3×3棋盘的常量，供只支持标准棋盘的批量模拟使用
+走法表：PUSH_TABLES[走棋方][i]为第i格棋子直走的目标格位，CAPTURE_TABLES[走棋方][i]为斜吃的目标格位
+"""
+SYMMETRIES = STANDARD_RULES.symmetries
+FULL_MASK = 0b111111111
+TOP_ROW = 0b000000111
+BOTTOM_ROW = 0b111000000
+INIT_PLAYER_BITS = BOTTOM_ROW
+INIT_COMPUTER_BITS = TOP_ROW
+PUSH_TABLES = {
+    1: tuple(1 << (i - 3) if i >= 3 else 0 for i in range(9)),
+    2: tuple(1 << (i + 3) if i < 6 else 0 for i in range(9))
+}
+CAPTURE_TABLES = {
+    1: tuple(sum(1 << j for j in (i - 4, i - 2) if i >= 3 and 0 <= j < 9 and j // 3 == i // 3 - 1) for i in range(9)),
+    2: tuple(sum(1 << j for j in (i + 2, i + 4) if i < 6 and 0 <= j < 9 and j // 3 == i // 3 + 1) for i in range(9))
+}
+
 
 class HexapawnAI:
     """
     六兵棋AI
     """
 
-    def __init__(self):
-        self.__hp_ai_dict = dict()  # AI库字典
+    __shared_ais = dict()  # 进程内按AI文件路径共享的AI
+
+    def __init__(self, rules=None):
+        self.__rules = STANDARD_RULES if rules is None else rules  # AI库对应的棋盘规则
+        self.__file_signature = None  # 最近一次读写AI文件时的(修改时间, 大小)
+        self.__hp_ai_dict = dict()  # AI库字典，使用二进制AI库时只保存修改过的局势
+        self.__hp_ai_store = None  # 内存映射的二进制AI库
+        self.__binary_format = False  # AI文件是否为二进制格式
+        self.__journal_file_name = None  # 学习日志文件，None表示不使用日志
+        self.__journal_records = []  # 尚未写入日志的剪枝记录
+        self.__journal_size = 0  # 日志文件中的记录数
+        self.__writer = None  # 后台写入线程，None表示在调用线程中同步写入
+        self.__saved_stores = dict()  # 后台已写好、待换上的二进制AI库 {AI文件: (临时文件, 写入时修改过的局势)}
+        self.__saved_texts = dict()  # 后台已写好的文本AI文件 {AI文件: 写入后的(修改时间, 大小)}
+
+    @classmethod
+    def shared(cls, file_name, rules=None):
+        """
+        获取进程内该AI文件共用的AI，多个控制器共享同一份AI库，同一AI文件须用同样的棋盘规则，否则报ValueError
+        :param rules: 棋盘规则，None表示标准3×3棋盘
+        """
+        rules = STANDARD_RULES if rules is None else rules
+        path = os.path.abspath(file_name)
+        if path not in cls.__shared_ais:
+            cls.__shared_ais[path] = cls(rules)
+        ai = cls.__shared_ais[path]
+        if (ai.__rules.width, ai.__rules.height) != (rules.width, rules.height):
+            raise ValueError("AI文件已按其他尺寸的棋盘读取：" + file_name)
+        return ai
+
+    def load_dict(self, file_name):
+        """
+        按需读取AI库：文件的修改时间和大小与上次读写时一致则沿用内存中的AI库，否则重新读取
+        后台写入尚未完成时内存中的AI库比文件新，沿用内存中的AI库
+        """
+        if not self.__finish_saves(False):
+            return
+        if self.__file_signature is None and not os.path.exists(file_name):
+            return  # 新尺寸的棋盘还没有AI文件时从空AI库开始，保存时创建
+        if self.__stat_file(file_name) == self.__file_signature:
+            return
+        self.__hp_ai_dict.clear()
+        self.read_dict(file_name)
+
+    @staticmethod
+    def __stat_file(file_name):
+        stat = os.stat(file_name)
+        return stat.st_mtime_ns, stat.st_size
 
     def read_dict(self, file_name):
         """
-        读取文件获取AI库
+        读取文件获取AI库，自动识别文本格式和二进制格式，局势统一换成规范形式
         """
-        with open(file_name, "r") as file:
-            text_data = file.read()
-        kv_pairs = text_data.split("|")
-        for pair in kv_pairs:
-            key, list_str_val = pair.split(":")
-            list_val = list_str_val.split(",")
-            self.__hp_ai_dict[key] = list_val
+        self.__finish_saves(True)
+        if hpstore.is_store_file(file_name):
+            self.__close_store()
+            self.__hp_ai_dict.clear()
+            store = hpstore.HexapawnStore(file_name)
+            if (store.width, store.height) != (self.__rules.width, self.__rules.height):
+                store.close()
+                raise ValueError("AI库文件的棋盘尺寸不符：" + file_name)
+            if store.flags & hpstore.FLAG_CANONICAL:
+                self.__hp_ai_store = store
+            else:
+                self.__hp_ai_dict.update(self.__rules.canonical_dict(dict(store.items())))  # 未规范化的二进制AI库整体读入后规范化
+                store.close()
+            self.__binary_format = True
+        else:
+            with open(file_name, "r") as file:
+                text_data = file.read()
+            self.__hp_ai_dict.update(self.__rules.canonical_dict(hpstore.parse_text(text_data)))
+            self.__binary_format = False
+        if self.__journal_file_name is not None:
+            records = hpstore.read_journal(self.__journal_file_name)
+            for key, solution in records:
+                self.__prune(key, solution)  # 重放尚未合并的剪枝记录
+            self.__journal_records = []
+            self.__journal_size = len(records)
+        self.__file_signature = self.__stat_file(file_name)
+
+    def set_journal(self, file_name):
+        """
+        启用学习日志，剪枝记录只追加到日志文件，由compact合并进AI库
+        """
+        self.__journal_file_name = file_name
+
+    def set_writer(self, writer):
+        """
+        启用后台写入：save_dict和compact只在调用线程中取AI库的快照，写文件交给写入线程（hpstore.BackgroundWriter），
+        不再追加学习日志，每次保存都整体写入AI库并清空日志。
+        进程内共享的AI由多个控制器使用，须用共用的hpstore.BackgroundWriter.shared()，以免一个控制器关闭写入线程后其他控制器无法保存
+        """
+        self.__finish_saves(True)  # 先换上原写入线程已写好的AI库
+        self.__writer = writer
+
+    def wait_saves(self):
+        """
+        等待后台写入完成，二进制AI库在此换上新文件
+        """
+        self.__finish_saves(True)
+
+    def __close_store(self):
+        if self.__hp_ai_store is not None:
+            self.__hp_ai_store.close()
+            self.__hp_ai_store = None
+
+    def __find_solutions(self, board_key):
+        """
+        查询局势的走法列表，修改过的局势优先于二进制AI库
+        """
+        if board_key in self.__hp_ai_dict:
+            return self.__hp_ai_dict[board_key]
+        if self.__hp_ai_store is not None:
+            return self.__hp_ai_store.get(board_key)
+        return None
+
+    def __contains__(self, board_key):
+        """
+        局势是否在AI库中，已无走法的局势也算在内
+        """
+        return self.__find_solutions(board_key) is not None
 
     def get_solution(self, board_key):
         """
@@ -31,9 +344,7 @@ class HexapawnAI:
         :param board_key: 局势编码字串
         :return: 走格编号，若无解则返回None
         """
-        if board_key not in self.__hp_ai_dict:
-            return None
-        solutions = self.__hp_ai_dict[board_key]
+        solutions = self.__find_solutions(board_key)
         if solutions is None:
             return None
         if len(solutions) == 0:
@@ -48,25 +359,144 @@ class HexapawnAI:
         :param board_key: 局势编码字串
         :param start: 最后一步棋子走格编号
         :param end: 最后一步目标走格编号
+        :return: 是否删除了走法，走法已被删除或局势不在AI库中时为False
         """
         solution = str(start) + "-" + str(end)
-        solutions = self.__hp_ai_dict[board_key]
-        if solution in solutions:
-            solutions.remove(solution)
-        if len(solutions) == 0:
-            del self.__hp_ai_dict[board_key]
+        pruned = self.__prune(board_key, solution)
+        if pruned and self.__journal_file_name is not None and self.__writer is None:
+            self.__journal_records.append((board_key, solution))
+        return pruned
+
+    def __prune(self, board_key, solution):
+        """
+        从局势的走法列表中删除走法
+        :param solution: “起点-终点”走法字串
+        :return: 是否删除了走法
+        """
+        solutions = self.__find_solutions(board_key)
+        if solutions is None or solution not in solutions:
+            return False
+        self.__hp_ai_dict[board_key] = solutions
+        solutions.remove(solution)
+        if len(solutions) == 0 and self.__hp_ai_store is None:
+            del self.__hp_ai_dict[board_key]  # 二进制AI库需保留空列表以屏蔽库中的局势
+        return True
 
     def save_dict(self, file_name):
         """
-        把新的AI写入文件
+        把新的AI写入文件，按读取时的格式写入，启用后台写入时只提交快照
+        """
+        if self.__writer is not None:
+            self.__submit_save(file_name)
+            return
+        if not self.__binary_format:
+            hpstore.replace_file(file_name, hpstore.format_text(self.__hp_ai_dict))
+            self.__file_signature = self.__stat_file(file_name)
+            return
+        ai_dict = self.snapshot()
+        self.__close_store()  # 先解除映射再覆盖文件
+        hpstore.write_store(file_name, ai_dict, hpstore.FLAG_CANONICAL, self.__rules.width, self.__rules.height)
+        self.__hp_ai_dict.clear()
+        self.__hp_ai_store = hpstore.HexapawnStore(file_name)
+        self.__file_signature = self.__stat_file(file_name)
+
+    def __submit_save(self, file_name):
+        """
+        取AI库的快照交给后台写入：文本AI库写好后直接改名覆盖，
+        二进制AI库仍被本线程映射，写成临时文件后由__finish_saves在本线程中换上，
+        两者写好后的修改时间和大小都由__finish_saves在本线程中记下，以免与load_dict竞争
         """
-        hp_items = []
-        for ai_key, ai_list in self.__hp_ai_dict.items():
-            hp_item = ai_key + ":" + ",".join(ai_list)
-            hp_items.append(hp_item)
-        hp_ai_fullstr = "|".join(hp_items)
-        with open(file_name, "w") as file:
-            file.write(hp_ai_fullstr)
+        journal_file_name = self.__journal_file_name
+        if not self.__binary_format:
+            ai_dict = {key: list(solutions) for key, solutions in self.__hp_ai_dict.items()}
+
+            def write():
+                hpstore.replace_file(file_name, hpstore.format_text(ai_dict))
+                if journal_file_name is not None:
+                    hpstore.clear_journal(journal_file_name)
+                self.__saved_texts[file_name] = self.__stat_file(file_name)
+        else:
+            store = self.__hp_ai_store  # 写入前不会关闭：换上新文件要等写入线程空闲
+            changed = {key: list(solutions) for key, solutions in self.__hp_ai_dict.items()}
+            saving_file_name = file_name + ".saving"
+            rules = self.__rules
+
+            def write():
+                ai_dict = dict() if store is None else dict(store.items())
+                ai_dict.update(changed)
+                ai_dict = {key: solutions for key, solutions in ai_dict.items() if solutions}  # 同snapshot，不含已无走法的局势
+                hpstore.write_store(saving_file_name, ai_dict, hpstore.FLAG_CANONICAL, rules.width, rules.height)
+                self.__saved_stores[file_name] = (saving_file_name, changed)
+        self.__writer.submit(("save", os.path.abspath(file_name)), write)
+
+    def __finish_saves(self, wait):
+        """
+        换上后台已写好的二进制AI库，记下后台已写好的AI文件的修改时间和大小
+        :param wait: 是否等待写入线程空闲，否则写入线程忙时直接返回
+        :return: 后台写入是否都已完成
+        """
+        if self.__writer is None:
+            return True
+        if wait:
+            self.__writer.flush()
+        elif self.__writer.busy:
+            return False
+        for file_name, (saving_file_name, changed) in self.__saved_stores.items():
+            self.__close_store()
+            os.replace(saving_file_name, file_name)
+            self.__hp_ai_store = hpstore.HexapawnStore(file_name)
+            for key, solutions in changed.items():
+                if self.__hp_ai_dict.get(key) == solutions:
+                    del self.__hp_ai_dict[key]  # 已写进新文件且之后未再修改的局势
+            if self.__journal_file_name is not None:
+                hpstore.clear_journal(self.__journal_file_name)
+            self.__file_signature = self.__stat_file(file_name)
+        self.__saved_stores.clear()
+        for signature in self.__saved_texts.values():
+            self.__file_signature = signature
+        self.__saved_texts.clear()
+        return True
+
+    def snapshot(self):
+        """
+        AI库的完整副本（不含已无走法的局势），修改副本不影响AI
+        """
+        ai_dict = dict() if self.__hp_ai_store is None else dict(self.__hp_ai_store.items())
+        ai_dict.update(self.__hp_ai_dict)
+        return {key: list(solutions) for key, solutions in ai_dict.items() if len(solutions) > 0}
+
+    def load_snapshot(self, ai_dict):
+        """
+        用AI库副本替换全部AI库，之后的AI与任何文件无关
+        """
+        self.__finish_saves(True)
+        self.__close_store()
+        self.__hp_ai_dict = {key: list(solutions) for key, solutions in ai_dict.items()}
+        self.__binary_format = False
+        self.__file_signature = None
+
+    def flush_journal(self):
+        """
+        把新的剪枝记录追加到学习日志
+        :return: 日志文件中的记录数
+        """
+        if len(self.__journal_records) > 0:
+            hpstore.append_journal(self.__journal_file_name, self.__journal_records)
+            self.__journal_size += len(self.__journal_records)
+            self.__journal_records = []
+        return self.__journal_size
+
+    def compact(self, file_name):
+        """
+        把学习日志合并进AI库并清空日志
+        """
+        if self.__writer is not None:
+            self.__submit_save(file_name)  # 后台写入时没有新的日志记录，整体保存后清空日志
+            return
+        self.save_dict(file_name)
+        hpstore.clear_journal(self.__journal_file_name)
+        self.__journal_records = []
+        self.__journal_size = 0
 
 
 class HexapawnController:
@@ -74,35 +504,78 @@ class HexapawnController:
     六兵棋游戏控制器：主要负责游戏逻辑处理和电脑AI调用
     """
 
-    def __init__(self):
-        self.__ai = HexapawnAI()
-        self.__ai_file_name = "hp_ai_file.txt"
-        self.__board_data = []
+    def __init__(self, ai_file_name="hp_ai_file.txt", journal_threshold=None, ai=None, rules=None, tablebase=None, metrics=None, writer=None):
+        self.__rules = STANDARD_RULES if rules is None else rules  # 棋盘规则，默认为标准3×3棋盘
+        if tablebase is not None and (tablebase.rules.width, tablebase.rules.height) != (self.__rules.width, self.__rules.height):
+            raise ValueError("残局库的棋盘尺寸不符")
+        self.__tablebase = tablebase  # 残局库（hptablebase.HexapawnTablebase），设置后电脑按残局库走棋，不再查询和修改AI库
+        self.__ai = HexapawnAI.shared(ai_file_name, self.__rules) if ai is None else ai  # 可传入独立的AI代替进程内共享的AI
+        self.__metrics = metrics  # 运行统计（hpmetrics.ControllerMetrics），None表示不统计
+        if metrics is not None:
+            self.__ai = metrics.instrument(self, self.__ai)  # 控制器方法换成计时的包装，经统计代理调用AI
+        self.__ai_file_name = ai_file_name  # 文本格式或二进制格式AI库
+        self.__journal_threshold = journal_threshold  # 日志记录数达到此值时合并进AI库，None表示不使用日志
+        if journal_threshold is not None:
+            self.__ai.set_journal(ai_file_name + ".journal")
+        self.__writer = writer  # 后台写入线程（hpstore.BackgroundWriter），None表示在调用线程中写文件，设置后不写日志
+        if writer is not None:
+            self.__ai.set_writer(writer)
+        self.__player_bits = 0  # 玩家位棋盘
+        self.__computer_bits = 0  # 电脑位棋盘
         self.__computer_lose = False
         self.__last_board = None
         self.__last_step = None
 
     @property
     def board_data(self):
-        return self.__board_data
+        """
+        兼容视图：各格数字列表，0=空，1=玩家，2=电脑
+        """
+        return [(self.__player_bits >> i & 1) | (self.__computer_bits >> i & 1) << 1 for i in range(self.__rules.size)]
+
+    @property
+    def rules(self):
+        return self.__rules
+
+    @property
+    def metrics(self):
+        return self.__metrics
+
+    @property
+    def bitboards(self):
+        """
+        (玩家位棋盘, 电脑位棋盘)
+        """
+        return self.__player_bits, self.__computer_bits
 
     def init_ai(self):
         """
-        初始化AI
+        初始化AI，AI文件未被外部修改时沿用已读取的AI库
         """
-        self.__ai.read_dict(self.__ai_file_name)
+        self.__ai.load_dict(self.__ai_file_name)
 
     def update_ai(self):
         """
-        更新AI文件
+        更新AI文件，使用日志时只追加本局的剪枝记录，使用后台写入时提交整个AI库（连续的保存合并为一次）
+        """
+        if self.__journal_threshold is None or self.__writer is not None:
+            self.__ai.save_dict(self.__ai_file_name)
+        elif self.__ai.flush_journal() >= self.__journal_threshold:
+            self.__ai.compact(self.__ai_file_name)
+
+    def close_ai(self):
+        """
+        结束游戏时把学习日志合并进AI文件，并等待后台写入完成
         """
-        self.__ai.save_dict(self.__ai_file_name)
+        if self.__journal_threshold is not None:
+            self.__ai.compact(self.__ai_file_name)
+        self.__ai.wait_saves()
 
     def init_board(self):
         """
         初始化棋盘
         """
-        self.__board_data = [2, 2, 2, 0, 0, 0, 1, 1, 1]
+        self.__player_bits, self.__computer_bits = self.__rules.init_bits
         self.__computer_lose = False
         self.__last_board = None
         self.__last_step = None
@@ -112,37 +585,41 @@ class HexapawnController:
         玩家走棋
         :return: 走棋状态编码
         """
-        if (not 1 <= start_pos <= 9) or (not 1 <= end_pos <= 9):
+        if (not 1 <= start_pos <= self.__rules.size) or (not 1 <= end_pos <= self.__rules.size):
             return 1
-        if self.__board_data[start_pos - 1] != 1:
+        start_bit, end_bit = 1 << (start_pos - 1), 1 << (end_pos - 1)
+        if not self.__player_bits & start_bit:
             return 2
-        pass_way = False
-        if start_pos > 3:
-            if end_pos == start_pos - 3 and self.__board_data[end_pos - 1] == 0:
-                pass_way = True
-            elif self.__board_data[end_pos - 1] == 2 and (
-                    end_pos == start_pos - 2 or end_pos == start_pos - 4) and (
-                    start_pos - 1) // 3 == (end_pos - 1) // 3 + 1:
-                pass_way = True
-        if pass_way:
-            self.__board_data[start_pos - 1] = 0
-            self.__board_data[end_pos - 1] = 1
-            return 0
-        else:
+        if not self.__rules.is_legal(self.__player_bits, self.__computer_bits, 1, start_pos, end_pos):
             return 3
+        self.__player_bits ^= start_bit | end_bit
+        self.__computer_bits &= ~end_bit
+        return 0
 
     def computer_step(self):
         """
         电脑走棋
         """
-        record_board = "".join([str(item) for item in self.__board_data])
-        ai_step = self.__ai.get_solution(record_board)
+        if self.__tablebase is not None:
+            ai_step = self.__tablebase.get_move(self.__player_bits, self.__computer_bits, 2)
+            if ai_step is None:
+                self.__computer_lose = True
+            else:
+                end_bit = 1 << (ai_step[1] - 1)
+                self.__computer_bits ^= (1 << (ai_step[0] - 1)) | end_bit
+                self.__player_bits &= ~end_bit
+            return
+        record_board = self.__rules.board_key(self.__player_bits, self.__computer_bits)
+        canon_board, symmetry_index = self.__rules.canonical_board(record_board)  # AI库按规范局势记录走法
+        ai_step = self.__ai.get_solution(canon_board)
         if ai_step is None:
             self.__computer_lose = True  # 如果无棋可走自动判电脑认输
         else:
-            self.__board_data[ai_step[0] - 1] = 0
-            self.__board_data[ai_step[1] - 1] = 2
-            self.__last_board = record_board
+            symmetry = self.__rules.symmetries[symmetry_index]
+            end_bit = 1 << symmetry[ai_step[1] - 1]
+            self.__computer_bits ^= (1 << symmetry[ai_step[0] - 1]) | end_bit
+            self.__player_bits &= ~end_bit
+            self.__last_board = canon_board
             self.__last_step = ai_step
 
     def check_result(self, last_char):
@@ -154,32 +631,14 @@ class HexapawnController:
         if self.__computer_lose:
             result = 1  # 电脑认输的时候自动判玩家赢
         else:
-            player_left_steps = 0
-            computer_left_steps = 0
-            for i in range(len(self.__board_data)):
-                if i < 3 and self.__board_data[i] == 1:  # 玩家走到末线判赢
-                    result = 1
-                    break
-                if i > 5 and self.__board_data[i] == 2:  # 电脑走到末线判赢
-                    result = 2
-                    break
-                if self.__board_data[i] == 1:  # 确认玩家是否还能走棋
-                    if self.__board_data[i - 3] == 0:
-                        player_left_steps += 1
-                    if ((i % 3 == 0 or i % 3 == 1) and self.__board_data[i - 2] == 2) or (
-                            (i % 3 == 1 or i % 3 == 2) and self.__board_data[i - 4] == 2):
-                        player_left_steps += 1
-                if self.__board_data[i] == 2:  # 确认电脑是否还能走棋
-                    if self.__board_data[i + 3] == 0:
-                        computer_left_steps += 1
-                    if ((i % 3 == 0 or i % 3 == 1) and self.__board_data[i + 4] == 1) or (
-                            (i % 3 == 1 or i % 3 == 2) and self.__board_data[i + 2] == 1):
-                        computer_left_steps += 1
-            if result == 0:  # 如果对方已无棋可走判自己赢
-                if last_char == 1 and computer_left_steps == 0:
-                    result = 1
-                if last_char == 2 and player_left_steps == 0:
-                    result = 2
+            if self.__player_bits & self.__rules.top_row:
+                result = 1  # 玩家走到末线判赢
+            elif self.__computer_bits & self.__rules.bottom_row:
+                result = 2  # 电脑走到末线判赢
+            elif last_char == 1 and not self.__rules.has_moves(self.__player_bits, self.__computer_bits, 2):
+                result = 1  # 如果对方已无棋可走判自己赢
+            elif last_char == 2 and not self.__rules.has_moves(self.__player_bits, self.__computer_bits, 1):
+                result = 2
             if result == 1:
                 self.__computer_lose = True  # 如果玩家赢需要更新AI
         if self.__computer_lose:
@@ -193,8 +652,8 @@ class HexapawnView:
     六兵棋游戏视图：主要负责游戏界面输出和处理玩家输入指令请求
     """
 
-    def __init__(self):
-        self.__controller = HexapawnController()
+    def __init__(self, ai_file_name="hp_ai_file.txt", rules=None):
+        self.__controller = HexapawnController(ai_file_name, rules=rules)
 
     def main(self):
         """
@@ -213,9 +672,9 @@ class HexapawnView:
         print("六兵棋 Hexapawn")
         print()
         print("请按下列图示走棋：")
-        print("1 2 3")
-        print("4 5 6")
-        print("7 8 9")
+        rules = self.__controller.rules
+        for row in range(rules.height):
+            print(" ".join(str(row * rules.width + col + 1) for col in range(rules.width)))
         print("你是X，我是O，请你先走棋。")
         print()
 
@@ -270,6 +729,6 @@ class HexapawnView:
     def __print_board(self):
         patterns = [".", "X", "O"]
         board_data = self.__controller.board_data
-        print("%s %s %s" % (patterns[board_data[0]], patterns[board_data[1]], patterns[board_data[2]]))
-        print("%s %s %s" % (patterns[board_data[3]], patterns[board_data[4]], patterns[board_data[5]]))
-        print("%s %s %s" % (patterns[board_data[6]], patterns[board_data[7]], patterns[board_data[8]]))
+        width = self.__controller.rules.width
+        for row in range(self.__controller.rules.height):
+            print(" ".join(patterns[item] for item in board_data[row * width:(row + 1) * width]))
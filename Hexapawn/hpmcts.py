@@ -0,0 +1,285 @@
+"""
+六兵棋蒙特卡洛树搜索AI Hexapawn Monte Carlo tree search (UCT)
+
+每次模拟从根节点按UCT公式选到叶节点，展开叶节点的全部走法，再从叶节点随机下完一局，把结果回传到路径上各节点：
+    树存在按节点下标索引的并列数组里，每个节点的子节点下标连续，只记录起始下标和个数
+    随机对局直接在位棋盘上进行，六兵棋没有和棋，走到末线或对方无棋可走即结束
+    电脑走棋后记住所走的子节点，下一步时在它的子节点中找到玩家的走法，把这棵子树整理到数组开头继续用
+    AI只收到规范局势，树保持第一次建树时的方向，用对称变换在树的方向和规范局势的方向之间换算
+    可限定每步的模拟次数和秒数，到达任一个就停止
+与HexapawnAI接口相同（get_solution等），可作为ai参数传给HexapawnController，不学习，AI库相关方法为空操作。
+与AI库不同，必败局势也走一步，只有无棋可走时才认输。
+"""
+import math
+import random
+import time
+
+import hpengine
+
+EXPLORATION = 1.4  # UCT公式中探索项的系数
+MAX_NODES = 1000000  # 树的节点数上限，到达后不再展开
+
+
+def _untransform(bits, symmetry):
+    """
+    对称变换的逆变换：变换后第i格取原局势第symmetry[i]格
+    :return: 原局势的位棋盘
+    """
+    result = 0
+    for i, source in enumerate(symmetry):
+        if bits >> i & 1:
+            result |= 1 << source
+    return result
+
+
+def _apply_move(player_bits, computer_bits, side, move):
+    """
+    走一步棋，move为(起点格编号, 终点格编号)
+    :return: 走棋后的(玩家位棋盘, 电脑位棋盘)
+    """
+    start_bit, end_bit = 1 << (move[0] - 1), 1 << (move[1] - 1)
+    if side == 1:
+        return player_bits ^ (start_bit | end_bit), computer_bits & ~end_bit
+    return player_bits & ~end_bit, computer_bits ^ (start_bit | end_bit)
+
+
+class HexapawnMCTSAI:
+    """
+    六兵棋UCT蒙特卡洛树搜索AI
+    """
+
+    def __init__(self, rules=None, iterations=None, time_limit=1.0, exploration=EXPLORATION, max_nodes=MAX_NODES,
+                 seed=None):
+        """
+        :param rules: 棋盘规则，None表示标准3×3棋盘
+        :param iterations: 每步的模拟次数上限，None表示不限
+        :param time_limit: 每步的秒数上限，None表示不限
+        :param exploration: UCT公式中探索项的系数
+        :param max_nodes: 树的节点数上限
+        :param seed: 随机数种子
+        """
+        if iterations is None and time_limit is None:
+            raise ValueError("iterations和time_limit至少要限定一个")
+        self.__rules = hpengine.STANDARD_RULES if rules is None else rules
+        self.__iterations = iterations
+        self.__time_limit = time_limit
+        self.__exploration = exploration
+        self.__max_nodes = max_nodes
+        self.__rng = random.Random(seed)
+        # 节点数组：走入该节点的走法、首个子节点下标（-1表示未展开）、子节点数、访问次数、走入该节点一方的得分
+        self.__moves = []
+        self.__first_child = []
+        self.__child_count = []
+        self.__visits = []
+        self.__wins = []
+        self.__root_bits = (0, 0)  # 树方向的根局势(玩家位棋盘, 电脑位棋盘)
+        self.__symmetry = tuple(range(self.__rules.size))  # 规范局势第i格对应树的第symmetry[i]格
+        self.__chosen = None  # 上一步电脑走的子节点
+        self.__stats = dict()
+
+    @property
+    def stats(self):
+        """
+        最近一步的统计：模拟次数、用时、每秒模拟次数、树的节点数、沿用的节点数、所选走法的访问次数和胜率
+        """
+        return dict(self.__stats)
+
+    def get_solution(self, board_key):
+        """
+        按照局势搜索走法
+        :param board_key: 轮到电脑走的局势编码字串
+        :return: (起点格编号, 终点格编号)，若无棋可走则返回None
+        """
+        player_bits, computer_bits = self.__rules.board_bits(board_key)
+        if not self.__rules.has_moves(player_bits, computer_bits, 2):
+            return None
+        if not self.__reroot(player_bits, computer_bits):
+            self.__reset(player_bits, computer_bits)
+        reused = len(self.__moves)
+        start_time = time.perf_counter()
+        deadline = None if self.__time_limit is None else start_time + self.__time_limit
+        playouts = 0
+        while self.__iterations is None or playouts < self.__iterations:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            self.__playout()
+            playouts += 1
+        seconds = time.perf_counter() - start_time
+        if self.__first_child[0] < 0:
+            self.__expand(0, *self.__root_bits, 2)  # 一次也没有模拟
+        start = self.__first_child[0]
+        best = max(range(start, start + self.__child_count[0]), key=self.__visits.__getitem__)
+        self.__chosen = best
+        self.__stats = {
+            "playouts": playouts,
+            "seconds": seconds,
+            "playouts_per_second": playouts / seconds if seconds > 0 else 0.0,
+            "tree_size": len(self.__moves),
+            "reused_nodes": reused,
+            "visits": self.__visits[best],
+            "win_rate": self.__wins[best] / self.__visits[best] if self.__visits[best] > 0 else 0.0
+        }
+        start_pos, end_pos = self.__moves[best]
+        return self.__symmetry.index(start_pos - 1) + 1, self.__symmetry.index(end_pos - 1) + 1
+
+    def __reset(self, player_bits, computer_bits):
+        """
+        以规范局势为根重新建树
+        """
+        self.__moves = [None]
+        self.__first_child = [-1]
+        self.__child_count = [0]
+        self.__visits = [0]
+        self.__wins = [0.0]
+        self.__root_bits = (player_bits, computer_bits)
+        self.__symmetry = tuple(range(self.__rules.size))
+
+    def __reroot(self, player_bits, computer_bits):
+        """
+        在上一步电脑走法的子节点中找到当前局势，把它的子树作为新的树
+        :return: 是否找到
+        """
+        chosen, self.__chosen = self.__chosen, None
+        if chosen is None or self.__first_child[chosen] < 0:
+            return False
+        tree_bits = _apply_move(*self.__root_bits, 2, self.__moves[chosen])
+        start = self.__first_child[chosen]
+        for symmetry in self.__rules.symmetries:
+            next_bits = (_untransform(player_bits, symmetry), _untransform(computer_bits, symmetry))
+            for child in range(start, start + self.__child_count[chosen]):
+                if _apply_move(*tree_bits, 1, self.__moves[child]) == next_bits:
+                    self.__compact(child)
+                    self.__root_bits = next_bits
+                    self.__symmetry = symmetry
+                    return True
+        return False
+
+    def __compact(self, root):
+        """
+        把root的子树按层序复制到新数组，其余节点丢弃
+        """
+        moves, first_child, child_count = [self.__moves[root]], [-1], [self.__child_count[root]]
+        visits, wins = [self.__visits[root]], [self.__wins[root]]
+        queue = [root]
+        index = 0
+        while index < len(queue):
+            start = self.__first_child[queue[index]]
+            if start >= 0:
+                first_child[index] = len(moves)
+                for child in range(start, start + self.__child_count[queue[index]]):
+                    queue.append(child)
+                    moves.append(self.__moves[child])
+                    first_child.append(-1)
+                    child_count.append(self.__child_count[child])
+                    visits.append(self.__visits[child])
+                    wins.append(self.__wins[child])
+            index += 1
+        self.__moves, self.__first_child, self.__child_count = moves, first_child, child_count
+        self.__visits, self.__wins = visits, wins
+
+    def __expand(self, node, player_bits, computer_bits, side):
+        """
+        展开节点，走法顺序随机
+        """
+        moves = self.__rules.legal_moves(player_bits, computer_bits, side)
+        self.__rng.shuffle(moves)
+        self.__first_child[node] = len(self.__moves)
+        self.__child_count[node] = len(moves)
+        self.__moves.extend(moves)
+        self.__first_child.extend([-1] * len(moves))
+        self.__child_count.extend([0] * len(moves))
+        self.__visits.extend([0] * len(moves))
+        self.__wins.extend([0.0] * len(moves))
+
+    def __select(self, node):
+        """
+        按UCT公式选子节点，未访问过的子节点优先
+        """
+        start = self.__first_child[node]
+        visits, wins = self.__visits, self.__wins
+        log_visits = math.log(visits[node])
+        best, best_value = start, -1.0
+        for child in range(start, start + self.__child_count[node]):
+            child_visits = visits[child]
+            if child_visits == 0:
+                return child
+            value = wins[child] / child_visits + self.__exploration * math.sqrt(log_visits / child_visits)
+            if value > best_value:
+                best, best_value = child, value
+        return best
+
+    def __finished(self, player_bits, computer_bits, side):
+        """
+        走棋方刚走完后是否赢棋：走到末线或对方无棋可走
+        """
+        if side == 1 and player_bits & self.__rules.top_row or side == 2 and computer_bits & self.__rules.bottom_row:
+            return True
+        return not self.__rules.has_moves(player_bits, computer_bits, 3 - side)
+
+    def __playout(self):
+        """
+        一次模拟：选择、展开、随机对局、回传
+        """
+        player_bits, computer_bits = self.__root_bits
+        side = 2  # 走棋方，1=玩家，2=电脑
+        node = 0
+        path = [0]
+        winner = None
+        while self.__first_child[node] >= 0:
+            node = self.__select(node)
+            path.append(node)
+            player_bits, computer_bits = _apply_move(player_bits, computer_bits, side, self.__moves[node])
+            if self.__finished(player_bits, computer_bits, side):
+                winner = side
+                break
+            side = 3 - side
+        if winner is None:
+            if len(self.__moves) < self.__max_nodes:
+                self.__expand(node, player_bits, computer_bits, side)
+            winner = self.__rollout(player_bits, computer_bits, side)
+        for depth, node in enumerate(path):
+            self.__visits[node] += 1
+            if winner == (2 if depth & 1 else 1):
+                self.__wins[node] += 1.0  # 走入该节点的一方赢
+        return winner
+
+    def __rollout(self, player_bits, computer_bits, side):
+        """
+        双方随机走到分出胜负，走棋方还有棋可走
+        :return: 赢方，1=玩家，2=电脑
+        """
+        legal_moves, choice = self.__rules.legal_moves, self.__rng.choice
+        while True:
+            player_bits, computer_bits = _apply_move(player_bits, computer_bits, side,
+                                                     choice(legal_moves(player_bits, computer_bits, side)))
+            if self.__finished(player_bits, computer_bits, side):
+                return side
+            side = 3 - side
+
+    """
+    蒙特卡洛树搜索AI没有AI库，下列方法为空操作，以便与HexapawnAI互换
+    """
+
+    def load_dict(self, file_name):
+        pass
+
+    def save_dict(self, file_name):
+        pass
+
+    def set_journal(self, file_name):
+        pass
+
+    def set_writer(self, writer):
+        pass
+
+    def wait_saves(self):
+        pass
+
+    def flush_journal(self):
+        return 0
+
+    def compact(self, file_name):
+        pass
+
+    def remove_wrong_solution(self, board_key, start, end):
+        return False
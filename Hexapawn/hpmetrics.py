@@ -0,0 +1,173 @@
+"""
+六兵棋运行统计 Hexapawn controller instrumentation
+
+可选的控制器统计：把ControllerMetrics传给HexapawnController的metrics参数即启用，不传时控制器不做任何额外工作。
+    延迟直方图：player_step、computer_step、check_result以及AI的get_solution和文件读写，
+              桶按2的幂划分纳秒数，快照中给出次数、平均、最小、最大和p50/p90/p99（取所在桶的上界）
+    计数：AI库命中和未命中、电脑认输（get_solution返回None）、剪枝
+启用时控制器的这几个方法在实例上换成计时的包装，AI换成统计用的代理，原方法和AI类都不改动。
+快照为普通字典，可用snapshot查询或用dump写成JSON文件。
+"""
+import json
+import time
+
+HISTOGRAM_BUCKETS = 48  # 桶i记录bit_length为i的纳秒数，即[2^(i-1), 2^i)，最后一个桶收纳更长的耗时
+COUNTERS = ("store_hits", "store_misses", "resignations", "prunes")
+CONTROLLER_METHODS = ("player_step", "computer_step", "check_result")
+AI_IO_METHODS = ("load_dict", "save_dict", "flush_journal", "compact", "wait_saves")
+
+
+class LatencyHistogram:
+    """
+    按2的幂分桶的延迟直方图
+    """
+
+    def __init__(self):
+        self.__buckets = [0] * HISTOGRAM_BUCKETS
+        self.__count = 0
+        self.__total_ns = 0
+        self.__min_ns = None
+        self.__max_ns = 0
+
+    def record(self, elapsed_ns):
+        """
+        记录一次耗时
+        """
+        self.__buckets[min(elapsed_ns.bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+        self.__count += 1
+        self.__total_ns += elapsed_ns
+        if self.__min_ns is None or elapsed_ns < self.__min_ns:
+            self.__min_ns = elapsed_ns
+        if elapsed_ns > self.__max_ns:
+            self.__max_ns = elapsed_ns
+
+    def percentile(self, fraction):
+        """
+        分位数，取所在桶的上界，不超过最大值
+        :param fraction: 0到1之间
+        """
+        if self.__count == 0:
+            return 0
+        target = fraction * self.__count
+        seen = 0
+        for index, count in enumerate(self.__buckets):
+            seen += count
+            if count > 0 and seen >= target:
+                return min(1 << index, self.__max_ns)
+        return self.__max_ns
+
+    def snapshot(self):
+        """
+        :return: 统计字典，buckets的键为桶上界纳秒数，只含非空的桶
+        """
+        return {
+            "count": self.__count,
+            "total_ns": self.__total_ns,
+            "mean_ns": self.__total_ns // self.__count if self.__count > 0 else 0,
+            "min_ns": 0 if self.__min_ns is None else self.__min_ns,
+            "max_ns": self.__max_ns,
+            "p50_ns": self.percentile(0.5),
+            "p90_ns": self.percentile(0.9),
+            "p99_ns": self.percentile(0.99),
+            "buckets": {str(1 << index): count for index, count in enumerate(self.__buckets) if count > 0}
+        }
+
+
+class ControllerMetrics:
+    """
+    控制器的延迟直方图和计数，可由多个控制器共用
+    """
+
+    def __init__(self):
+        self.__histograms = dict()
+        self.__counters = dict.fromkeys(COUNTERS, 0)
+        self.__start_time = time.time()
+
+    def histogram(self, name):
+        """
+        按名称获取直方图，没有时新建
+        """
+        if name not in self.__histograms:
+            self.__histograms[name] = LatencyHistogram()
+        return self.__histograms[name]
+
+    def count(self, name, amount=1):
+        self.__counters[name] = self.__counters.get(name, 0) + amount
+
+    def timed(self, name, func):
+        """
+        包装func，每次调用的耗时记入名为name的直方图
+        """
+        histogram = self.histogram(name)
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.record(time.perf_counter_ns() - start)
+        return wrapper
+
+    def instrument(self, controller, ai):
+        """
+        在控制器实例上换上计时的方法
+        :param ai: 控制器使用的AI
+        :return: 统计用的AI代理，控制器改用它调用AI
+        """
+        for name in CONTROLLER_METHODS:
+            setattr(controller, name, self.timed(name, getattr(controller, name)))
+        return InstrumentedAI(ai, self)
+
+    def snapshot(self):
+        """
+        :return: {"uptime_seconds", "counters", "histograms"}
+        """
+        return {
+            "uptime_seconds": time.time() - self.__start_time,
+            "counters": dict(self.__counters),
+            "histograms": {name: histogram.snapshot() for name, histogram in sorted(self.__histograms.items())}
+        }
+
+    def dump(self, file_name):
+        """
+        把快照写成JSON文件
+        """
+        with open(file_name, "w") as file:
+            json.dump(self.snapshot(), file, indent=2, sort_keys=True)
+            file.write("\n")
+
+    def reset(self):
+        self.__histograms.clear()
+        self.__counters = dict.fromkeys(COUNTERS, 0)
+        self.__start_time = time.time()
+
+
+class InstrumentedAI:
+    """
+    统计用的AI代理：get_solution和文件读写计时，查询、认输和剪枝计数，其余属性直接转给原AI
+    """
+
+    def __init__(self, ai, metrics):
+        self.__ai = ai
+        self.__metrics = metrics
+        self.__has_store = hasattr(type(ai), "__contains__")  # 搜索AI和蒙特卡洛树搜索AI没有AI库，按是否给出走法计命中
+        self.__get_solution = metrics.timed("ai.get_solution", ai.get_solution)
+        for name in AI_IO_METHODS:
+            setattr(self, name, metrics.timed("ai." + name, getattr(ai, name)))
+
+    def __getattr__(self, name):
+        return getattr(self.__ai, name)
+
+    def get_solution(self, board_key):
+        solution = self.__get_solution(board_key)
+        hit = board_key in self.__ai if self.__has_store else solution is not None
+        self.__metrics.count("store_hits" if hit else "store_misses")
+        if solution is None:
+            self.__metrics.count("resignations")
+        return solution
+
+    def remove_wrong_solution(self, board_key, start, end):
+        pruned = self.__ai.remove_wrong_solution(board_key, start, end)
+        if pruned:
+            self.__metrics.count("prunes")  # 只计实际删除了走法的剪枝
+        return pruned
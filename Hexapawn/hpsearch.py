@@ -0,0 +1,311 @@
+"""
+六兵棋搜索AI Hexapawn alpha-beta search
+
+迭代加深的alpha-beta负极大值搜索，不需要训练好的AI库，适用于任意尺寸的棋盘：
+    Zobrist键：每方每格一个64位随机数再加一个走棋方随机数，走棋时异或更新
+    置换表：固定大小，按键的低位定位，本次搜索中更深的表项不被较浅的覆盖，上一步搜索留下的表项可被替换
+    走法排序：置换表走法优先，其次斜吃，其余按历史启发值排序
+    时间预算：每步限定秒数，超时时用最近一次完整迭代的结果
+与HexapawnAI接口相同（get_solution等），可作为ai参数传给HexapawnController，搜索AI不学习，AI库相关方法为空操作。
+与AI库不同，必败局势也走一步拖延时间，只有无棋可走时才认输。
+"""
+import random
+import time
+
+import hpengine
+
+WIN_SCORE = 1000000  # 必胜局势的评分，减去到赢棋的步数，赢得越快评分越高
+MAX_PLY = 1000
+INFINITY = WIN_SCORE + 1
+EXACT, LOWER, UPPER = 0, 1, 2  # 置换表评分的界类型：精确值、下界、上界
+PAWN_SCORE = 100  # 评估时每个兵的分值
+ADVANCE_SCORE = 10  # 评估时兵每前进一行的分值
+
+
+class _Timeout(Exception):
+    """
+    搜索超时
+    """
+
+
+class TranspositionTable:
+    """
+    固定大小的置换表，每项为(键, 深度, 评分, 界类型, 最佳走法, 搜索代数)
+    """
+
+    def __init__(self, size_bits=16):
+        self.__mask = (1 << size_bits) - 1
+        self.__entries = [None] * (1 << size_bits)
+        self.__generation = 0
+        self.__used = 0
+
+    def __len__(self):
+        return self.__used
+
+    def new_search(self):
+        """
+        开始新一步的搜索，之前的表项都可被替换
+        """
+        self.__generation += 1
+
+    def probe(self, key):
+        """
+        查询局势
+        :return: 表项，没有时返回None
+        """
+        entry = self.__entries[key & self.__mask]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, score, bound, move):
+        """
+        保存局势，位置已被本次搜索中更深的其他局势占用时不保存
+        """
+        index = key & self.__mask
+        entry = self.__entries[index]
+        if entry is None:
+            self.__used += 1
+        elif entry[0] != key and entry[5] == self.__generation and entry[1] > depth:
+            return
+        self.__entries[index] = (key, depth, score, bound, move, self.__generation)
+
+
+class HexapawnSearchAI:
+    """
+    六兵棋alpha-beta搜索AI
+    """
+
+    def __init__(self, rules=None, time_limit=1.0, max_depth=None, table_bits=16, seed=0):
+        """
+        :param rules: 棋盘规则，None表示标准3×3棋盘
+        :param time_limit: 每步搜索的秒数上限，None表示不限时
+        :param max_depth: 最大搜索深度，None表示搜到分出胜负
+        :param table_bits: 置换表大小为2的table_bits次方
+        :param seed: Zobrist随机数种子
+        """
+        self.__rules = hpengine.STANDARD_RULES if rules is None else rules
+        self.__time_limit = time_limit
+        self.__max_depth = max_depth
+        self.__table = TranspositionTable(table_bits)
+        size, width = self.__rules.size, self.__rules.width
+        rng = random.Random(seed)
+        self.__zobrist = {side: tuple(rng.getrandbits(64) for _ in range(size)) for side in (1, 2)}  # [走棋方][格]
+        self.__zobrist_side = rng.getrandbits(64)  # 轮到电脑走时异或
+        self.__advance = {
+            1: tuple((self.__rules.height - 1 - i // width) * ADVANCE_SCORE + PAWN_SCORE for i in range(size)),
+            2: tuple(i // width * ADVANCE_SCORE + PAWN_SCORE for i in range(size))
+        }  # [走棋方][格]，兵在该格的评估分值
+        self.__history = dict()
+        self.__nodes = 0
+        self.__deadline = None
+        self.__stats = dict()
+
+    @property
+    def stats(self):
+        """
+        最近一步搜索的统计：深度、节点数、用时、评分、置换表项数
+        """
+        return dict(self.__stats)
+
+    def get_solution(self, board_key):
+        """
+        按照局势搜索走法
+        :param board_key: 轮到电脑走的局势编码字串
+        :return: (起点格编号, 终点格编号)，若无棋可走则返回None
+        """
+        player_bits, computer_bits = self.__rules.board_bits(board_key)
+        moves = self.__rules.legal_moves(player_bits, computer_bits, 2)
+        if len(moves) == 0:
+            return None
+        start_time = time.perf_counter()
+        self.__deadline = None if self.__time_limit is None else start_time + self.__time_limit
+        self.__nodes = 0
+        self.__table.new_search()
+        key = self.__key(player_bits, computer_bits)
+        max_depth = MAX_PLY - 1 if self.__max_depth is None else self.__max_depth
+        best_move, best_score, depth = None, 0, 0
+        for iteration in range(1, max_depth + 1):
+            try:
+                move, score = self.__search_root(player_bits, computer_bits, iteration, key, best_move)
+            except _Timeout:
+                break
+            best_move, best_score, depth = move, score, iteration
+            if abs(score) > WIN_SCORE - MAX_PLY:
+                break  # 已分出胜负
+        if best_move is None:
+            best_move = moves[0]  # 第一层就超时
+        self.__stats = {
+            "depth": depth,
+            "nodes": self.__nodes,
+            "seconds": time.perf_counter() - start_time,
+            "score": best_score,
+            "table_size": len(self.__table)
+        }
+        return best_move
+
+    def __key(self, player_bits, computer_bits):
+        """
+        从头计算轮到电脑走的局势的Zobrist键
+        """
+        key = self.__zobrist_side
+        for side, bits in ((1, player_bits), (2, computer_bits)):
+            for i in range(self.__rules.size):
+                if bits >> i & 1:
+                    key ^= self.__zobrist[side][i]
+        return key
+
+    def __search_root(self, player_bits, computer_bits, depth, key, first_move):
+        """
+        根节点搜索，电脑方走棋
+        :return: ((起点格编号, 终点格编号), 评分)
+        """
+        alpha = -INFINITY
+        best_move = None
+        for move in self.__ordered_moves(player_bits, computer_bits, 2, first_move):
+            score = self.__score_move(player_bits, computer_bits, 2, move, depth, alpha, INFINITY, 0, key)
+            if best_move is None or score > alpha:
+                best_move, alpha = move, score
+        self.__table.store(key, depth, alpha, EXACT, best_move)
+        return best_move, alpha
+
+    def __score_move(self, player_bits, computer_bits, side, move, depth, alpha, beta, ply, key):
+        """
+        走棋方走move后的评分
+        """
+        start_bit, end_bit = 1 << (move[0] - 1), 1 << (move[1] - 1)
+        zobrist = self.__zobrist[side]
+        key ^= zobrist[move[0] - 1] ^ zobrist[move[1] - 1] ^ self.__zobrist_side
+        if side == 1:
+            if end_bit & self.__rules.top_row:
+                return WIN_SCORE - ply - 1
+            if computer_bits & end_bit:
+                key ^= self.__zobrist[2][move[1] - 1]
+            player_bits, computer_bits = player_bits ^ (start_bit | end_bit), computer_bits & ~end_bit
+        else:
+            if end_bit & self.__rules.bottom_row:
+                return WIN_SCORE - ply - 1
+            if player_bits & end_bit:
+                key ^= self.__zobrist[1][move[1] - 1]
+            player_bits, computer_bits = player_bits & ~end_bit, computer_bits ^ (start_bit | end_bit)
+        return -self.__search(player_bits, computer_bits, 3 - side, depth - 1, -beta, -alpha, ply + 1, key)
+
+    def __search(self, player_bits, computer_bits, side, depth, alpha, beta, ply, key):
+        """
+        负极大值alpha-beta搜索，对方上一步未走到末线
+        :param side: 走棋方，1=玩家，2=电脑
+        :return: 走棋方视角的评分
+        """
+        self.__nodes += 1
+        if self.__nodes & 1023 == 0 and self.__deadline is not None and time.perf_counter() > self.__deadline:
+            raise _Timeout()
+        original_alpha = alpha
+        table_move = None
+        entry = self.__table.probe(key)
+        if entry is not None:
+            table_move = entry[4]
+            if entry[1] >= depth:
+                score = self.__from_table(entry[2], ply)
+                if entry[3] == EXACT:
+                    return score
+                if entry[3] == LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+        moves = self.__ordered_moves(player_bits, computer_bits, side, table_move)
+        if len(moves) == 0:
+            return -WIN_SCORE + ply  # 无棋可走判负
+        if depth <= 0:
+            return self.__evaluate(player_bits, computer_bits, side)
+        best_score, best_move = -INFINITY, None
+        for move in moves:
+            score = self.__score_move(player_bits, computer_bits, side, move, depth, alpha, beta, ply, key)
+            if score > best_score:
+                best_score, best_move = score, move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                self.__history[move] = self.__history.get(move, 0) + depth * depth
+                break
+        if best_score <= original_alpha:
+            bound = UPPER
+        elif best_score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.__table.store(key, depth, self.__to_table(best_score, ply), bound, best_move)
+        return best_score
+
+    @staticmethod
+    def __to_table(score, ply):
+        """
+        必胜必败评分换成相对当前局势的步数再存表
+        """
+        if score > WIN_SCORE - MAX_PLY:
+            return score + ply
+        if score < -WIN_SCORE + MAX_PLY:
+            return score - ply
+        return score
+
+    @staticmethod
+    def __from_table(score, ply):
+        if score > WIN_SCORE - MAX_PLY:
+            return score - ply
+        if score < -WIN_SCORE + MAX_PLY:
+            return score + ply
+        return score
+
+    def __ordered_moves(self, player_bits, computer_bits, side, first_move):
+        """
+        走棋方的走法：first_move优先，其次斜吃，其余按历史启发值从高到低
+        """
+        enemy_bits = computer_bits if side == 1 else player_bits
+        moves = self.__rules.legal_moves(player_bits, computer_bits, side)
+        moves.sort(key=lambda move: (enemy_bits >> (move[1] - 1) & 1, self.__history.get(move, 0)), reverse=True)
+        if first_move is not None and first_move in moves:
+            moves.remove(first_move)
+            moves.insert(0, first_move)
+        return moves
+
+    def __evaluate(self, player_bits, computer_bits, side):
+        """
+        走棋方视角的局势评估：兵数和前进行数，己方减对方
+        """
+        score = 0
+        for pawn_side, bits, sign in ((1, player_bits, 1), (2, computer_bits, -1)):
+            values = self.__advance[pawn_side]
+            while bits:
+                low_bit = bits & -bits
+                score += sign * values[low_bit.bit_length() - 1]
+                bits ^= low_bit
+        return score if side == 1 else -score
+
+    """
+    搜索AI没有AI库，下列方法为空操作，以便与HexapawnAI互换
+    """
+
+    def load_dict(self, file_name):
+        pass
+
+    def save_dict(self, file_name):
+        pass
+
+    def set_journal(self, file_name):
+        pass
+
+    def set_writer(self, writer):
+        pass
+
+    def wait_saves(self):
+        pass
+
+    def flush_journal(self):
+        return 0
+
+    def compact(self, file_name):
+        pass
+
+    def remove_wrong_solution(self, board_key, start, end):
+        return False
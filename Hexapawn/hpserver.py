@@ -0,0 +1,325 @@
+"""
+六兵棋对局服务器 Hexapawn game server
+
+不需要Qt的asyncio服务器，一个进程同时服务多个玩家：每个连接是一个会话，包装一个HexapawnController，
+全部会话共用进程内同一份AI库（HexapawnAI.shared）。
+协议为按行分隔的JSON（UTF-8，每行一个对象），客户端每发一行请求，服务器回一行应答：
+    {"op": "new"}                        开始新局，玩家先走   → {"ok": true, "board": [...]}
+    {"op": "move", "start": 8, "end": 5} 玩家走棋（格子编号从1起），电脑随即应答
+                                         → {"ok": true, "board": [...], "computer": [2, 5], "result": 0}
+    {"op": "stats"}                      服务器统计           → {"ok": true, "stats": {...}}
+    {"op": "bye"}                        结束会话
+board为各格数字列表（0=空，1=玩家，2=电脑），result同HexapawnController.check_result：
+2=电脑赢，1=玩家赢，0=继续走；computer为电脑走的[起点, 终点]，电脑没有走（对局已结束或认输）时为null。
+请求有误时应答{"ok": false, "error": "..."}，连接保持。
+输棋后的剪枝不立即改动AI库，先记下，每PRUNE_INTERVAL秒或积累到PRUNE_BATCH条时成批合并进AI库；
+AI库有改动时每SAVE_INTERVAL秒由后台写入线程保存一次AI文件，关闭服务器时合并剩余的剪枝并写完。
+背压：每个会话按顺序逐个处理请求，应答写入缓冲区排空后才读下一个请求，客户端不读应答就不再处理它的请求；
+同时服务的会话数不超过max_sessions，多出的连接等有会话结束再处理。
+空闲或应答超过idle_timeout秒未被读走的会话被关闭。
+
+    python hpserver.py --port 7001
+    python hpserver.py --unix /tmp/hp.sock
+"""
+import argparse
+import asyncio
+import json
+import signal
+
+import hpengine
+import hpmetrics
+import hpstore
+
+MAX_SESSIONS = 256  # 同时服务的会话数上限
+IDLE_TIMEOUT = 60.0  # 会话空闲的秒数上限
+PRUNE_INTERVAL = 0.05  # 合并剪枝的间隔秒数
+PRUNE_BATCH = 256  # 积累这么多条剪枝时立即合并
+SAVE_INTERVAL = 5.0  # 保存AI文件的间隔秒数
+MAX_LINE = 64 * 1024  # 一行请求的最大字节数
+STATS = ("connections", "games", "moves", "rejected", "prunes", "prune_batches", "saves", "reaped")
+
+
+def encode(message):
+    """
+    把应答字典编码成一行JSON
+    """
+    return json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+class DeferredPruneAI:
+    """
+    会话用的AI代理：剪枝记到服务器的待合并列表，其余属性直接转给共用的AI
+    """
+
+    def __init__(self, ai, prunes):
+        self.__ai = ai
+        self.__prunes = prunes
+
+    def __getattr__(self, name):
+        return getattr(self.__ai, name)
+
+    def __contains__(self, board_key):
+        return board_key in self.__ai
+
+    def remove_wrong_solution(self, board_key, start, end):
+        """
+        :return: False，剪枝合并进AI库时才计数
+        """
+        self.__prunes.append((board_key, start, end))
+        return False
+
+
+class GameSession:
+    """
+    一个连接上的对局
+    """
+
+    def __init__(self, controller):
+        self.__controller = controller
+        self.__finished = True  # 须先开始新局
+        self.closed = False  # 客户端已结束会话
+
+    @property
+    def board(self):
+        return self.__controller.board_data
+
+    def new_game(self):
+        self.__controller.init_board()
+        self.__finished = False
+        return {"ok": True, "board": self.board}
+
+    def move(self, start, end):
+        """
+        玩家走一步，未分胜负时电脑随即走一步
+        :return: 应答字典
+        """
+        if self.__finished:
+            return {"ok": False, "error": "对局已结束，请先开始新局"}
+        if any(not isinstance(pos, int) or isinstance(pos, bool) for pos in (start, end)):
+            return {"ok": False, "error": "start和end须为格子编号"}
+        code = self.__controller.player_step(start, end)
+        if code != 0:
+            return {"ok": False, "error": "不能这样走", "code": code}
+        computer = None
+        result = self.__controller.check_result(1)
+        if result == 0:
+            computer_bits = self.__controller.bitboards[1]
+            self.__controller.computer_step()
+            new_bits = self.__controller.bitboards[1]
+            if new_bits != computer_bits:
+                computer = [(computer_bits & ~new_bits).bit_length(), (new_bits & ~computer_bits).bit_length()]
+            result = self.__controller.check_result(2)
+        self.__finished = result != 0
+        return {"ok": True, "board": self.board, "computer": computer, "result": result}
+
+
+class HexapawnServer:
+    """
+    六兵棋对局服务器：全部会话共用一份AI库，剪枝成批合并，AI文件由后台写入线程保存
+    """
+
+    def __init__(self, ai_file_name="hp_ai_file.txt", rules=None, max_sessions=MAX_SESSIONS,
+                 idle_timeout=IDLE_TIMEOUT, metrics=None):
+        """
+        :param metrics: 全部会话共用的运行统计（hpmetrics.ControllerMetrics），None表示不统计
+        """
+        self.__ai_file_name = ai_file_name
+        self.__rules = hpengine.STANDARD_RULES if rules is None else rules
+        self.__max_sessions = max_sessions
+        self.__idle_timeout = idle_timeout
+        self.__metrics = metrics
+        self.__ai = hpengine.HexapawnAI.shared(ai_file_name, self.__rules)
+        self.__writer = hpstore.BackgroundWriter.shared()  # 共用AI库的其他使用者也须用同一个写入线程
+        self.__ai.set_writer(self.__writer)
+        self.__prunes = []  # 待合并的剪枝记录，各会话的DeferredPruneAI共用此列表
+        self.__dirty = False  # AI库在上次保存后是否有改动
+        self.__stats = dict.fromkeys(STATS, 0)
+        self.__active = 0  # 正在服务的会话数
+        self.__waiting = 0  # 等待名额的连接数
+        self.__slots = None  # 会话名额，start时创建
+        self.__streams = set()  # 正在服务的连接，关闭服务器时一并关闭
+        self.__server = None
+        self.__tasks = []
+
+    @property
+    def stats(self):
+        """
+        服务器统计：累计的连接、对局、走棋、被拒绝的请求、合并的剪枝及批数、保存次数、因空闲或不读应答关闭的会话数，
+        以及当前的会话数、等待名额的连接数、待合并的剪枝数和后台写入线程的统计
+        """
+        stats = dict(self.__stats)
+        stats["active"] = self.__active
+        stats["waiting"] = self.__waiting
+        stats["pending_prunes"] = len(self.__prunes)
+        stats["writer"] = self.__writer.stats
+        return stats
+
+    async def start(self, host=None, port=None, path=None):
+        """
+        读取AI库并开始监听，path不为None时使用Unix套接字
+        """
+        self.__ai.load_dict(self.__ai_file_name)
+        self.__slots = asyncio.Semaphore(self.__max_sessions)
+        if path is not None:
+            self.__server = await asyncio.start_unix_server(self.__serve, path, limit=MAX_LINE)
+        else:
+            self.__server = await asyncio.start_server(self.__serve, host, port, limit=MAX_LINE)
+        self.__tasks = [asyncio.create_task(self.__prune_loop()), asyncio.create_task(self.__save_loop())]
+        return self.__server
+
+    async def close(self):
+        """
+        停止监听并关闭全部会话，合并剩余的剪枝，写完AI文件
+        """
+        self.__server.close()
+        for stream in list(self.__streams):
+            stream.close()
+        for task in self.__tasks:
+            task.cancel()
+        await asyncio.gather(*self.__tasks, return_exceptions=True)
+        self.apply_prunes()
+        if self.__dirty:
+            self.save()
+        self.__ai.wait_saves()
+        self.__writer.release()
+
+    def apply_prunes(self):
+        """
+        把待合并的剪枝按记下的顺序成批合并进AI库，重复的剪枝不计数
+        :return: 实际删除的走法数
+        """
+        prunes = self.__prunes[:]
+        del self.__prunes[:]  # 各会话的代理引用同一个列表，只能原地清空
+        pruned = sum(1 for board_key, start, end in prunes if self.__ai.remove_wrong_solution(board_key, start, end))
+        if prunes:
+            self.__stats["prune_batches"] += 1
+        if pruned:
+            self.__dirty = True
+            self.__stats["prunes"] += pruned
+            if self.__metrics is not None:
+                self.__metrics.count("prunes", pruned)
+        return pruned
+
+    def save(self):
+        """
+        取AI库的快照交给后台写入线程，连续的保存合并为一次
+        """
+        self.__ai.save_dict(self.__ai_file_name)
+        self.__dirty = False
+        self.__stats["saves"] += 1
+
+    async def __prune_loop(self):
+        while True:
+            await asyncio.sleep(PRUNE_INTERVAL)
+            self.apply_prunes()
+
+    async def __save_loop(self):
+        while True:
+            await asyncio.sleep(SAVE_INTERVAL)
+            if self.__dirty:
+                self.save()
+
+    def handle(self, session, line):
+        """
+        处理一行请求
+        :return: 应答字典
+        """
+        try:
+            request = json.loads(line)
+        except ValueError:
+            request = None
+        if not isinstance(request, dict):
+            self.__stats["rejected"] += 1
+            return {"ok": False, "error": "请求须为一行JSON对象"}
+        op = request.get("op")
+        if op == "new":
+            self.__stats["games"] += 1
+            return session.new_game()
+        if op == "move":
+            response = session.move(request.get("start"), request.get("end"))
+            self.__stats["moves" if response["ok"] else "rejected"] += 1
+            if len(self.__prunes) >= PRUNE_BATCH:
+                self.apply_prunes()
+            return response
+        if op == "stats":
+            return {"ok": True, "stats": self.stats}
+        if op == "bye":
+            session.closed = True
+            return {"ok": True}
+        self.__stats["rejected"] += 1
+        return {"ok": False, "error": "未知的请求：%s" % op}
+
+    async def __serve(self, reader, writer):
+        self.__stats["connections"] += 1
+        self.__waiting += 1
+        async with self.__slots:  # 会话数达到上限时新连接在此等待，请求留在套接字缓冲区中
+            self.__waiting -= 1
+            self.__active += 1
+            self.__streams.add(writer)
+            controller = hpengine.HexapawnController(self.__ai_file_name, ai=DeferredPruneAI(self.__ai, self.__prunes),
+                                                     rules=self.__rules, metrics=self.__metrics)
+            session = GameSession(controller)
+            try:
+                while not session.closed:
+                    try:
+                        line = await asyncio.wait_for(reader.readline(), self.__idle_timeout)
+                    except asyncio.TimeoutError:
+                        self.__stats["reaped"] += 1
+                        break
+                    except ValueError:
+                        writer.write(encode({"ok": False, "error": "请求过长"}))  # 超出MAX_LINE后无法再分行，结束会话
+                        break
+                    if not line:
+                        break
+                    response = self.handle(session, line)
+                    writer.write(encode(response))
+                    try:
+                        await asyncio.wait_for(writer.drain(), self.__idle_timeout)  # 客户端读得慢时在此等待，不再读它的请求
+                    except asyncio.TimeoutError:
+                        self.__stats["reaped"] += 1  # 一直不读应答的客户端同空闲的会话一样关闭
+                        writer.transport.abort()  # 缓冲区里的应答发不出去，直接断开，不等写完
+                        break
+            except ConnectionError:
+                pass
+            finally:
+                self.__active -= 1
+                self.__streams.discard(writer)
+                writer.close()
+
+
+async def serve(server, host=None, port=None, path=None):
+    """
+    运行服务器直到收到SIGINT或SIGTERM
+    """
+    await server.start(host, port, path)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signal_number, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows的事件循环不支持信号处理，由KeyboardInterrupt结束
+    try:
+        await stop.wait()
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="六兵棋对局服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7001)
+    parser.add_argument("--unix", default=None, help="Unix套接字路径，设置后不监听TCP端口")
+    parser.add_argument("--width", type=int, default=3)
+    parser.add_argument("--height", type=int, default=3)
+    parser.add_argument("--ai-file", default="hp_ai_file.txt")
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS, help="同时服务的会话数上限")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT, help="会话空闲的秒数上限")
+    parser.add_argument("--metrics", default=None, help="启用运行统计，退出时写入此JSON文件")
+    args = parser.parse_args()
+    controller_metrics = None if args.metrics is None else hpmetrics.ControllerMetrics()
+    game_server = HexapawnServer(args.ai_file, hpengine.HexapawnRules(args.width, args.height),
+                                 args.max_sessions, args.idle_timeout, controller_metrics)
+    asyncio.run(serve(game_server, args.host, args.port, args.unix))
+    if controller_metrics is not None:
+        controller_metrics.dump(args.metrics)
@@ -0,0 +1,152 @@
+"""
+六兵棋AI库生成器 Hexapawn offline solver
+
+用带置换表的负极大值搜索求出全部局势的胜负，直接生成AI库，不必靠对局训练：
+    perfect     每个局势只保留最优走法，必败局势保留全部走法
+    non-losing  每个局势保留全部不输的走法，必败局势不记录（电脑认输），即训练收敛后的AI库
+    all         每个局势保留全部合法走法，不做搜索，即训练前的AI库，用于在新尺寸的棋盘上开始训练
+六兵棋没有和棋，标准3×3棋盘上后走的电脑方必胜，perfect和non-losing在电脑按AI库走棋时遇到的局势上结果相同。
+AI库只收录玩家先走、电脑按AI库走棋时能遇到的局势，键为规范局势编码字串，可写成文本或二进制格式。
+棋盘尺寸见hpengine.HexapawnRules，默认为标准3×3棋盘。
+"""
+import argparse
+import time
+
+import hpengine
+import hpstore
+
+MODES = ("perfect", "non-losing", "all")
+
+
+def apply_move(player_bits, computer_bits, side, move):
+    """
+    走一步棋
+    :return: 走棋后的(玩家位棋盘, 电脑位棋盘)
+    """
+    start_bit, end_bit = 1 << (move[0] - 1), 1 << (move[1] - 1)
+    if side == 1:
+        return player_bits ^ (start_bit | end_bit), computer_bits & ~end_bit
+    return player_bits & ~end_bit, computer_bits ^ (start_bit | end_bit)
+
+
+def negamax(player_bits, computer_bits, side, memo, rules=hpengine.STANDARD_RULES):
+    """
+    以走棋方视角评估局势：1=必胜，-1=必败（六兵棋没有和棋）
+    :param memo: 置换表，键为(玩家位棋盘, 电脑位棋盘, 走棋方)
+    :param rules: 棋盘规则
+    """
+    if side == 1 and computer_bits & rules.bottom_row or side == 2 and player_bits & rules.top_row:
+        return -1  # 对方已走到末线
+    key = (player_bits, computer_bits, side)
+    if key not in memo:
+        moves = rules.legal_moves(player_bits, computer_bits, side)
+        if len(moves) == 0:
+            memo[key] = -1  # 无棋可走判负
+        else:
+            memo[key] = max(-negamax(*apply_move(player_bits, computer_bits, side, move), 3 - side, memo, rules)
+                            for move in moves)
+    return memo[key]
+
+
+def move_scores(player_bits, computer_bits, side, memo, rules=hpengine.STANDARD_RULES):
+    """
+    走棋方各走法的评估值
+    :return: (评估值, (起点格编号, 终点格编号)) 列表
+    """
+    return [(-negamax(*apply_move(player_bits, computer_bits, side, move), 3 - side, memo, rules), move)
+            for move in rules.legal_moves(player_bits, computer_bits, side)]
+
+
+def best_moves(player_bits, computer_bits, side, memo, rules=hpengine.STANDARD_RULES):
+    """
+    走棋方的全部最优走法
+    :return: (起点格编号, 终点格编号) 列表
+    """
+    scores = move_scores(player_bits, computer_bits, side, memo, rules)
+    best_score = max(score for score, _ in scores)
+    return [move for score, move in scores if score == best_score]
+
+
+def _finished(player_bits, computer_bits, side, rules):
+    """
+    走棋方刚走完后对局是否结束，规则同HexapawnController.check_result
+    """
+    if player_bits & rules.top_row or computer_bits & rules.bottom_row:
+        return True
+    return not rules.has_moves(player_bits, computer_bits, 3 - side)
+
+
+def solve(mode="perfect", rules=hpengine.STANDARD_RULES):
+    """
+    生成AI库
+    :param mode: 生成方式，见MODES
+    :param rules: 棋盘规则
+    :return: (AI库字典（键为规范局势编码字串，必败局势在non-losing方式下走法为空列表）, 置换表大小)
+    """
+    memo = dict()
+    ai_dict = dict()
+    pending = [rules.init_bits]  # 轮到玩家走的局势
+    while pending:
+        player_bits, computer_bits = pending.pop()
+        for move in rules.legal_moves(player_bits, computer_bits, 1):
+            next_player_bits, next_computer_bits = apply_move(player_bits, computer_bits, 1, move)
+            if _finished(next_player_bits, next_computer_bits, 1, rules):
+                continue
+            board_key = rules.canonical_board(rules.board_key(next_player_bits, next_computer_bits))[0]
+            if board_key in ai_dict:
+                continue
+            canon_player_bits, canon_computer_bits = rules.board_bits(board_key)  # 在规范局势上求走法
+            if mode == "all":
+                steps = rules.legal_moves(canon_player_bits, canon_computer_bits, 2)
+            else:
+                scores = move_scores(canon_player_bits, canon_computer_bits, 2, memo, rules)
+                if mode == "perfect":
+                    best_score = max(score for score, _ in scores)
+                    steps = [step for score, step in scores if score == best_score]
+                else:
+                    steps = [step for score, step in scores if score >= 0]
+            ai_dict[board_key] = ["%d-%d" % step for step in steps]
+            for step in steps:
+                after = apply_move(canon_player_bits, canon_computer_bits, 2, step)
+                if not _finished(*after, 2, rules):
+                    pending.append(after)
+    return ai_dict, len(memo)
+
+
+def generate(file_name, mode="perfect", binary=False, rules=hpengine.STANDARD_RULES):
+    """
+    生成AI库并写入AI文件
+    :param binary: 是否写成二进制格式
+    :return: 生成报告字典
+    """
+    start_time = time.perf_counter()
+    ai_dict, memo_size = solve(mode, rules)
+    solve_time = time.perf_counter()
+    if binary:
+        hpstore.write_store(file_name, ai_dict, hpstore.FLAG_CANONICAL, rules.width, rules.height)
+    else:
+        with open(file_name, "w") as file:
+            file.write(hpstore.format_text(ai_dict))
+    end_time = time.perf_counter()
+    return {
+        "mode": mode,
+        "positions": sum(1 for val in ai_dict.values() if len(val) > 0),
+        "lost_positions": sum(1 for val in ai_dict.values() if len(val) == 0),
+        "transpositions": memo_size,
+        "solve_seconds": solve_time - start_time,
+        "write_seconds": end_time - solve_time
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="六兵棋AI库生成器")
+    parser.add_argument("--mode", choices=MODES, default="perfect")
+    parser.add_argument("--binary", action="store_true", help="写成二进制AI库")
+    parser.add_argument("--width", type=int, default=3)
+    parser.add_argument("--height", type=int, default=3)
+    parser.add_argument("ai_file")
+    args = parser.parse_args()
+    report = generate(args.ai_file, args.mode, args.binary, hpengine.HexapawnRules(args.width, args.height))
+    print("%d条局势已写入%s，必败局势%d条，置换表%d项" % (
+        report["positions"], args.ai_file, report["lost_positions"], report["transpositions"]))
+    print("搜索用时%.1f毫秒，写入用时%.1f毫秒" % (report["solve_seconds"] * 1000, report["write_seconds"] * 1000))
@@ -0,0 +1,325 @@
+"""
+六兵棋残局库 Hexapawn retrograde tablebase
+
+按子力（玩家兵数, 电脑兵数）从少到多逐类求解：同一类中直走只会走到推进更多的局势，
+吃子只会走到子力更少的类，所以按推进总步数从多到少处理时，每个局势的全部后继都已求得，
+从终局往回推出每个局势（双方各自走棋时）的胜负和到终局的步数。
+
+局势编号：玩家兵只可能在最上一行以外，电脑兵只可能在最下一行以外，
+某类子力的局势编号 = 该类起始编号 + 玩家兵格位组合序号 × 电脑兵组合数 + 电脑兵格位组合序号，
+再乘2加走棋方。双方兵重叠的编号空置，记为VALUE_NONE。
+
+残局库文件：
+    文件头16字节：魔数(4s) 版本(H) 棋盘宽(B) 棋盘高(B) 局势数(I) 标志(H) 保留(H)，小端
+    胜负表：每个局势2位，每字节依次存4个局势（低位在前）
+    标志位FLAG_DISTANCE表示其后另有步数表：每个局势1字节，为走棋方到终局的步数
+"""
+import argparse
+import itertools
+import math
+import random
+import struct
+import time
+
+import hpengine
+import hpsolver
+
+TABLEBASE_MAGIC = b"HPTB"
+TABLEBASE_VERSION = 1
+FLAG_DISTANCE = 1  # 标志位：文件含步数表
+VALUE_NONE = 0  # 不存在的局势
+VALUE_WIN = 1  # 走棋方必胜
+VALUE_LOSS = 2  # 走棋方必败
+
+_HEADER = struct.Struct("<4sHBBIHH")
+
+
+class PositionIndex:
+    """
+    局势编号
+    """
+
+    def __init__(self, rules):
+        self.__rules = rules
+        width, size = rules.width, rules.size
+        player_cells = range(width, size)  # 玩家兵可在的格位
+        computer_cells = range(0, size - width)  # 电脑兵可在的格位
+        self.__region_size = len(player_cells)
+        self.__player_ranks = dict()  # 玩家位棋盘 -> 组合序号
+        self.__computer_ranks = dict()
+        self.__player_sets = []  # 按兵数分组的玩家位棋盘及推进步数
+        self.__computer_sets = []
+        for count in range(width + 1):
+            self.__player_sets.append(self.__combinations(player_cells, count, self.__player_ranks,
+                                                          lambda i: rules.height - 1 - i // width))
+            self.__computer_sets.append(self.__combinations(computer_cells, count, self.__computer_ranks,
+                                                            lambda i: i // width))
+        self.__offsets = dict()  # (玩家兵数, 电脑兵数) -> 起始编号
+        total = 0
+        for player_count in range(width + 1):
+            for computer_count in range(width + 1):
+                self.__offsets[(player_count, computer_count)] = total
+                total += math.comb(self.__region_size, player_count) * math.comb(self.__region_size, computer_count)
+        self.__size = total * 2
+
+    @staticmethod
+    def __combinations(cells, count, ranks, advance):
+        """
+        按序号列出格位组合
+        :return: (位棋盘, 推进步数) 列表，下标即组合序号
+        """
+        result = []
+        for combination in itertools.combinations(cells, count):
+            bits = sum(1 << i for i in combination)
+            ranks[bits] = len(result)
+            result.append((bits, sum(advance(i) for i in combination)))
+        return result
+
+    @property
+    def rules(self):
+        return self.__rules
+
+    @property
+    def size(self):
+        """
+        局势编号总数（含空置编号）
+        """
+        return self.__size
+
+    def materials(self):
+        """
+        全部子力类，按总兵数从少到多排列
+        :return: (玩家兵数, 电脑兵数) 列表
+        """
+        return sorted(self.__offsets, key=sum)
+
+    def positions(self, material):
+        """
+        该类子力的全部局势，按推进总步数从多到少排列
+        :return: (玩家位棋盘, 电脑位棋盘) 列表
+        """
+        player_count, computer_count = material
+        boards = [(player_advance + computer_advance, player_bits, computer_bits)
+                  for player_bits, player_advance in self.__player_sets[player_count]
+                  for computer_bits, computer_advance in self.__computer_sets[computer_count]
+                  if not player_bits & computer_bits]
+        boards.sort(reverse=True)
+        return [(player_bits, computer_bits) for _, player_bits, computer_bits in boards]
+
+    def index(self, player_bits, computer_bits, side):
+        """
+        局势编号
+        :param side: 走棋方，1=玩家，2=电脑
+        """
+        player_rank = self.__player_ranks[player_bits]
+        computer_rank = self.__computer_ranks[computer_bits]
+        offset = self.__offsets[(bin(player_bits).count("1"), bin(computer_bits).count("1"))]
+        computer_total = math.comb(self.__region_size, bin(computer_bits).count("1"))
+        return (offset + player_rank * computer_total + computer_rank) * 2 + side - 1
+
+
+class HexapawnTablebase:
+    """
+    六兵棋残局库：查询任一局势的胜负和最佳走法
+    """
+
+    def __init__(self, rules, values, distances=None):
+        """
+        :param values: 每个局势2位的胜负表
+        :param distances: 每个局势1字节的步数表，None表示没有步数表
+        """
+        self.__index = PositionIndex(rules)
+        self.__values = values
+        self.__distances = distances
+
+    @property
+    def rules(self):
+        return self.__index.rules
+
+    @property
+    def size(self):
+        return self.__index.size
+
+    def value(self, player_bits, computer_bits, side):
+        """
+        走棋方视角的胜负
+        :return: VALUE_WIN或VALUE_LOSS
+        """
+        position = self.__index.index(player_bits, computer_bits, side)
+        return self.__values[position >> 2] >> ((position & 3) * 2) & 3
+
+    def distance(self, player_bits, computer_bits, side):
+        """
+        走棋方到终局的步数，没有步数表时返回None
+        """
+        if self.__distances is None:
+            return None
+        return self.__distances[self.__index.index(player_bits, computer_bits, side)]
+
+    def __score(self, player_bits, computer_bits, side, move):
+        """
+        走法评分，越大越好：必胜走法按步数从少到多，必败走法按步数从多到少
+        """
+        rules = self.__index.rules
+        next_player_bits, next_computer_bits = hpsolver.apply_move(player_bits, computer_bits, side, move)
+        if next_player_bits & rules.top_row or next_computer_bits & rules.bottom_row:
+            return 1 << 16  # 走到末线直接赢
+        if self.value(next_player_bits, next_computer_bits, 3 - side) == VALUE_LOSS:
+            return (1 << 16) - (self.distance(next_player_bits, next_computer_bits, 3 - side) or 0)
+        return self.distance(next_player_bits, next_computer_bits, 3 - side) or 0
+
+    def best_moves(self, player_bits, computer_bits, side):
+        """
+        走棋方的全部最佳走法：有必胜走法时取最快赢的，否则取最晚输的
+        :return: (起点格编号, 终点格编号) 列表，无棋可走时为空列表
+        """
+        scores = [(self.__score(player_bits, computer_bits, side, move), move)
+                  for move in self.__index.rules.legal_moves(player_bits, computer_bits, side)]
+        if len(scores) == 0:
+            return []
+        best_score = max(score for score, _ in scores)
+        return [move for score, move in scores if score == best_score]
+
+    def get_move(self, player_bits, computer_bits, side):
+        """
+        从最佳走法中随机选一个
+        :return: (起点格编号, 终点格编号)，无棋可走时返回None
+        """
+        moves = self.best_moves(player_bits, computer_bits, side)
+        if len(moves) == 0:
+            return None
+        return moves[random.randint(0, len(moves) - 1)]
+
+    def save(self, file_name, with_distance=False):
+        """
+        写入残局库文件
+        :param with_distance: 是否写入步数表
+        """
+        with_distance = with_distance and self.__distances is not None
+        rules = self.__index.rules
+        with open(file_name, "wb") as file:
+            file.write(_HEADER.pack(TABLEBASE_MAGIC, TABLEBASE_VERSION, rules.width, rules.height, self.size,
+                                    FLAG_DISTANCE if with_distance else 0, 0))
+            file.write(self.__values)
+            if with_distance:
+                file.write(self.__distances)
+
+    @classmethod
+    def load(cls, file_name):
+        """
+        读取残局库文件
+        """
+        with open(file_name, "rb") as file:
+            data = file.read()
+        if len(data) < _HEADER.size:
+            raise ValueError("残局库文件不完整：" + file_name)
+        magic, version, width, height, count, flags, _ = _HEADER.unpack_from(data, 0)
+        if magic != TABLEBASE_MAGIC or version != TABLEBASE_VERSION:
+            raise ValueError("不支持的残局库文件：" + file_name)
+        values_end = _HEADER.size + (count + 3) // 4
+        expected = values_end + (count if flags & FLAG_DISTANCE else 0)
+        if len(data) != expected:
+            raise ValueError("残局库文件不完整：" + file_name)
+        values = data[_HEADER.size:values_end]
+        distances = data[values_end:] if flags & FLAG_DISTANCE else None
+        return cls(hpengine.HexapawnRules(width, height), values, distances)
+
+
+def _pack(values):
+    """
+    每个局势1字节的胜负表压缩成每个局势2位
+    """
+    packed = bytearray((len(values) + 3) // 4)
+    for position, value in enumerate(values):
+        if value:
+            packed[position >> 2] |= value << ((position & 3) * 2)
+    return bytes(packed)
+
+
+def generate(rules):
+    """
+    逆向求解全部局势
+    :return: (残局库, 有效局势数)
+    """
+    index = PositionIndex(rules)
+    values = bytearray(index.size)
+    distances = bytearray(index.size)
+    solved = 0
+    for material in index.materials():
+        for player_bits, computer_bits in index.positions(material):
+            for side in (1, 2):
+                win_distance, loss_distance = None, 0
+                for move in rules.legal_moves(player_bits, computer_bits, side):
+                    next_player_bits, next_computer_bits = hpsolver.apply_move(player_bits, computer_bits, side, move)
+                    if next_player_bits & rules.top_row or next_computer_bits & rules.bottom_row:
+                        win_distance = 0  # 走到末线直接赢
+                        break
+                    child = index.index(next_player_bits, next_computer_bits, 3 - side)
+                    if values[child] == VALUE_LOSS:
+                        if win_distance is None or distances[child] < win_distance:
+                            win_distance = distances[child]
+                    else:
+                        loss_distance = max(loss_distance, distances[child] + 1)
+                position = index.index(player_bits, computer_bits, side)
+                if win_distance is None:
+                    values[position] = VALUE_LOSS  # 全部走法都输或无棋可走
+                    distances[position] = min(loss_distance, 255)
+                else:
+                    values[position] = VALUE_WIN
+                    distances[position] = min(win_distance + 1, 255)
+                solved += 1
+    return HexapawnTablebase(rules, _pack(values), bytes(distances)), solved
+
+
+def benchmark(sizes):
+    """
+    生成各尺寸棋盘的残局库并统计用时和大小
+    :param sizes: (宽, 高) 列表
+    :return: 报告字典列表
+    """
+    reports = []
+    for width, height in sizes:
+        rules = hpengine.HexapawnRules(width, height)
+        start_time = time.perf_counter()
+        tablebase, solved = generate(rules)
+        elapsed = time.perf_counter() - start_time
+        init_player_bits, init_computer_bits = rules.init_bits
+        reports.append({
+            "width": width,
+            "height": height,
+            "positions": solved,
+            "slots": tablebase.size,
+            "table_bytes": (tablebase.size + 3) // 4,
+            "seconds": elapsed,
+            "first_player_wins": tablebase.value(init_player_bits, init_computer_bits, 1) == VALUE_WIN
+        })
+    return reports
+
+
+def _parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="六兵棋残局库")
+    parser.add_argument("--width", type=int, default=3)
+    parser.add_argument("--height", type=int, default=3)
+    parser.add_argument("--distance", action="store_true", help="同时写入步数表")
+    parser.add_argument("--benchmark", nargs="*", metavar="WxH", help="生成各尺寸棋盘的残局库并统计，默认3x3 3x4 4x3 4x4")
+    parser.add_argument("output", nargs="?")
+    args = parser.parse_args()
+    if args.benchmark is not None:
+        for report in benchmark([_parse_size(size) for size in args.benchmark or ["3x3", "3x4", "4x3", "4x4"]]):
+            print("%d×%d：局势%d，胜负表%d字节（%d个编号），用时%.2f秒，先手%s" % (
+                report["width"], report["height"], report["positions"], report["table_bytes"], report["slots"],
+                report["seconds"], "必胜" if report["first_player_wins"] else "必败"))
+    elif args.output is not None:
+        board_rules = hpengine.HexapawnRules(args.width, args.height)
+        start = time.perf_counter()
+        result, count = generate(board_rules)
+        seconds = time.perf_counter() - start
+        result.save(args.output, args.distance)
+        print("%d×%d残局库已写入%s：局势%d，用时%.2f秒" % (args.width, args.height, args.output, count, seconds))
+    else:
+        parser.print_help()
@@ -1,32 +1,136 @@
 # This Python file uses the following encoding: utf-8
+import time
+IMPORT_START_NS = time.perf_counter_ns()  # 启动计时的起点：开始导入本模块的依赖
+import argparse
+import collections
+import json
+import random
 import sys
+import threading
 import hpengine
+import hpmcts
+import hpmetrics
+import hpresources
+import hpsearch
+import hpstore
+import hptrain
 
-from PyQt6.QtWidgets import QApplication, QWidget, QGraphicsScene, QMessageBox
-from PyQt6 import QtGui, QtCore
+from PyQt6.QtWidgets import QApplication, QWidget, QMessageBox
+from PyQt6 import QtCore
 
 from ui_form import Ui_QHpWidget
-import rc_hpres
+
+IMPORT_NS = time.perf_counter_ns() - IMPORT_START_NS  # 导入依赖的耗时
+ENGINES = ("matchbox", "search", "mcts")  # 电脑走棋方式：AI库、alpha-beta搜索、蒙特卡洛树搜索
+THINK_DELAY = 300  # 玩家走后电脑落子前停顿的默认毫秒数
+LOSS_WINDOW = 1000  # 自动对局的败率按最近这么多局计算
+STATS_INTERVAL = 0.5  # 自动对局时刷新窗口标题中统计的最短秒数
 
 class QHpWidget(QWidget):
-    def __init__(self, parent=None):
+    ai_ready = QtCore.pyqtSignal()  # AI库读完，电脑可以走棋
+    _ai_loaded = QtCore.pyqtSignal(object, object)  # 后台读取结束：读取的纳秒数，读取时的异常或None
+    _computer_stepped = QtCore.pyqtSignal(object)  # 后台走棋结束：走棋时的异常或None
+    _autoplayed = QtCore.pyqtSignal(object, object)  # 后台一批自动对局结束：各局结果列表，对局时的异常或None
+
+    def __init__(self, parent=None, ai=None, metrics=None, load_async=True, think_delay=THINK_DELAY, opponent=None,
+                 turbo=0):
+        """
+        :param load_async: 是否先显示窗口，在线程池中读取AI库，读完前玩家可以先走，电脑等ai_ready再走
+        :param think_delay: 玩家走后电脑落子前停顿的毫秒数，0表示立即在线程池中走棋
+        :param opponent: 自动对局时代替玩家走棋的对手引擎（hptrain.OPPONENTS中的对象），None表示由玩家点击
+        :param turbo: 自动对局时大于0表示快速模式：在线程池中连续下turbo局后才重画一次棋盘、更新一次AI文件，
+                      不弹出结果对话框
+        """
         super().__init__(parent)
+        self.__metrics = metrics
+        self.__startup = dict()  # 启动各阶段的纳秒数
+        self.__record_startup("imports", IMPORT_NS)
+        start = time.perf_counter_ns()
         self.ui = Ui_QHpWidget()
         self.ui.setupUi(self)
-        self.__cell_list = [self.ui.hpgv_0, self.ui.hpgv_1, self.ui.hpgv_2, self.ui.hpgv_3, self.ui.hpgv_4, self.ui.hpgv_5, self.ui.hpgv_6, self.ui.hpgv_7, self.ui.hpgv_8]
-        for cell_num in range(len(self.__cell_list)):
-            self.__cell_list[cell_num].set_cell_value(cell_num)
-            self.__cell_list[cell_num].click_signal.connect(self.cell_click)
+        self.__record_startup("setup_ui", time.perf_counter_ns() - start)
+        self.__title = self.windowTitle()
+        self.ui.hpboard.resources_registered.connect(
+            lambda elapsed_ns: self.__record_startup("resources", elapsed_ns))  # 图片资源在第一次画棋盘时才注册
+        self.ui.hpboard.click_signal.connect(self.cell_click)
         self.__game_finished = False
         self.__turn = 0
         self.__player_select = -1
-        self.__controller = hpengine.HexapawnController()
-        self.__timer = QtCore.QTimer(self)
-        self.__timer.setInterval(1000)
-        self.__timer.timeout.connect(self.on_timer)
+        self.__writer = hpstore.BackgroundWriter.shared()  # 保存AI的后台线程，与同一进程的其他窗口共用，最后一个窗口关闭时写完
+        self.__controller = hpengine.HexapawnController(ai=ai, metrics=metrics,
+            writer=self.__writer)  # 保存AI交给后台线程，连续几局的保存合并为一次
+        self.__think_timer = QtCore.QTimer(self)  # 只在轮到电脑时启动一次，局间和玩家思考时不唤醒
+        self.__think_timer.setSingleShot(True)
+        self.__think_timer.setInterval(think_delay)
+        self.__think_timer.timeout.connect(self.__start_computer_step)
+        self.__computer_idle = threading.Event()  # 线程池中没有电脑在走棋，关闭窗口时等它走完
+        self.__computer_idle.set()
+        self._computer_stepped.connect(self.__on_computer_stepped)
+        self.__opponent = opponent
+        self.__turbo = turbo
+        self.__closing = False  # 关闭窗口后不再开始新的自动对局
+        self.__opponent_timer = QtCore.QTimer(self)  # 自动对局时对手走棋、开始下一局前的停顿
+        self.__opponent_timer.setSingleShot(True)
+        self.__opponent_timer.setInterval(think_delay)
+        self.__opponent_timer.timeout.connect(self.__opponent_step)
+        self._autoplayed.connect(self.__on_autoplayed)
+        self.__results = {1: 0, 2: 0, -1: 0}  # 自动对局中各结果的局数
+        self.__recent_losses = collections.deque(maxlen=LOSS_WINDOW)  # 最近各局电脑是否输棋
+        self.__stats_time = time.perf_counter()  # 上次刷新统计的时间和局数
+        self.__stats_games = 0
+        self.__games_per_second = 0.0
+        self.__ai_ready = False
+        self.__ai_loaded_event = threading.Event()  # 关闭窗口时等后台读取结束
+        self._ai_loaded.connect(self.__on_ai_loaded)
+        self.ai_ready.connect(self.schedule_computer_step)  # 轮到电脑时AI库读完就走
+        self.ai_ready.connect(self.__start_autoplay)
         self.new_game()
+        if load_async:
+            QtCore.QThreadPool.globalInstance().start(self.__load_ai)
+        else:
+            self.__load_ai()
+
+    @property
+    def startup_timings(self):
+        """
+        启动各阶段的纳秒数：imports、setup_ui、resources（本窗口的棋盘第一次画图时注册图片资源才有）、ai_load，
+        以及从开始导入到AI库读完的ready
+        """
+        return dict(self.__startup)
+
+    def __record_startup(self, phase, elapsed_ns):
+        self.__startup[phase] = elapsed_ns
+        if self.__metrics is not None:
+            self.__metrics.histogram("startup." + phase).record(elapsed_ns)
+
+    def __load_ai(self):
+        """
+        读取AI库，可在线程池中执行，结束后由_ai_loaded转到界面线程
+        """
+        start = time.perf_counter_ns()
+        error = None
+        try:
+            self.__controller.init_ai()
+        except Exception as exc:
+            error = exc
+        self.__ai_loaded_event.set()
+        self._ai_loaded.emit(time.perf_counter_ns() - start, error)
+
+    def __on_ai_loaded(self, elapsed_ns, error):
+        if error is not None:
+            # 在槽中抛出异常会使PyQt6结束进程；AI库读取失败时提示后不再让电脑走棋
+            QMessageBox.critical(self, None, "无法读取AI库，电脑不能走棋：%s" % error)
+            return
+        self.__record_startup("ai_load", elapsed_ns)
+        self.__record_startup("ready", time.perf_counter_ns() - IMPORT_START_NS)
+        self.__ai_ready = True
+        self.ai_ready.emit()
 
     def cell_click(self, value):
+        if self.__opponent is not None:
+            return  # 自动对局时由对手引擎走棋
+        if self.__turn == 1 and not self.__game_finished:
+            return  # 电脑走棋时（包括等AI库读完）不接受玩家走棋
         if not self.__game_finished:
             board_data = self.__controller.board_data
             if board_data[value] == 1:
@@ -36,61 +140,164 @@ class QHpWidget(QWidget):
                 test = self.__controller.player_step(self.__player_select + 1, value + 1)
                 if test == 0:
                     self.__player_select = -1
-                    self.paint_cells()
-                    self.check_result()
-                    self.change_side()
+                    self.__player_stepped()
         else:
             self.new_game()
 
+    def __player_stepped(self):
+        """
+        玩家方走完一步：重画、判定结果、交给电脑走棋
+        """
+        self.paint_cells()
+        self.check_result()
+        self.change_side()
+        self.schedule_computer_step()
+
     def new_game(self):
         self.__game_finished = False
         self.__turn = 0
         self.__player_select = -1
         self.__controller.init_board()
-        self.__controller.init_ai()
+        if self.__ai_ready:
+            self.__controller.init_ai()  # 第一局的AI库在__load_ai中读取
         self.paint_cells()
-        self.__timer.start()
-
-    def paint_cells(self):
-        board_data = self.__controller.board_data
-        for cell_num in range(len(self.__cell_list)):
-            scene = QGraphicsScene()
-            pen = QtGui.QPen()
-            brush = QtGui.QBrush()
-            pen.setStyle(QtCore.Qt.PenStyle.SolidLine)
-            pen.setWidth(1)
-            if cell_num % 2 == 0:
-                pen.setColor(QtCore.Qt.GlobalColor.white)
-                brush.setStyle(QtCore.Qt.BrushStyle.SolidPattern)
-                brush.setColor(QtCore.Qt.GlobalColor.white)
-            else:
-                pen.setColor(QtCore.Qt.GlobalColor.lightGray)
-                brush.setStyle(QtCore.Qt.BrushStyle.SolidPattern)
-                brush.setColor(QtCore.Qt.GlobalColor.lightGray)
-            if cell_num == self.__player_select:
-                pen.setColor(QtCore.Qt.GlobalColor.red)
-            scene.addRect(0, 0, self.__cell_list[cell_num].width() - 1, self.__cell_list[cell_num].height() - 1, pen, brush)
-            if board_data[cell_num] == 0:
-                pixmap = QtGui.QPixmap(":/hp/images/blank.png")
-                pixmap = pixmap.scaled(self.__cell_list[cell_num].width(), self.__cell_list[cell_num].height())
-                scene.addPixmap(pixmap)
-            if board_data[cell_num] == 1:
-                pixmap = QtGui.QPixmap(":/hp/images/black.png")
-                pixmap = pixmap.scaled(self.__cell_list[cell_num].width(), self.__cell_list[cell_num].height())
-                scene.addPixmap(pixmap)
-            if board_data[cell_num] == 2:
-                pixmap = QtGui.QPixmap(":/hp/images/white.png")
-                pixmap = pixmap.scaled(self.__cell_list[cell_num].width(), self.__cell_list[cell_num].height())
-                scene.addPixmap(pixmap)
-            self.__cell_list[cell_num].setScene(scene)
-
-    def on_timer(self):
-        if not self.__game_finished:
-            if self.__turn == 1:
-                self.__controller.computer_step()
-                self.paint_cells()
-                self.check_result()
-                self.change_side()
+        if self.__opponent is not None and not self.__turbo:
+            self.__opponent_timer.start()
+
+    def closeEvent(self, event):
+        self.__closing = True
+        self.__ai_loaded_event.wait()
+        self.__think_timer.stop()
+        self.__opponent_timer.stop()
+        self.__computer_idle.wait()
+        self.__controller.close_ai()
+        self.__writer.release()
+        super().closeEvent(event)
+
+    def paint_cells(self, board_data=None):
+        """
+        重画数字或选中状态与上次不同的格
+        :param board_data: 各格数字列表，None表示取控制器的当前局势
+        :return: 重画的格数
+        """
+        if board_data is None:
+            board_data = self.__controller.board_data
+        return self.ui.hpboard.set_cells(board_data, self.__player_select)
+
+    def schedule_computer_step(self):
+        """
+        轮到电脑且AI库已读完时，停顿think_delay毫秒后在线程池中走棋，其他时候什么也不做
+        """
+        if not self.__game_finished and self.__ai_ready and self.__turn == 1 and self.__computer_idle.is_set():
+            self.__think_timer.start()
+
+    def __start_computer_step(self):
+        if self.__game_finished or self.__turn != 1:
+            return
+        self.__computer_idle.clear()
+        QtCore.QThreadPool.globalInstance().start(self.__computer_step)
+
+    def __computer_step(self):
+        """
+        电脑走棋，在线程池中执行，结束后由_computer_stepped转到界面线程；走棋期间界面不改动控制器
+        """
+        error = None
+        try:
+            self.__controller.computer_step()
+        except Exception as exc:
+            error = exc
+        self.__computer_idle.set()
+        self._computer_stepped.emit(error)
+
+    def __on_computer_stepped(self, error):
+        if error is not None:
+            QMessageBox.critical(self, None, "电脑走棋出错，本局结束：%s" % error)  # 不在槽中抛出异常，以免PyQt6结束进程
+            self.__game_finished = True
+            return
+        self.paint_cells()
+        self.check_result()
+        self.change_side()
+        if self.__opponent is not None and not self.__closing:
+            self.__opponent_timer.start()  # 停顿后对手走棋，或一局结束后开始下一局
+
+    @property
+    def autoplay_stats(self):
+        """
+        自动对局统计：局数，电脑的胜、负、和局数，最近一次刷新时的每秒局数，最近LOSS_WINDOW局中电脑的败率
+        """
+        return {
+            "games": sum(self.__results.values()),
+            "wins": self.__results[2],
+            "losses": self.__results[1],
+            "draws": self.__results[-1],
+            "games_per_second": self.__games_per_second,
+            "loss_rate": sum(self.__recent_losses) / len(self.__recent_losses) if self.__recent_losses else 0.0
+        }
+
+    def __start_autoplay(self):
+        if self.__opponent is None or self.__closing:
+            return
+        if sum(self.__results.values()) == 0:
+            self.__stats_time = time.perf_counter()  # 每秒局数从开始自动对局时算起
+        if self.__turbo:
+            self.__computer_idle.clear()
+            QtCore.QThreadPool.globalInstance().start(self.__autoplay_batch)
+        elif not self.__game_finished and self.__turn == 0:
+            self.__opponent_timer.start()
+
+    def __opponent_step(self):
+        """
+        自动对局时对手引擎代玩家走一步，一局结束后开始下一局
+        """
+        if self.__game_finished:
+            self.new_game()
+        elif self.__turn == 0:
+            if self.__controller.player_step(*self.__opponent.choose(*self.__controller.bitboards)) == 0:
+                self.__player_stepped()
+                if self.__game_finished:
+                    self.__opponent_timer.start()
+
+    def __autoplay_batch(self):
+        """
+        快速模式的一批自动对局，在线程池中执行：连续下turbo局，批末更新一次AI文件，
+        结束后由_autoplayed转到界面线程；执行期间界面不改动控制器
+        """
+        results = []
+        error = None
+        try:
+            while len(results) < self.__turbo and not self.__closing:
+                results.append(hptrain.play_game(self.__controller, self.__opponent))
+            self.__controller.update_ai()
+        except Exception as exc:
+            error = exc
+        self.__computer_idle.set()
+        self._autoplayed.emit(results, error)
+
+    def __on_autoplayed(self, results, error):
+        for result in results:
+            self.__record_result(result)
+        if error is not None:
+            QMessageBox.critical(self, None, "自动对局出错，已停止：%s" % error)  # 不在槽中抛出异常，以免PyQt6结束进程
+            self.__game_finished = True
+            return
+        self.__game_finished = True
+        self.paint_cells()
+        self.__start_autoplay()
+
+    def __record_result(self, result):
+        """
+        记录一局自动对局的结果，每隔STATS_INTERVAL秒在窗口标题中显示每秒局数和败率
+        """
+        self.__results[result] += 1
+        self.__recent_losses.append(result == 1)
+        now = time.perf_counter()
+        if now - self.__stats_time >= STATS_INTERVAL:
+            games = sum(self.__results.values())
+            self.__games_per_second = (games - self.__stats_games) / (now - self.__stats_time)
+            self.__stats_time, self.__stats_games = now, games
+            stats = self.autoplay_stats
+            self.setWindowTitle("%s - %d局 %.1f局/秒 败率%.1f%%" % (self.__title, stats["games"],
+                                stats["games_per_second"], stats["loss_rate"] * 100))
 
     def change_side(self):
         self.__turn += 1
@@ -98,6 +305,9 @@ class QHpWidget(QWidget):
 
     def check_result(self):
         result = self.__controller.check_result(self.__turn + 1)
+        if result != 0 and self.__opponent is not None:
+            self.__opponent.game_over(result)
+            self.__record_result(result)
         if result == 2:
             QMessageBox.information(self, None, "I Win!")
         if result == 1:
@@ -109,7 +319,39 @@ class QHpWidget(QWidget):
 
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    widget = QHpWidget()
+    parser = argparse.ArgumentParser(description="六兵棋")
+    parser.add_argument("--engine", choices=ENGINES, default="matchbox",
+                        help="电脑走棋方式：AI库、alpha-beta搜索、蒙特卡洛树搜索")
+    parser.add_argument("--time-limit", type=float, default=1.0, help="搜索时每步的秒数上限")
+    parser.add_argument("--iterations", type=int, default=None, help="蒙特卡洛树搜索每步的模拟次数上限")
+    parser.add_argument("--metrics", default=None, help="启用运行统计，退出时写入此JSON文件")
+    parser.add_argument("--resources", choices=hpresources.MODES, default="auto",
+                        help="图片资源的注册方式：auto=有hpres.rcc时用rcc，rcc=二进制资源文件，module=rc_hpres模块")
+    parser.add_argument("--sync-load", action="store_true", help="显示窗口前读完AI库")
+    parser.add_argument("--startup-timings", action="store_true", help="AI库读完时输出启动各阶段的纳秒数")
+    parser.add_argument("--think-delay", type=int, default=THINK_DELAY, help="电脑落子前停顿的毫秒数，0表示不停顿")
+    parser.add_argument("--autoplay", choices=hptrain.OPPONENTS, default=None, help="自动对局：由此对手引擎代玩家走棋")
+    parser.add_argument("--turbo", type=int, default=0, help="自动对局的快速模式：每多少局重画一次棋盘，不弹出结果对话框")
+    parser.add_argument("--seed", type=int, default=None, help="自动对局的随机数种子")
+    args, qt_args = parser.parse_known_args()
+    app = QApplication(sys.argv[:1] + qt_args)
+    hpresources.set_mode(args.resources)
+    engine_ai = None
+    if args.engine == "search":
+        engine_ai = hpsearch.HexapawnSearchAI(time_limit=args.time_limit)
+    elif args.engine == "mcts":
+        engine_ai = hpmcts.HexapawnMCTSAI(iterations=args.iterations, time_limit=args.time_limit)
+    controller_metrics = None if args.metrics is None else hpmetrics.ControllerMetrics()
+    opponent_engine = None
+    if args.autoplay is not None:
+        random.seed(args.seed)  # 电脑AI使用random模块的全局随机数
+        opponent_engine = hptrain.OPPONENTS[args.autoplay](random.Random(args.seed), hpengine.STANDARD_RULES)
+    widget = QHpWidget(ai=engine_ai, metrics=controller_metrics, load_async=not args.sync_load,
+                       think_delay=args.think_delay, opponent=opponent_engine, turbo=args.turbo)
+    if args.startup_timings:
+        widget.ai_ready.connect(lambda: print(json.dumps(widget.startup_timings, sort_keys=True)))
     widget.show()
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    if controller_metrics is not None:
+        controller_metrics.dump(args.metrics)
+    sys.exit(exit_code)
@@ -0,0 +1,76 @@
+"""
+hpengine的测试
+
+    python -m pytest test_hpengine.py
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import hpengine
+import hpstore
+
+
+class CanonicalDictTest(unittest.TestCase):
+    """
+    canonical_dict合并互为对称的局势
+    """
+
+    def setUp(self):
+        self.rules = hpengine.STANDARD_RULES
+        computer_bits = self.rules.init_bits[1]
+        self.key = self.rules.board_key(1 << 3 | 1 << 7 | 1 << 8, computer_bits)  # 玩家7-4之后
+        self.mirror_key = self.rules.board_key(1 << 5 | 1 << 6 | 1 << 7, computer_bits)  # 左右翻转：玩家9-6之后
+        self.canon_key, _ = self.rules.canonical_board(self.key)
+
+    def test_keeps_common_solutions(self):
+        result = self.rules.canonical_dict({self.key: ["2-5", "3-6"], self.mirror_key: ["2-5"]})
+        self.assertEqual(result, {self.canon_key: ["2-5"]})
+
+    def test_conflicting_orientations_resign(self):
+        # 两个朝向剪剩的走法不同，交集为空时不能恢复已剪除的走法
+        result = self.rules.canonical_dict({self.key: ["2-5"], self.mirror_key: ["1-4"]})
+        self.assertEqual(result, {self.canon_key: []})
+
+
+class SharedWriterTest(unittest.TestCase):
+    """
+    共用同一AI文件的控制器共用后台写入线程
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.ai_file_name = os.path.join(self.directory, "hp_ai_file.txt")
+        shutil.copyfile(os.path.join(os.path.dirname(os.path.abspath(__file__)), "hp_ai_file.txt"), self.ai_file_name)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_close_one_of_two_controllers(self):
+        # 关闭一个控制器（窗口）后另一个仍能保存
+        writers = [hpstore.BackgroundWriter.shared() for _ in range(2)]
+        controllers = [hpengine.HexapawnController(self.ai_file_name, writer=writer) for writer in writers]
+        controllers[1].close_ai()  # 后创建的控制器的写入线程装在共享的AI上
+        writers[1].release()
+        controllers[0].update_ai()
+        controllers[0].close_ai()
+        self.assertEqual(writers[0].stats["errors"], 0)
+        writers[0].release()
+        self.assertEqual(writers[0].stats["completed"], 1)
+
+
+class SharedAITest(unittest.TestCase):
+    """
+    进程内按AI文件共享的AI
+    """
+
+    def test_rejects_other_rules(self):
+        ai_file_name = os.path.join(tempfile.gettempdir(), "shared_rules_test.txt")
+        self.assertIs(hpengine.HexapawnAI.shared(ai_file_name), hpengine.HexapawnAI.shared(ai_file_name, hpengine.STANDARD_RULES))
+        with self.assertRaises(ValueError):
+            hpengine.HexapawnAI.shared(ai_file_name, hpengine.HexapawnRules(4, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
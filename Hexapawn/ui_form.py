@@ -15,9 +15,9 @@ from PyQt6.QtGui import (QBrush, QColor, QConicalGradient, QCursor,
     QFont, QFontDatabase, QGradient, QIcon,
     QImage, QKeySequence, QLinearGradient, QPainter,
     QPalette, QPixmap, QRadialGradient, QTransform)
-from PyQt6.QtWidgets import (QApplication, QFrame, QSizePolicy, QWidget)
+from PyQt6.QtWidgets import (QApplication, QSizePolicy, QWidget)
 
-from qhpcellview import QHpCellView
+from qhpboardview import QHpBoardView
 
 class Ui_QHpWidget(object):
     def setupUi(self, QHpWidget):
@@ -26,69 +26,9 @@ class Ui_QHpWidget(object):
         QHpWidget.resize(301, 301)
         QHpWidget.setMinimumSize(QSize(301, 301))
         QHpWidget.setMaximumSize(QSize(301, 301))
-        self.hpgv_0 = QHpCellView(QHpWidget)
-        self.hpgv_0.setObjectName(u"hpgv_0")
-        self.hpgv_0.setGeometry(QRect(0, 0, 100, 100))
-        self.hpgv_0.setFrameShape(QFrame.Shape.NoFrame)
-        self.hpgv_0.setFrameShadow(QFrame.Shadow.Plain)
-        self.hpgv_0.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.hpgv_0.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.hpgv_1 = QHpCellView(QHpWidget)
-        self.hpgv_1.setObjectName(u"hpgv_1")
-        self.hpgv_1.setGeometry(QRect(100, 0, 100, 100))
-        self.hpgv_1.setFrameShape(QFrame.Shape.NoFrame)
-        self.hpgv_1.setFrameShadow(QFrame.Shadow.Plain)
-        self.hpgv_1.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.hpgv_1.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.hpgv_2 = QHpCellView(QHpWidget)
-        self.hpgv_2.setObjectName(u"hpgv_2")
-        self.hpgv_2.setGeometry(QRect(200, 0, 100, 100))
-        self.hpgv_2.setFrameShape(QFrame.Shape.NoFrame)
-        self.hpgv_2.setFrameShadow(QFrame.Shadow.Plain)
-        self.hpgv_2.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.hpgv_2.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.hpgv_3 = QHpCellView(QHpWidget)
-        self.hpgv_3.setObjectName(u"hpgv_3")
-        self.hpgv_3.setGeometry(QRect(0, 100, 100, 100))
-        self.hpgv_3.setFrameShape(QFrame.Shape.NoFrame)
-        self.hpgv_3.setFrameShadow(QFrame.Shadow.Plain)
-        self.hpgv_3.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.hpgv_3.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.hpgv_4 = QHpCellView(QHpWidget)
-        self.hpgv_4.setObjectName(u"hpgv_4")
-        self.hpgv_4.setGeometry(QRect(100, 100, 100, 100))
-        self.hpgv_4.setFrameShape(QFrame.Shape.NoFrame)
-        self.hpgv_4.setFrameShadow(QFrame.Shadow.Plain)
-        self.hpgv_4.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.hpgv_4.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.hpgv_5 = QHpCellView(QHpWidget)
-        self.hpgv_5.setObjectName(u"hpgv_5")
-        self.hpgv_5.setGeometry(QRect(200, 100, 100, 100))
-        self.hpgv_5.setFrameShape(QFrame.Shape.NoFrame)
-        self.hpgv_5.setFrameShadow(QFrame.Shadow.Plain)
-        self.hpgv_5.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.hpgv_5.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.hpgv_6 = QHpCellView(QHpWidget)
-        self.hpgv_6.setObjectName(u"hpgv_6")
-        self.hpgv_6.setGeometry(QRect(0, 200, 100, 100))
-        self.hpgv_6.setFrameShape(QFrame.Shape.NoFrame)
-        self.hpgv_6.setFrameShadow(QFrame.Shadow.Plain)
-        self.hpgv_6.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.hpgv_6.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.hpgv_7 = QHpCellView(QHpWidget)
-        self.hpgv_7.setObjectName(u"hpgv_7")
-        self.hpgv_7.setGeometry(QRect(100, 200, 100, 100))
-        self.hpgv_7.setFrameShape(QFrame.Shape.NoFrame)
-        self.hpgv_7.setFrameShadow(QFrame.Shadow.Plain)
-        self.hpgv_7.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.hpgv_7.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.hpgv_8 = QHpCellView(QHpWidget)
-        self.hpgv_8.setObjectName(u"hpgv_8")
-        self.hpgv_8.setGeometry(QRect(200, 200, 100, 100))
-        self.hpgv_8.setFrameShape(QFrame.Shape.NoFrame)
-        self.hpgv_8.setFrameShadow(QFrame.Shadow.Plain)
-        self.hpgv_8.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.hpgv_8.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.hpboard = QHpBoardView(QHpWidget)
+        self.hpboard.setObjectName(u"hpboard")
+        self.hpboard.setGeometry(QRect(0, 0, 300, 300))
 
         self.retranslateUi(QHpWidget)
 
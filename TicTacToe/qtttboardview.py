@@ -0,0 +1,133 @@
+# This Python file uses the following encoding: utf-8
+import time
+
+from PyQt6.QtCore import pyqtSignal, QRect, Qt
+from PyQt6.QtGui import QPainter, QPalette, QPixmap, QPixmapCache
+from PyQt6 import QtWidgets
+
+import tttresources
+
+CELL_IMAGES = (":/ttt/images/blank.gif", ":/ttt/images/cross.gif", ":/ttt/images/not.gif")  # 各格数字对应的图片
+CELL_SPACING = 2  # 格间距，露出背景作为棋盘线
+
+resources_ns = None  # 第一次缓存未命中时注册图片资源的纳秒数，尚未注册时为None
+
+
+def register_resources():
+    """
+    注册图片资源并记下耗时，只在第一次调用时注册
+    """
+    global resources_ns
+    if resources_ns is None:
+        start = time.perf_counter_ns()
+        tttresources.register_resources()
+        resources_ns = time.perf_counter_ns() - start
+
+
+def cached_pixmap(file_name, width, height):
+    """
+    按(图片, 尺寸)缓存缩放后的图片，各格、各局共用，不再每次从资源读取和缩放，
+    第一次从资源读取时才注册图片资源
+    """
+    key = "%s@%dx%d" % (file_name, width, height)
+    pixmap = QPixmapCache.find(key)
+    if pixmap is None:
+        register_resources()
+        pixmap = QPixmap(file_name).scaled(width, height)
+        QPixmapCache.insert(key, pixmap)
+    return pixmap
+
+
+def _cell_span(index, length, count):
+    """
+    第index格在一行（列）中的起点和终点，格子按长度均分，格间留出间距
+    :return: (起点, 终点)，不含终点
+    """
+    return index * (length + CELL_SPACING) // count, (index + 1) * (length + CELL_SPACING) // count - CELL_SPACING
+
+
+def _locate(position, length, count):
+    """
+    :return: 坐标所在的格下标，落在间距或棋盘外时为-1
+    """
+    if not 0 <= position < length:
+        return -1
+    index = min(count - 1, int(position) * count // (length + CELL_SPACING))
+    while index + 1 < count and _cell_span(index + 1, length, count)[0] <= position:
+        index += 1
+    start, end = _cell_span(index, length, count)
+    return index if start <= position < end else -1
+
+
+class QTttBoardView(QtWidgets.QWidget):
+    """
+    井字棋棋盘：一个窗口部件在paintEvent中画出全部格子，点击时按坐标换算成格下标发出click_signal
+    """
+    click_signal = pyqtSignal(int)
+    resources_registered = pyqtSignal(object)  # 本棋盘第一次画图时注册了图片资源：注册的纳秒数
+
+    def __init__(self, parent=None):
+        super(QTttBoardView, self).__init__(parent)
+        self.__columns = 3
+        self.__rows = 3
+        self.__cells = [0] * 9  # 各格数字，0=空，1=玩家，2=电脑
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)  # 每次都画满更新区域，不必先擦除背景
+
+    def set_board_size(self, columns, rows):
+        """
+        设置棋盘的列数和行数，各格清空
+        """
+        self.__columns = columns
+        self.__rows = rows
+        self.__cells = [0] * (columns * rows)
+        self.update()
+
+    def set_cells(self, cells):
+        """
+        更新各格数字，只重画有变化的格
+        :return: 重画的格数
+        """
+        painted = 0
+        for index, value in enumerate(cells):
+            if self.__cells[index] != value:
+                self.__cells[index] = value
+                self.update(self.cell_rect(index))
+                painted += 1
+        return painted
+
+    def cell_rect(self, index):
+        """
+        第index格在棋盘上的矩形，随棋盘大小缩放
+        """
+        left, right = _cell_span(index % self.__columns, self.width(), self.__columns)
+        top, bottom = _cell_span(index // self.__columns, self.height(), self.__rows)
+        return QRect(left, top, right - left, bottom - top)
+
+    def cell_at(self, x, y):
+        """
+        :return: 坐标所在的格下标，落在格间距上时为-1
+        """
+        column = _locate(x, self.width(), self.__columns)
+        row = _locate(y, self.height(), self.__rows)
+        if column < 0 or row < 0:
+            return -1
+        return row * self.__columns + column
+
+    def mousePressEvent(self, event):
+        index = self.cell_at(event.position().x(), event.position().y())
+        if index >= 0:
+            self.click_signal.emit(index)
+
+    def paintEvent(self, event):
+        registered = resources_ns is not None
+        painter = QPainter(self)
+        painter.fillRect(event.rect(), Qt.GlobalColor.darkGray)
+        base = self.palette().color(QPalette.ColorRole.Base)  # 图片透明处露出的底色
+        for index, value in enumerate(self.__cells):
+            rect = self.cell_rect(index)
+            if rect.intersects(event.rect()):
+                painter.fillRect(rect, base)
+                painter.drawPixmap(rect.topLeft(), cached_pixmap(CELL_IMAGES[value], rect.width(), rect.height()))
+        painter.end()
+        if not registered and resources_ns is not None:
+            self.resources_registered.emit(resources_ns)
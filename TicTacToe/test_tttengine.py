@@ -0,0 +1,82 @@
+"""
+tttengine的测试
+
+    python -m pytest test_tttengine.py
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import tttengine
+import tttstore
+
+
+class CanonicalDictTest(unittest.TestCase):
+    """
+    canonical_dict合并互为对称的局势
+    """
+
+    def setUp(self):
+        self.rules = tttengine.STANDARD_RULES
+        self.key = self.rules.board_key(1 << 0, 0)  # 玩家走在左上角
+        self.mirror_key = self.rules.board_key(1 << 2, 0)  # 左右翻转：玩家走在右上角
+        self.canon_code, _ = self.rules.canonical_board(1 << 0, 0)
+
+    def test_keeps_common_solutions(self):
+        result = self.rules.canonical_dict({self.key: ["5", "9"], self.mirror_key: ["5"]})
+        self.assertEqual(result, {self.canon_code: ["5"]})
+
+    def test_self_symmetric_position_keeps_shared_solution(self):
+        # 121220101与121022101互为对称，规范局势101022121转置后不变，同一步棋换算到第2格和第4格
+        result = self.rules.canonical_dict({tttstore.encode_key("121220101"): ["6"],
+                                            tttstore.encode_key("121022101"): ["4"]})
+        self.assertEqual(result, {tttstore.encode_key("101022121"): ["4"]})
+
+    def test_shipped_store_keeps_solutions(self):
+        # 随附AI文件规范化后每个局势都还有走法
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "ttt_ai_file.txt")) as file:
+            ai_dict = self.rules.canonical_dict(tttstore.parse_text(file.read()))
+        self.assertEqual([key_code for key_code, solutions in ai_dict.items() if len(solutions) == 0], [])
+
+
+class SharedWriterTest(unittest.TestCase):
+    """
+    共用同一AI文件的控制器共用后台写入线程
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.ai_file_name = os.path.join(self.directory, "ttt_ai_file.txt")
+        shutil.copyfile(os.path.join(os.path.dirname(os.path.abspath(__file__)), "ttt_ai_file.txt"), self.ai_file_name)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_close_one_of_two_controllers(self):
+        # 关闭一个控制器（窗口）后另一个仍能保存
+        writers = [tttstore.BackgroundWriter.shared() for _ in range(2)]
+        controllers = [tttengine.TictactoeController(self.ai_file_name, writer=writer) for writer in writers]
+        controllers[1].close_ai()  # 后创建的控制器的写入线程装在共享的AI上
+        writers[1].release()
+        controllers[0].update_ai()
+        controllers[0].close_ai()
+        self.assertEqual(writers[0].stats["errors"], 0)
+        writers[0].release()
+        self.assertEqual(writers[0].stats["completed"], 1)
+
+
+class SharedAITest(unittest.TestCase):
+    """
+    进程内按AI文件共享的AI
+    """
+
+    def test_rejects_other_rules(self):
+        ai_file_name = os.path.join(tempfile.gettempdir(), "shared_rules_test.txt")
+        self.assertIs(tttengine.TictactoeAI.shared(ai_file_name), tttengine.TictactoeAI.shared(ai_file_name, tttengine.STANDARD_RULES))
+        with self.assertRaises(ValueError):
+            tttengine.TictactoeAI.shared(ai_file_name, tttengine.TictactoeRules(5, 5, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+"""
+井字棋批量模拟 Tic-tac-toe NumPy lockstep batch simulator
+
+一批对局同步推进：每局棋盘是int8数组的一行（0=空，1=玩家，2=电脑），
+每一步对所有未结束的对局同时按合法走法掩码随机选子，连线用棋盘与8条连线矩阵的乘积判定，
+胜负、平局和电脑认输的规则与TictactoeController.check_result一致。
+电脑方可以随机走棋，也可以按AI库走棋：AI库展开成以规范局势编码为下标的走法掩码表。
+本模块需要numpy（已列入requirements.txt），游戏窗口本身不导入它。
+"""
+import argparse
+import time
+
+import numpy as np
+
+import tttengine
+import tttstore
+
+WIN_LINES = np.array([[mask >> i & 1 for mask in tttengine.WIN_MASKS] for i in range(9)], dtype=np.int8)  # 9格×8条连线
+POWERS = np.array([3 ** (8 - i) for i in range(9)], dtype=np.int32)  # 各格在局势编码中的权重
+SYMMETRY_INDEX = np.array(tttengine.SYMMETRIES, dtype=np.intp)
+CELL_BITS = np.arange(9, dtype=np.uint16)
+TABLE_SIZE = 3 ** 9
+
+
+def policy_table(ai_dict):
+    """
+    把AI库字典展开成走法掩码表，下标为规范局势编码，0表示无此局势（电脑认输）
+    """
+    table = np.zeros(TABLE_SIZE, dtype=np.uint16)
+    for key_code, solutions in ai_dict.items():
+        table[key_code] = tttstore.encode_moves(solutions)
+    return table
+
+
+def _pick(legal, rng):
+    """
+    每行在合法位置中等概率随机选一个
+    :param legal: 每行的合法位置布尔矩阵，每行至少有一个合法位置
+    :return: 每行选中的列号
+    """
+    scores = rng.random(legal.shape)
+    scores[~legal] = -1.0
+    return scores.argmax(axis=1)
+
+
+def _lines(boards, side):
+    """
+    每行棋盘中走棋方是否连成一线
+    """
+    return ((boards == side).astype(np.int8) @ WIN_LINES == 3).any(axis=1)
+
+
+def play_games(count, rng, table=None):
+    """
+    同步下完一批对局，玩家方随机走棋先走
+    :param count: 对局数
+    :param rng: numpy随机数生成器
+    :param table: 电脑方的走法掩码表，None表示电脑方也随机走棋
+    :return: (结果数组 2=电脑赢 1=玩家赢 -1=平局, 电脑最后一步的规范局势编码（-1表示未走过）, 电脑最后一步的规范走格编号,
+              电脑是否认输的布尔数组（认输的结果也为1）)
+    """
+    boards = np.zeros((count, 9), dtype=np.int8)
+    results = np.zeros(count, dtype=np.int8)
+    last_keys = np.full(count, -1, dtype=np.int32)
+    last_steps = np.zeros(count, dtype=np.int8)
+    resigned = np.zeros(count, dtype=bool)
+    for turn in range(9):
+        active = np.flatnonzero(results == 0)
+        if active.size == 0:
+            break
+        sub = boards[active]
+        if turn % 2 == 0:
+            side = 1
+            cells = _pick(sub == 0, rng)
+        else:
+            side = 2
+            if table is None:
+                cells = _pick(sub == 0, rng)
+            else:
+                codes = sub[:, SYMMETRY_INDEX].astype(np.int32) @ POWERS  # 每种对称变换下的局势编码
+                symmetry = codes.argmin(axis=1)
+                canon = codes[np.arange(active.size), symmetry]
+                masks = table[canon]
+                resign = masks == 0
+                results[active[resign]] = 1  # 如果无棋可走自动判电脑认输
+                resigned[active[resign]] = True
+                active, sub, symmetry, canon, masks = (
+                    active[~resign], sub[~resign], symmetry[~resign], canon[~resign], masks[~resign])
+                steps = _pick((masks[:, None] >> CELL_BITS & 1).astype(bool), rng)
+                cells = SYMMETRY_INDEX[symmetry, steps]
+                last_keys[active] = canon
+                last_steps[active] = steps + 1
+        sub[np.arange(active.size), cells] = side
+        boards[active] = sub
+        won = _lines(sub, side)
+        results[active[won]] = side
+        results[active[~won & (sub != 0).all(axis=1)]] = -1  # 若全填满但未决出胜负判平局
+    return results, last_keys, last_steps, resigned
+
+
+def train(games, batch=10000, seed=None, ai_file_name="ttt_ai_file.txt"):
+    """
+    批量训练电脑AI：每批结束后把输棋局的最后一步按remove_wrong_solution规则剪除，结束时写一次AI文件
+    :return: 训练报告字典
+    """
+    rng = np.random.default_rng(seed)
+    controller = tttengine.TictactoeController(ai_file_name)
+    controller.init_ai()
+    ai = tttengine.TictactoeAI.shared(ai_file_name)
+    table = policy_table(ai.snapshot())
+    counts = {1: 0, 2: 0, -1: 0}
+    resignations = 0
+    last_loss = 0
+    played = 0
+    start_time = time.perf_counter()
+    while played < games:
+        size = min(batch, games - played)
+        results, last_keys, last_steps, resigned = play_games(size, rng, table)
+        for result in counts:
+            counts[result] += int((results == result).sum())
+        resignations += int(resigned.sum())
+        losses = np.flatnonzero((results == 1) & ~resigned)  # 认输不算输棋：收敛后的AI在必败局势中一直认输
+        if losses.size > 0:
+            last_loss = played + int(losses[-1]) + 1
+        lost = (results == 1) & (last_keys >= 0)
+        for key_code, step in sorted(set(zip(last_keys[lost].tolist(), last_steps[lost].tolist()))):
+            ai.remove_wrong_solution(key_code, step)
+            table[key_code] = int(table[key_code]) & ~(1 << (step - 1))
+        played += size
+    elapsed = time.perf_counter() - start_time
+    controller.update_ai()
+    return {
+        "games": games,
+        "wins": counts[2],
+        "losses": counts[1] - resignations,
+        "resignations": resignations,
+        "draws": counts[-1],
+        "seconds": elapsed,
+        "games_per_second": games / elapsed if elapsed > 0 else 0.0,
+        "last_loss": last_loss
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="井字棋批量模拟")
+    parser.add_argument("--games", type=int, default=1000000)
+    parser.add_argument("--batch", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--ai-file", default="ttt_ai_file.txt")
+    parser.add_argument("--train", action="store_true", help="电脑方按AI库走棋并剪枝，否则双方随机走棋")
+    args = parser.parse_args()
+    if args.train:
+        report = train(args.games, args.batch, args.seed, args.ai_file)
+        print("对局%d：电脑赢%d，输%d，平%d，认输%d，最后一次输棋在第%d局" % (
+            report["games"], report["wins"], report["losses"], report["draws"], report["resignations"],
+            report["last_loss"]))
+        print("用时%.2f秒，每秒%.0f局" % (report["seconds"], report["games_per_second"]))
+    else:
+        start = time.perf_counter()
+        generator = np.random.default_rng(args.seed)
+        total = np.zeros(3, dtype=np.int64)
+        for offset in range(0, args.games, args.batch):
+            outcome = play_games(min(args.batch, args.games - offset), generator)[0]
+            total += [(outcome == 1).sum(), (outcome == 2).sum(), (outcome == -1).sum()]
+        seconds = time.perf_counter() - start
+        print("对局%d：先手赢%d，后手赢%d，平%d" % (args.games, total[0], total[1], total[2]))
+        print("用时%.2f秒，每秒%.0f局" % (seconds, args.games / seconds))
@@ -1,39 +1,393 @@
 """
 井字棋 Tic-tac-toe
 """
+import os
 import random
 import sys
 
+import tttstore
+
+"""
+棋盘的8种对称变换（旋转和翻转）：变换后局势第i格取原局势第SYMMETRIES[t][i]格
+"""
+SYMMETRIES = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8),
+    (6, 3, 0, 7, 4, 1, 8, 5, 2),
+    (8, 7, 6, 5, 4, 3, 2, 1, 0),
+    (2, 5, 8, 1, 4, 7, 0, 3, 6),
+    (2, 1, 0, 5, 4, 3, 8, 7, 6),
+    (6, 7, 8, 3, 4, 5, 0, 1, 2),
+    (0, 3, 6, 1, 4, 7, 2, 5, 8),
+    (8, 5, 2, 7, 4, 1, 6, 3, 0)
+)
+
+"""
+位棋盘：玩家和电脑各用一个9位整数，第i位表示第i格有子
+局势编码：各格数字（0=空，1=玩家，2=电脑）依次组成的三进制整数，即局势编码字串按三进制解释的值
+"""
+FULL_MASK = 0b111111111
+WIN_MASKS = (0b000000111, 0b000111000, 0b111000000,
+             0b001001001, 0b010010010, 0b100100100,
+             0b100010001, 0b001010100)  # 三行、三列和两条对角线
+WIN_TABLE = tuple(any(bits & mask == mask for mask in WIN_MASKS) for bits in range(FULL_MASK + 1))  # 各位棋盘是否连成一线
+"""
+SYMMETRY_CODES[t][bits]：位棋盘bits经第t种对称变换后每个子记1时的局势编码，
+变换后的局势编码 = SYMMETRY_CODES[t][玩家位棋盘] + 2 * SYMMETRY_CODES[t][电脑位棋盘]
+"""
+SYMMETRY_CODES = tuple(
+    tuple(sum(3 ** (8 - i) for i in range(9) if bits >> symmetry[i] & 1) for bits in range(FULL_MASK + 1))
+    for symmetry in SYMMETRIES)
+
+
+def board_bits(key_code):
+    """
+    局势编码转换为位棋盘
+    :return: (玩家位棋盘, 电脑位棋盘)
+    """
+    player_bits, computer_bits = 0, 0
+    for i in range(8, -1, -1):
+        key_code, digit = divmod(key_code, 3)
+        if digit == 1:
+            player_bits |= 1 << i
+        elif digit == 2:
+            computer_bits |= 1 << i
+    return player_bits, computer_bits
+
+
+def canonical_board(player_bits, computer_bits):
+    """
+    求局势的规范形式：所有对称变换下编码最小的局势
+    :return: (规范局势编码, 对称变换编号)，规范局势第i格即原局势第SYMMETRIES[编号][i]格
+    """
+    canon_code, canon_index = SYMMETRY_CODES[0][player_bits] + 2 * SYMMETRY_CODES[0][computer_bits], 0
+    for index in range(1, len(SYMMETRY_CODES)):
+        codes = SYMMETRY_CODES[index]
+        key_code = codes[player_bits] + 2 * codes[computer_bits]
+        if key_code < canon_code:
+            canon_code, canon_index = key_code, index
+    return canon_code, canon_index
+
+
+MIN_BOARD_SIZE = 3
+MAX_BOARD_SIZE = 19
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))  # 横、竖和两条斜线的(列增量, 行增量)
+
+
+class TictactoeRules:
+    """
+    m,n,k棋规则：宽width列、高height行（3到19）的棋盘上先把win_length个子连成一线者赢，
+    3×3连3即井字棋，15×15连5即五子棋。各格从左上角起按行编号，位棋盘和局势编码的位数为格数
+    """
+
+    def __init__(self, width=3, height=3, win_length=3):
+        if not MIN_BOARD_SIZE <= width <= MAX_BOARD_SIZE or not MIN_BOARD_SIZE <= height <= MAX_BOARD_SIZE:
+            raise ValueError("棋盘宽和高须在%d到%d之间" % (MIN_BOARD_SIZE, MAX_BOARD_SIZE))
+        if not MIN_BOARD_SIZE <= win_length <= max(width, height):
+            raise ValueError("连子数须在%d到%d之间" % (MIN_BOARD_SIZE, max(width, height)))
+        self.__width = width
+        self.__height = height
+        self.__win_length = win_length
+        self.__size = width * height
+        self.__full_mask = (1 << self.__size) - 1
+        self.__standard = (width, height, win_length) == (3, 3, 3)  # 标准井字棋使用预先算好的查表
+        """
+        棋盘的对称变换：变换后局势第(行, 列)格取原局势的对应格，正方形棋盘有8种（与SYMMETRIES的顺序相同），长方形有4种
+        """
+        last_row, last_col = height - 1, width - 1
+        sources = [lambda row, col: (row, col),
+                   lambda row, col: (last_row - row, last_col - col),
+                   lambda row, col: (row, last_col - col),
+                   lambda row, col: (last_row - row, col)]
+        if width == height:
+            sources[1:1] = [lambda row, col: (last_col - col, row)]
+            sources[3:3] = [lambda row, col: (col, last_row - row)]
+            sources += [lambda row, col: (col, row),
+                        lambda row, col: (last_col - col, last_row - row)]
+        self.__symmetries = tuple(
+            tuple(source_row * width + source_col for source_row, source_col in
+                  (source(i // width, i % width) for i in range(self.__size)))
+            for source in sources)
+        """
+        __weights[t][j]：原局势第j格的子在第t种对称变换后局势编码中的权重
+        """
+        self.__weights = tuple(
+            tuple(3 ** (self.__size - 1 - symmetry.index(j)) for j in range(self.__size))
+            for symmetry in self.__symmetries)
+
+    @property
+    def width(self):
+        return self.__width
+
+    @property
+    def height(self):
+        return self.__height
+
+    @property
+    def win_length(self):
+        return self.__win_length
+
+    @property
+    def size(self):
+        """
+        棋盘格数
+        """
+        return self.__size
+
+    @property
+    def full_mask(self):
+        return self.__full_mask
+
+    @property
+    def standard(self):
+        """
+        是否为标准3×3井字棋：AI库只在标准棋盘上有走法，生成器、训练和服务器都只支持标准棋盘
+        """
+        return self.__standard
+
+    @property
+    def symmetries(self):
+        return self.__symmetries
+
+    def is_win(self, bits, step_pos):
+        """
+        判断刚在step_pos格落子的一方是否连成一线：只检查过该格的4条线，每条线最多看win_length-1格
+        :param bits: 落子一方的位棋盘（含刚落的子）
+        :param step_pos: 落子格编号
+        """
+        if self.__standard:
+            return WIN_TABLE[bits]
+        width, height, win_length = self.__width, self.__height, self.__win_length
+        row, col = divmod(step_pos - 1, width)
+        for col_step, row_step in DIRECTIONS:
+            count = 1
+            for sign in (1, -1):
+                next_row, next_col = row + sign * row_step, col + sign * col_step
+                while count < win_length and 0 <= next_row < height and 0 <= next_col < width \
+                        and bits >> (next_row * width + next_col) & 1:
+                    count += 1
+                    next_row += sign * row_step
+                    next_col += sign * col_step
+            if count >= win_length:
+                return True
+        return False
+
+    def board_key(self, player_bits, computer_bits):
+        """
+        位棋盘转换为局势编码
+        """
+        if self.__standard:
+            return SYMMETRY_CODES[0][player_bits] + 2 * SYMMETRY_CODES[0][computer_bits]
+        return self.__code(self.__weights[0], player_bits, computer_bits)
+
+    def board_bits(self, key_code):
+        """
+        局势编码转换为位棋盘
+        :return: (玩家位棋盘, 电脑位棋盘)
+        """
+        player_bits, computer_bits = 0, 0
+        for i in range(self.__size - 1, -1, -1):
+            key_code, digit = divmod(key_code, 3)
+            if digit == 1:
+                player_bits |= 1 << i
+            elif digit == 2:
+                computer_bits |= 1 << i
+        return player_bits, computer_bits
+
+    @staticmethod
+    def __code(weights, player_bits, computer_bits):
+        """
+        按权重表求局势编码，只累加有子的格
+        """
+        key_code = 0
+        for bits, digit in ((player_bits, 1), (computer_bits, 2)):
+            while bits:
+                low_bit = bits & -bits
+                key_code += digit * weights[low_bit.bit_length() - 1]
+                bits ^= low_bit
+        return key_code
+
+    def canonical_board(self, player_bits, computer_bits):
+        """
+        求局势的规范形式：所有对称变换下编码最小的局势
+        :return: (规范局势编码, 对称变换编号)，规范局势第i格即原局势第symmetries[编号][i]格
+        """
+        if self.__standard:
+            return canonical_board(player_bits, computer_bits)
+        canon_code, canon_index = self.__code(self.__weights[0], player_bits, computer_bits), 0
+        for index in range(1, len(self.__weights)):
+            key_code = self.__code(self.__weights[index], player_bits, computer_bits)
+            if key_code < canon_code:
+                canon_code, canon_index = key_code, index
+        return canon_code, canon_index
+
+    def canonical_dict(self, ai_dict):
+        """
+        把AI库字典的局势换成规范形式，互为对称的局势合并后只保留都未被剪除的走法（按等价走法比较），没有这样的走法时为空列表（认输）
+        """
+        result = dict()
+        for key_code, solutions in ai_dict.items():
+            canon_code, index = self.canonical_board(*self.board_bits(key_code))
+            symmetry = self.__symmetries[index]
+            canon_solutions = [str(symmetry.index(int(solution) - 1) + 1) for solution in solutions]
+            if canon_code in result:
+                # 各朝向剪除的走法都是输棋的走法，交集为空时也不能恢复；按规范局势的自身对称变换比较走法
+                equivalents = self.__equivalent_solutions(canon_code, canon_solutions)
+                result[canon_code] = [solution for solution in result[canon_code] if solution in equivalents]
+            else:
+                result[canon_code] = canon_solutions
+        return result
+
+    def __equivalent_solutions(self, canon_code, solutions):
+        """
+        走法在规范局势的自身对称变换下的全部等价走法：规范局势自身对称时，不同朝向的同一步棋换算到不同的格
+        :return: 走格编号字串的集合
+        """
+        player_bits, computer_bits = self.board_bits(canon_code)
+        stabilizer = [symmetry for weights, symmetry in zip(self.__weights, self.__symmetries)
+                      if self.__code(weights, player_bits, computer_bits) == canon_code]
+        return {str(symmetry.index(int(solution) - 1) + 1) for symmetry in stabilizer for solution in solutions}
+
+
+STANDARD_RULES = TictactoeRules()  # 标准3×3井字棋
+
 
 class TictactoeAI:
     """
     井字棋AI
     """
 
-    def __init__(self):
-        self.__ttt_ai_dict = dict()  # AI库字典
+    __shared_ais = dict()  # 进程内按AI文件路径共享的AI
+
+    def __init__(self, rules=None):
+        self.__rules = STANDARD_RULES if rules is None else rules  # AI库对应的棋盘规则
+        self.__file_signature = None  # 最近一次读写AI文件时的(修改时间, 大小)
+        self.__ttt_ai_dict = dict()  # AI库字典，使用二进制AI库时只保存修改过的局势
+        self.__ttt_ai_store = None  # 内存映射的二进制AI库
+        self.__binary_format = False  # AI文件是否为二进制格式
+        self.__journal_file_name = None  # 学习日志文件，None表示不使用日志
+        self.__journal_records = []  # 尚未写入日志的剪枝记录
+        self.__journal_size = 0  # 日志文件中的记录数
+        self.__writer = None  # 后台写入线程，None表示在调用线程中同步写入
+        self.__saved_stores = dict()  # 后台已写好、待换上的二进制AI库 {AI文件: (临时文件, 写入时修改过的局势)}
+        self.__saved_texts = dict()  # 后台已写好的文本AI文件 {AI文件: 写入后的(修改时间, 大小)}
+
+    @classmethod
+    def shared(cls, file_name, rules=None):
+        """
+        获取进程内该AI文件共用的AI，多个控制器共享同一份AI库，同一AI文件须用同样的棋盘规则，否则报ValueError
+        :param rules: 棋盘规则，None表示标准井字棋
+        """
+        rules = STANDARD_RULES if rules is None else rules
+        path = os.path.abspath(file_name)
+        if path not in cls.__shared_ais:
+            cls.__shared_ais[path] = cls(rules)
+        ai = cls.__shared_ais[path]
+        if (ai.__rules.width, ai.__rules.height, ai.__rules.win_length) != (rules.width, rules.height, rules.win_length):
+            raise ValueError("AI文件已按其他棋盘规则读取：" + file_name)
+        return ai
+
+    def load_dict(self, file_name):
+        """
+        按需读取AI库：文件的修改时间和大小与上次读写时一致则沿用内存中的AI库，否则重新读取
+        后台写入尚未完成时内存中的AI库比文件新，沿用内存中的AI库
+        """
+        if not self.__finish_saves(False):
+            return
+        if self.__file_signature is None and not os.path.exists(file_name):
+            return  # 新尺寸的棋盘还没有AI文件时从空AI库开始，保存时创建
+        if self.__stat_file(file_name) == self.__file_signature:
+            return
+        self.__ttt_ai_dict.clear()
+        self.read_dict(file_name)
+
+    @staticmethod
+    def __stat_file(file_name):
+        stat = os.stat(file_name)
+        return stat.st_mtime_ns, stat.st_size
 
     def read_dict(self, file_name):
         """
-        读取文件获取AI库
+        读取文件获取AI库，自动识别文本格式和二进制格式，局势统一换成规范形式
         """
-        with open(file_name, "r") as file:
-            text_data = file.read()
-        kv_pairs = text_data.split("|")
-        for pair in kv_pairs:
-            key, list_str_val = pair.split(":")
-            list_val = list_str_val.split(",")
-            self.__ttt_ai_dict[key] = list_val
+        self.__finish_saves(True)
+        if tttstore.is_store_file(file_name):
+            self.__close_store()
+            self.__ttt_ai_dict.clear()
+            store = tttstore.TictactoeStore(file_name)
+            if store.dimensions != (self.__rules.width, self.__rules.height, self.__rules.win_length):
+                store.close()
+                raise ValueError("AI库文件的棋盘尺寸不符：" + file_name)
+            if store.flags & tttstore.FLAG_CANONICAL:
+                self.__ttt_ai_store = store
+            else:
+                self.__ttt_ai_dict.update(self.__rules.canonical_dict(dict(store.items())))  # 未规范化的二进制AI库整体读入后规范化
+                store.close()
+            self.__binary_format = True
+        else:
+            with open(file_name, "r") as file:
+                text_data = file.read()
+            ai_dict = tttstore.parse_text(text_data)
+            if any(key_code >= 3 ** self.__rules.size for key_code in ai_dict):
+                raise ValueError("AI库文件的棋盘尺寸不符：" + file_name)  # 文本格式不记棋盘尺寸，只能查出比棋盘大的局势
+            self.__ttt_ai_dict.update(self.__rules.canonical_dict(ai_dict))
+            self.__binary_format = False
+        if self.__journal_file_name is not None:
+            records = tttstore.read_journal(self.__journal_file_name)
+            for key, solution in records:
+                self.__prune(key, solution)  # 重放尚未合并的剪枝记录
+            self.__journal_records = []
+            self.__journal_size = len(records)
+        self.__file_signature = self.__stat_file(file_name)
+
+    def set_journal(self, file_name):
+        """
+        启用学习日志，剪枝记录只追加到日志文件，由compact合并进AI库
+        """
+        self.__journal_file_name = file_name
+
+    def set_writer(self, writer):
+        """
+        启用后台写入：save_dict和compact只在调用线程中取AI库的快照，写文件交给写入线程（tttstore.BackgroundWriter），
+        不再追加学习日志，每次保存都整体写入AI库并清空日志。
+        进程内共享的AI由多个控制器使用，须用共用的tttstore.BackgroundWriter.shared()，以免一个控制器关闭写入线程后其他控制器无法保存
+        """
+        self.__finish_saves(True)  # 先换上原写入线程已写好的AI库
+        self.__writer = writer
+
+    def wait_saves(self):
+        """
+        等待后台写入完成，二进制AI库在此换上新文件
+        """
+        self.__finish_saves(True)
+
+    def __close_store(self):
+        if self.__ttt_ai_store is not None:
+            self.__ttt_ai_store.close()
+            self.__ttt_ai_store = None
+
+    def __find_solutions(self, board_key):
+        """
+        查询局势的走法列表，修改过的局势优先于二进制AI库
+        """
+        if board_key in self.__ttt_ai_dict:
+            return self.__ttt_ai_dict[board_key]
+        if self.__ttt_ai_store is not None:
+            return self.__ttt_ai_store.get(board_key)
+        return None
+
+    def __contains__(self, board_key):
+        """
+        局势是否在AI库中，已无走法的局势也算在内
+        """
+        return self.__find_solutions(board_key) is not None
 
     def get_solution(self, board_key):
         """
         按照局势获取走法
-        :param board_key: 局势编码字串
+        :param board_key: 局势编码
         :return: 走格编号，若无解则返回None
         """
-        if board_key not in self.__ttt_ai_dict:
-            return None
-        solutions = self.__ttt_ai_dict[board_key]
+        solutions = self.__find_solutions(board_key)
         if solutions is None:
             return None
         if len(solutions) == 0:
@@ -43,26 +397,146 @@ class TictactoeAI:
     def remove_wrong_solution(self, board_key, solution):
         """
         移除错误的走法，在输棋后调用
-        :param board_key: 局势编码字串
+        :param board_key: 局势编码
         :param solution: 最后一步走格编号
+        :return: 是否删除了走法，走法已被删除或局势不在AI库中时为False
         """
-        solutions = self.__ttt_ai_dict[board_key]
-        if str(solution) in solutions:
-            solutions.remove(str(solution))
-        if len(solutions) == 0:
-            del self.__ttt_ai_dict[board_key]
+        pruned = self.__prune(board_key, str(solution))
+        if pruned and self.__journal_file_name is not None and self.__writer is None:
+            self.__journal_records.append((board_key, str(solution)))
+        return pruned
+
+    def __prune(self, board_key, solution):
+        """
+        从局势的走法列表中删除走法
+        :param solution: 走格编号字串
+        :return: 是否删除了走法
+        """
+        solutions = self.__find_solutions(board_key)
+        if solutions is None or solution not in solutions:
+            return False
+        self.__ttt_ai_dict[board_key] = solutions
+        solutions.remove(solution)
+        if len(solutions) == 0 and self.__ttt_ai_store is None:
+            del self.__ttt_ai_dict[board_key]  # 二进制AI库需保留空列表以屏蔽库中的局势
+        return True
 
     def save_dict(self, file_name):
         """
-        把新的AI写入文件
+        把新的AI写入文件，按读取时的格式写入，启用后台写入时只提交快照
         """
-        ttt_items = []
-        for ai_key, ai_list in self.__ttt_ai_dict.items():
-            ttt_item = ai_key + ":" + ",".join(ai_list)
-            ttt_items.append(ttt_item)
-        ttt_ai_fullstr = "|".join(ttt_items)
-        with open(file_name, "w") as file:
-            file.write(ttt_ai_fullstr)
+        if self.__writer is not None:
+            self.__submit_save(file_name)
+            return
+        if not self.__binary_format:
+            tttstore.replace_file(file_name, tttstore.format_text(self.__ttt_ai_dict, self.__rules.size))
+            self.__file_signature = self.__stat_file(file_name)
+            return
+        ai_dict = self.snapshot()
+        self.__close_store()  # 先解除映射再覆盖文件
+        tttstore.write_store(file_name, ai_dict, tttstore.FLAG_CANONICAL,
+                             self.__rules.width, self.__rules.height, self.__rules.win_length)
+        self.__ttt_ai_dict.clear()
+        self.__ttt_ai_store = tttstore.TictactoeStore(file_name)
+        self.__file_signature = self.__stat_file(file_name)
+
+    def __submit_save(self, file_name):
+        """
+        取AI库的快照交给后台写入：文本AI库写好后直接改名覆盖，
+        二进制AI库仍被本线程映射，写成临时文件后由__finish_saves在本线程中换上，
+        两者写好后的修改时间和大小都由__finish_saves在本线程中记下，以免与load_dict竞争
+        """
+        journal_file_name = self.__journal_file_name
+        if not self.__binary_format:
+            ai_dict = {key: list(solutions) for key, solutions in self.__ttt_ai_dict.items()}
+
+            def write():
+                tttstore.replace_file(file_name, tttstore.format_text(ai_dict, self.__rules.size))
+                if journal_file_name is not None:
+                    tttstore.clear_journal(journal_file_name)
+                self.__saved_texts[file_name] = self.__stat_file(file_name)
+        else:
+            store = self.__ttt_ai_store  # 写入前不会关闭：换上新文件要等写入线程空闲
+            changed = {key: list(solutions) for key, solutions in self.__ttt_ai_dict.items()}
+            saving_file_name = file_name + ".saving"
+            rules = self.__rules
+
+            def write():
+                ai_dict = dict() if store is None else dict(store.items())
+                ai_dict.update(changed)
+                ai_dict = {key: solutions for key, solutions in ai_dict.items() if solutions}  # 同snapshot，不含已无走法的局势
+                tttstore.write_store(saving_file_name, ai_dict, tttstore.FLAG_CANONICAL, rules.width, rules.height, rules.win_length)
+                self.__saved_stores[file_name] = (saving_file_name, changed)
+        self.__writer.submit(("save", os.path.abspath(file_name)), write)
+
+    def __finish_saves(self, wait):
+        """
+        换上后台已写好的二进制AI库，记下后台已写好的AI文件的修改时间和大小
+        :param wait: 是否等待写入线程空闲，否则写入线程忙时直接返回
+        :return: 后台写入是否都已完成
+        """
+        if self.__writer is None:
+            return True
+        if wait:
+            self.__writer.flush()
+        elif self.__writer.busy:
+            return False
+        for file_name, (saving_file_name, changed) in self.__saved_stores.items():
+            self.__close_store()
+            os.replace(saving_file_name, file_name)
+            self.__ttt_ai_store = tttstore.TictactoeStore(file_name)
+            for key, solutions in changed.items():
+                if self.__ttt_ai_dict.get(key) == solutions:
+                    del self.__ttt_ai_dict[key]  # 已写进新文件且之后未再修改的局势
+            if self.__journal_file_name is not None:
+                tttstore.clear_journal(self.__journal_file_name)
+            self.__file_signature = self.__stat_file(file_name)
+        self.__saved_stores.clear()
+        for signature in self.__saved_texts.values():
+            self.__file_signature = signature
+        self.__saved_texts.clear()
+        return True
+
+    def snapshot(self):
+        """
+        AI库的完整副本（不含已无走法的局势），修改副本不影响AI
+        """
+        ai_dict = dict() if self.__ttt_ai_store is None else dict(self.__ttt_ai_store.items())
+        ai_dict.update(self.__ttt_ai_dict)
+        return {key: list(solutions) for key, solutions in ai_dict.items() if len(solutions) > 0}
+
+    def load_snapshot(self, ai_dict):
+        """
+        用AI库副本替换全部AI库，之后的AI与任何文件无关
+        """
+        self.__finish_saves(True)
+        self.__close_store()
+        self.__ttt_ai_dict = {key: list(solutions) for key, solutions in ai_dict.items()}
+        self.__binary_format = False
+        self.__file_signature = None
+
+    def flush_journal(self):
+        """
+        把新的剪枝记录追加到学习日志
+        :return: 日志文件中的记录数
+        """
+        if len(self.__journal_records) > 0:
+            tttstore.append_journal(self.__journal_file_name, self.__journal_records, self.__rules.size)
+            self.__journal_size += len(self.__journal_records)
+            self.__journal_records = []
+        return self.__journal_size
+
+    def compact(self, file_name):
+        """
+        把学习日志合并进AI库并清空日志
+        """
+        if self.__writer is not None:
+            self.__submit_save(file_name)  # 后台写入时没有新的日志记录，整体保存后清空日志
+            return
+        self.save_dict(file_name)
+        tttstore.clear_journal(self.__journal_file_name)
+        self.__journal_records = []
+        self.__journal_size = 0
 
 
 class TictactoeController:
@@ -70,35 +544,87 @@ class TictactoeController:
     井字棋游戏控制器：主要负责游戏逻辑处理和电脑AI调用
     """
 
-    def __init__(self):
-        self.__ai = TictactoeAI()
-        self.__ai_file_name = "ttt_ai_file.txt"
-        self.__board_data = []
+    def __init__(self, ai_file_name="ttt_ai_file.txt", journal_threshold=None, ai=None, rules=None, metrics=None, writer=None):
+        self.__rules = STANDARD_RULES if rules is None else rules  # 棋盘规则，默认为标准井字棋
+        self.__ai = TictactoeAI.shared(ai_file_name, self.__rules) if ai is None else ai  # 可传入独立的AI代替进程内共享的AI
+        self.__metrics = metrics  # 运行统计（tttmetrics.ControllerMetrics），None表示不统计
+        if metrics is not None:
+            self.__ai = metrics.instrument(self, self.__ai)  # 控制器方法换成计时的包装，经统计代理调用AI
+        self.__ai_file_name = ai_file_name  # 文本格式或二进制格式AI库
+        self.__journal_threshold = journal_threshold  # 日志记录数达到此值时合并进AI库，None表示不使用日志
+        if journal_threshold is not None:
+            self.__ai.set_journal(ai_file_name + ".journal")
+        self.__writer = writer  # 后台写入线程（tttstore.BackgroundWriter），None表示在调用线程中写文件，设置后不写日志
+        if writer is not None:
+            self.__ai.set_writer(writer)
+        self.__player_bits = 0  # 玩家位棋盘
+        self.__computer_bits = 0  # 电脑位棋盘
+        self.__empty_count = self.__rules.size  # 空格数，为0时判平局
+        self.__winner = 0  # 连成一线的一方，每次落子后只检查过该子的线
         self.__computer_lose = False
         self.__last_board = None
         self.__last_step = None
 
     @property
     def board_data(self):
-        return self.__board_data
+        """
+        兼容视图：各格数字列表，0=空，1=玩家，2=电脑
+        """
+        return [(self.__player_bits >> i & 1) | (self.__computer_bits >> i & 1) << 1 for i in range(self.__rules.size)]
+
+    @property
+    def rules(self):
+        return self.__rules
+
+    @property
+    def metrics(self):
+        return self.__metrics
+
+    @property
+    def bitboards(self):
+        """
+        (玩家位棋盘, 电脑位棋盘)
+        """
+        return self.__player_bits, self.__computer_bits
+
+    @property
+    def board_key(self):
+        """
+        当前局势编码
+        """
+        return self.__rules.board_key(self.__player_bits, self.__computer_bits)
 
     def init_ai(self):
         """
-        初始化AI
+        初始化AI，AI文件未被外部修改时沿用已读取的AI库
         """
-        self.__ai.read_dict(self.__ai_file_name)
+        self.__ai.load_dict(self.__ai_file_name)
 
     def update_ai(self):
         """
-        更新AI文件
+        更新AI文件，使用日志时只追加本局的剪枝记录，使用后台写入时提交整个AI库（连续的保存合并为一次）
         """
-        self.__ai.save_dict(self.__ai_file_name)
+        if self.__journal_threshold is None or self.__writer is not None:
+            self.__ai.save_dict(self.__ai_file_name)
+        elif self.__ai.flush_journal() >= self.__journal_threshold:
+            self.__ai.compact(self.__ai_file_name)
+
+    def close_ai(self):
+        """
+        结束游戏时把学习日志合并进AI文件，并等待后台写入完成
+        """
+        if self.__journal_threshold is not None:
+            self.__ai.compact(self.__ai_file_name)
+        self.__ai.wait_saves()
 
     def init_board(self):
         """
         初始化棋盘
         """
-        self.__board_data = [0 for _ in range(9)]
+        self.__player_bits = 0
+        self.__computer_bits = 0
+        self.__empty_count = self.__rules.size
+        self.__winner = 0
         self.__computer_lose = False
         self.__last_board = None
         self.__last_step = None
@@ -108,24 +634,36 @@ class TictactoeController:
         玩家走棋
         :return: 走棋状态编码
         """
-        if not 1 <= step_pos <= 9:
+        if not 1 <= step_pos <= self.__rules.size:
             return 1
-        if self.__board_data[step_pos - 1] != 0:
+        step_bit = 1 << (step_pos - 1)
+        if (self.__player_bits | self.__computer_bits) & step_bit:
             return 2
-        self.__board_data[step_pos - 1] = 1
+        self.__player_bits |= step_bit
+        self.__placed(1, self.__player_bits, step_pos)
         return 0
 
+    def __placed(self, side, bits, step_pos):
+        """
+        落子后更新空格数和胜负
+        """
+        self.__empty_count -= 1
+        if self.__winner == 0 and self.__rules.is_win(bits, step_pos):
+            self.__winner = side
+
     def computer_step(self):
         """
         电脑走棋
         """
-        record_board = "".join([str(item) for item in self.__board_data])
-        ai_step = self.__ai.get_solution(record_board)
+        canon_board, symmetry_index = self.__rules.canonical_board(self.__player_bits, self.__computer_bits)  # AI库按规范局势记录走法
+        ai_step = self.__ai.get_solution(canon_board)
         if ai_step is None:
             self.__computer_lose = True  # 如果无棋可走自动判电脑认输
         else:
-            self.__board_data[ai_step - 1] = 2
-            self.__last_board = record_board
+            step_pos = self.__rules.symmetries[symmetry_index][ai_step - 1] + 1
+            self.__computer_bits |= 1 << (step_pos - 1)
+            self.__placed(2, self.__computer_bits, step_pos)
+            self.__last_board = canon_board
             self.__last_step = ai_step
 
     def check_result(self):
@@ -137,33 +675,12 @@ class TictactoeController:
         if self.__computer_lose:
             result = 1  # 电脑认输的时候自动判玩家赢
         else:
-            check_str_list = [
-                "".join([str(self.__board_data[i]) for i in range(len(self.__board_data)) if i < 3]),
-                "".join([str(self.__board_data[i]) for i in range(len(self.__board_data)) if 3 <= i < 6]),
-                "".join([str(self.__board_data[i]) for i in range(len(self.__board_data)) if i >= 6]),
-                "".join([str(self.__board_data[i]) for i in range(len(self.__board_data)) if i % 3 == 0]),
-                "".join([str(self.__board_data[i]) for i in range(len(self.__board_data)) if i % 3 == 1]),
-                "".join([str(self.__board_data[i]) for i in range(len(self.__board_data)) if i % 3 == 2]),
-                "".join((str(self.__board_data[0]), str(self.__board_data[4]), str(self.__board_data[8]))),
-                "".join((str(self.__board_data[2]), str(self.__board_data[4]), str(self.__board_data[6])))
-            ]
-            for check_str in check_str_list:
-                if check_str == "111":
-                    result = 1  # 玩家赢
-                    break
-                if check_str == "222":
-                    result = 2  # 电脑赢
-                    break
-            """
-            若全填满但未决出胜负判平局
-            """
-            if result not in (1, 2):
-                have_zero = False
-                for item in self.__board_data:
-                    if item == 0:
-                        have_zero = True
-                if not have_zero:
-                    result = -1
+            if self.__winner == 1:
+                result = 1  # 玩家赢
+            elif self.__winner == 2:
+                result = 2  # 电脑赢
+            elif self.__empty_count == 0:
+                result = -1  # 若全填满但未决出胜负判平局
             if result == 1:
                 self.__computer_lose = True  # 无论玩家赢需要更新AI
         if self.__computer_lose:
@@ -177,8 +694,8 @@ class TictactoeView:
     井字棋游戏视图：主要负责游戏界面输出和处理玩家输入指令请求
     """
 
-    def __init__(self):
-        self.__controller = TictactoeController()
+    def __init__(self, ai_file_name="ttt_ai_file.txt", rules=None):
+        self.__controller = TictactoeController(ai_file_name, rules=rules)
 
     def main(self):
         """
@@ -197,11 +714,8 @@ class TictactoeView:
         print("井字棋 Tic-tac-toe")
         print()
         print("请按下列图示走棋：")
-        print("1 | 2 | 3")
-        print("--+---+--")
-        print("4 | 5 | 6")
-        print("--+---+--")
-        print("7 | 8 | 9")
+        rules = self.__controller.rules
+        self.__print_rows([str(i + 1) for i in range(rules.size)])
         print("你是X，我是O，请你先走棋。")
         print()
 
@@ -249,9 +763,14 @@ class TictactoeView:
 
     def __print_board(self):
         patterns = [" ", "X", "O"]
-        board_data = self.__controller.board_data
-        print("%s | %s | %s" % (patterns[board_data[0]], patterns[board_data[1]], patterns[board_data[2]]))
-        print("--+---+--")
-        print("%s | %s | %s" % (patterns[board_data[3]], patterns[board_data[4]], patterns[board_data[5]]))
-        print("--+---+--")
-        print("%s | %s | %s" % (patterns[board_data[6]], patterns[board_data[7]], patterns[board_data[8]]))
+        self.__print_rows([patterns[item] for item in self.__controller.board_data])
+
+    def __print_rows(self, cells):
+        """
+        按棋盘形状输出各格文字，格间用分隔线隔开
+        """
+        width = self.__controller.rules.width
+        cell_width = max(len(cell) for cell in cells)
+        rows = [" | ".join(cell.rjust(cell_width) for cell in cells[i:i + width]) for i in range(0, len(cells), width)]
+        separator = "+".join(["-" * (cell_width + 1)] + ["-" * (cell_width + 2)] * (width - 2) + ["-" * (cell_width + 1)])
+        print(("\n" + separator + "\n").join(rows))
@@ -0,0 +1,305 @@
+"""
+井字棋蒙特卡洛树搜索AI Tic-tac-toe Monte Carlo tree search (UCT)
+
+每次模拟从根节点按UCT公式选到叶节点，展开叶节点的全部走法，再从叶节点随机下完一局，把结果回传到路径上各节点：
+    树存在按节点下标索引的并列数组里，每个节点的子节点下标连续，只记录起始下标和个数
+    随机对局在空格下标数组上进行，随机取一个空格后与末尾交换再弹出
+    电脑走棋后记住所走的子节点，下一步时在它的子节点中找到玩家的走法，把这棵子树整理到数组开头继续用
+    AI只收到规范局势，树保持第一次建树时的方向，用对称变换在树的方向和规范局势的方向之间换算
+    可限定每步的模拟次数和秒数，到达任一个就停止
+大棋盘只展开已有棋子附近的空格（同tttsearch），随机对局仍可下在任何空格。
+与TictactoeAI接口相同（get_solution等），可作为ai参数传给TictactoeController，不学习，AI库相关方法为空操作。
+"""
+import math
+import random
+import time
+
+import tttengine
+import tttsearch
+
+EXPLORATION = 1.4  # UCT公式中探索项的系数
+MAX_NODES = 1000000  # 树的节点数上限，到达后不再展开
+
+
+def _untransform(bits, symmetry):
+    """
+    对称变换的逆变换：变换后第i格取原局势第symmetry[i]格
+    :return: 原局势的位棋盘
+    """
+    result = 0
+    for i, source in enumerate(symmetry):
+        if bits >> i & 1:
+            result |= 1 << source
+    return result
+
+
+class TictactoeMCTSAI:
+    """
+    井字棋UCT蒙特卡洛树搜索AI
+    """
+
+    def __init__(self, rules=None, iterations=None, time_limit=1.0, exploration=EXPLORATION, max_nodes=MAX_NODES,
+                 seed=None):
+        """
+        :param rules: 棋盘规则，None表示标准井字棋
+        :param iterations: 每步的模拟次数上限，None表示不限
+        :param time_limit: 每步的秒数上限，None表示不限
+        :param exploration: UCT公式中探索项的系数
+        :param max_nodes: 树的节点数上限
+        :param seed: 随机数种子
+        """
+        if iterations is None and time_limit is None:
+            raise ValueError("iterations和time_limit至少要限定一个")
+        self.__rules = tttengine.STANDARD_RULES if rules is None else rules
+        self.__iterations = iterations
+        self.__time_limit = time_limit
+        self.__exploration = exploration
+        self.__max_nodes = max_nodes
+        self.__rng = random.Random(seed)
+        self.__neighbors = tttsearch.neighbor_masks(self.__rules)
+        self.__center = (self.__rules.height // 2) * self.__rules.width + self.__rules.width // 2
+        # 节点数组：走入该节点的格下标、首个子节点下标（-1表示未展开）、子节点数、访问次数、走入该节点一方的得分
+        self.__moves = []
+        self.__first_child = []
+        self.__child_count = []
+        self.__visits = []
+        self.__wins = []
+        self.__root_computer_bits = 0  # 树方向的根局势
+        self.__root_player_bits = 0
+        self.__symmetry = tuple(range(self.__rules.size))  # 规范局势第i格对应树的第symmetry[i]格
+        self.__chosen = None  # 上一步电脑走的子节点
+        self.__stats = dict()
+
+    @property
+    def stats(self):
+        """
+        最近一步的统计：模拟次数、用时、每秒模拟次数、树的节点数、沿用的节点数、所选走法的访问次数和胜率
+        """
+        return dict(self.__stats)
+
+    def get_solution(self, board_key):
+        """
+        按照局势搜索走法
+        :param board_key: 轮到电脑走的局势编码
+        :return: 走格编号，若已无空格则返回None
+        """
+        player_bits, computer_bits = self.__rules.board_bits(board_key)
+        if player_bits | computer_bits == self.__rules.full_mask:
+            return None
+        if not self.__reroot(player_bits, computer_bits):
+            self.__reset(player_bits, computer_bits)
+        reused = len(self.__moves)
+        start_time = time.perf_counter()
+        deadline = None if self.__time_limit is None else start_time + self.__time_limit
+        playouts = 0
+        while self.__iterations is None or playouts < self.__iterations:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            self.__playout()
+            playouts += 1
+        seconds = time.perf_counter() - start_time
+        start = self.__first_child[0]
+        if start < 0:
+            self.__expand(0, self.__root_computer_bits, self.__root_player_bits)  # 一次也没有模拟
+            start = self.__first_child[0]
+        best = max(range(start, start + self.__child_count[0]), key=self.__visits.__getitem__)
+        self.__chosen = best
+        self.__stats = {
+            "playouts": playouts,
+            "seconds": seconds,
+            "playouts_per_second": playouts / seconds if seconds > 0 else 0.0,
+            "tree_size": len(self.__moves),
+            "reused_nodes": reused,
+            "visits": self.__visits[best],
+            "win_rate": self.__wins[best] / self.__visits[best] if self.__visits[best] > 0 else 0.0
+        }
+        return self.__symmetry.index(self.__moves[best]) + 1
+
+    def __reset(self, player_bits, computer_bits):
+        """
+        以规范局势为根重新建树
+        """
+        self.__moves = [-1]
+        self.__first_child = [-1]
+        self.__child_count = [0]
+        self.__visits = [0]
+        self.__wins = [0.0]
+        self.__root_computer_bits = computer_bits
+        self.__root_player_bits = player_bits
+        self.__symmetry = tuple(range(self.__rules.size))
+
+    def __reroot(self, player_bits, computer_bits):
+        """
+        在上一步电脑走法的子节点中找到当前局势，把它的子树作为新的树
+        :return: 是否找到
+        """
+        chosen, self.__chosen = self.__chosen, None
+        if chosen is None or self.__first_child[chosen] < 0:
+            return False
+        tree_computer_bits = self.__root_computer_bits | 1 << self.__moves[chosen]
+        tree_player_bits = self.__root_player_bits
+        start = self.__first_child[chosen]
+        for symmetry in self.__rules.symmetries:
+            if _untransform(computer_bits, symmetry) != tree_computer_bits:
+                continue
+            next_player_bits = _untransform(player_bits, symmetry)
+            added = next_player_bits & ~tree_player_bits
+            if next_player_bits & tree_player_bits != tree_player_bits or added == 0 or added & (added - 1):
+                continue
+            step = added.bit_length() - 1
+            for child in range(start, start + self.__child_count[chosen]):
+                if self.__moves[child] == step:
+                    self.__compact(child)
+                    self.__root_computer_bits, self.__root_player_bits = tree_computer_bits, next_player_bits
+                    self.__symmetry = symmetry
+                    return True
+        return False
+
+    def __compact(self, root):
+        """
+        把root的子树按层序复制到新数组，其余节点丢弃
+        """
+        moves, first_child, child_count = [self.__moves[root]], [-1], [self.__child_count[root]]
+        visits, wins = [self.__visits[root]], [self.__wins[root]]
+        queue = [root]
+        index = 0
+        while index < len(queue):
+            start = self.__first_child[queue[index]]
+            if start >= 0:
+                first_child[index] = len(moves)
+                for child in range(start, start + self.__child_count[queue[index]]):
+                    queue.append(child)
+                    moves.append(self.__moves[child])
+                    first_child.append(-1)
+                    child_count.append(self.__child_count[child])
+                    visits.append(self.__visits[child])
+                    wins.append(self.__wins[child])
+            index += 1
+        self.__moves, self.__first_child, self.__child_count = moves, first_child, child_count
+        self.__visits, self.__wins = visits, wins
+
+    def __expand(self, node, own_bits, enemy_bits):
+        """
+        展开节点：大棋盘只展开已有棋子附近的空格，顺序随机
+        """
+        occupied = own_bits | enemy_bits
+        if occupied:
+            nearby = 0
+            bits = occupied
+            while bits:
+                low_bit = bits & -bits
+                nearby |= self.__neighbors[low_bit.bit_length() - 1]
+                bits ^= low_bit
+            candidates = nearby & ~occupied & self.__rules.full_mask
+            if not candidates:
+                candidates = ~occupied & self.__rules.full_mask  # 附近已下满
+            steps = [i for i in range(self.__rules.size) if candidates >> i & 1]
+            self.__rng.shuffle(steps)
+        else:
+            steps = [self.__center]
+        self.__first_child[node] = len(self.__moves)
+        self.__child_count[node] = len(steps)
+        self.__moves.extend(steps)
+        self.__first_child.extend([-1] * len(steps))
+        self.__child_count.extend([0] * len(steps))
+        self.__visits.extend([0] * len(steps))
+        self.__wins.extend([0.0] * len(steps))
+
+    def __select(self, node):
+        """
+        按UCT公式选子节点，未访问过的子节点优先
+        """
+        start = self.__first_child[node]
+        visits, wins = self.__visits, self.__wins
+        log_visits = math.log(visits[node])
+        best, best_value = start, -1.0
+        for child in range(start, start + self.__child_count[node]):
+            child_visits = visits[child]
+            if child_visits == 0:
+                return child
+            value = wins[child] / child_visits + self.__exploration * math.sqrt(log_visits / child_visits)
+            if value > best_value:
+                best, best_value = child, value
+        return best
+
+    def __playout(self):
+        """
+        一次模拟：选择、展开、随机对局、回传
+        """
+        own_bits, enemy_bits = self.__root_computer_bits, self.__root_player_bits
+        side = 0  # 走棋方，0=电脑，1=玩家
+        node = 0
+        path = [0]
+        winner = None
+        while self.__first_child[node] >= 0:
+            node = self.__select(node)
+            path.append(node)
+            step = self.__moves[node]
+            own_bits |= 1 << step
+            if self.__rules.is_win(own_bits, step + 1):
+                winner = side
+                break
+            if own_bits | enemy_bits == self.__rules.full_mask:
+                winner = -1
+                break
+            own_bits, enemy_bits = enemy_bits, own_bits
+            side ^= 1
+        if winner is None:
+            if len(self.__moves) < self.__max_nodes:
+                self.__expand(node, own_bits, enemy_bits)
+            winner = self.__rollout(own_bits, enemy_bits, side)
+        for depth, node in enumerate(path):
+            self.__visits[node] += 1
+            if winner == -1:
+                self.__wins[node] += 0.5
+            elif winner == (depth - 1) & 1:
+                self.__wins[node] += 1.0  # 走入该节点的一方赢
+        return winner
+
+    def __rollout(self, own_bits, enemy_bits, side):
+        """
+        双方随机下完一局
+        :return: 赢方，0=电脑，1=玩家，-1=平局
+        """
+        occupied = own_bits | enemy_bits
+        empties = [i for i in range(self.__rules.size) if not occupied >> i & 1]
+        random_value = self.__rng.random
+        while empties:
+            index = int(random_value() * len(empties))
+            step = empties[index]
+            empties[index] = empties[-1]
+            empties.pop()
+            own_bits |= 1 << step
+            if self.__rules.is_win(own_bits, step + 1):
+                return side
+            own_bits, enemy_bits = enemy_bits, own_bits
+            side ^= 1
+        return -1
+
+    """
+    蒙特卡洛树搜索AI没有AI库，下列方法为空操作，以便与TictactoeAI互换
+    """
+
+    def load_dict(self, file_name):
+        pass
+
+    def save_dict(self, file_name):
+        pass
+
+    def set_journal(self, file_name):
+        pass
+
+    def set_writer(self, writer):
+        pass
+
+    def wait_saves(self):
+        pass
+
+    def flush_journal(self):
+        return 0
+
+    def compact(self, file_name):
+        pass
+
+    def remove_wrong_solution(self, board_key, step):
+        return False
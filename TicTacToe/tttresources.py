@@ -0,0 +1,81 @@
+"""
+井字棋图片资源 Tic-tac-toe image resources
+
+窗口模块不再在导入时执行rc_tttres（整个图片数据写成Python字节串，导入时要编译或反序列化后再注册），
+改为第一次画棋盘、缓存里还没有图片时才注册资源：
+    rcc      用QResource.registerResource注册二进制资源文件tttres.rcc，文件由Qt映射，用到时才读入
+    module   导入rc_tttres，与原来相同
+    auto     有tttres.rcc时用rcc，否则用module（默认）
+tttres.rcc由rc_tttres中的数据生成，内容与rc_tttres完全相同，图片改动后重新生成rc_tttres再运行：
+    python tttresources.py
+"""
+import argparse
+import importlib
+import os
+import struct
+
+from PyQt6.QtCore import QResource
+
+MODES = ("auto", "rcc", "module")
+RESOURCE_MODULE = "rc_tttres"
+RCC_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tttres.rcc")
+RCC_MAGIC = b"qres"
+RCC_VERSION = 3  # 与rc_tttres中qRegisterResourceData的版本一致
+
+_mode = "auto"  # 注册方式
+_registered = None  # 实际使用的注册方式，None表示尚未注册
+
+
+def set_mode(mode):
+    """
+    设置注册方式，须在注册之前调用
+    """
+    if mode not in MODES:
+        raise ValueError("未知的资源注册方式：%s" % mode)
+    if _registered is not None and mode not in ("auto", _registered):
+        raise RuntimeError("资源已按%s方式注册" % _registered)
+    global _mode
+    _mode = mode
+
+
+def register_resources():
+    """
+    注册图片资源，只在第一次调用时注册
+    :return: 实际使用的注册方式
+    """
+    global _registered
+    if _registered is None:
+        mode = _mode
+        if mode == "auto":
+            mode = "rcc" if os.path.exists(RCC_FILE) else "module"
+        if mode == "rcc":
+            if not QResource.registerResource(RCC_FILE):
+                raise RuntimeError("无法注册资源文件%s" % RCC_FILE)
+        else:
+            importlib.import_module(RESOURCE_MODULE)
+        _registered = mode
+    return _registered
+
+
+def build_rcc(file_name=RCC_FILE):
+    """
+    把rc_tttres中的资源数据写成二进制资源文件：文件头为标记、版本、目录树、数据、名称三段的偏移和标志，
+    其后依次为数据、名称、目录树
+    """
+    module = importlib.import_module(RESOURCE_MODULE)
+    header_size = len(RCC_MAGIC) + 5 * 4
+    data_offset = header_size
+    names_offset = data_offset + len(module.qt_resource_data)
+    tree_offset = names_offset + len(module.qt_resource_name)
+    with open(file_name, "wb") as file:
+        file.write(RCC_MAGIC + struct.pack(">5I", RCC_VERSION, tree_offset, data_offset, names_offset, 0))
+        file.write(module.qt_resource_data)
+        file.write(module.qt_resource_name)
+        file.write(module.qt_resource_struct)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="由rc_tttres生成二进制资源文件")
+    parser.add_argument("--output", default=RCC_FILE)
+    args = parser.parse_args()
+    build_rcc(args.output)
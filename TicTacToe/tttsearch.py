@@ -0,0 +1,337 @@
+"""
+井字棋搜索AI Tic-tac-toe alpha-beta search
+
+迭代加深的alpha-beta负极大值搜索，不需要训练好的AI库，适用于任意m,n,k棋盘：
+    Zobrist键：每方每格一个64位随机数，落子时异或更新，局势键即所有棋子随机数的异或
+    置换表：固定大小，按键的低位定位，本次搜索中更深的表项不被较浅的覆盖，上一步搜索留下的表项可被替换
+    走法排序：置换表走法优先，其余按历史启发值排序；大棋盘只考虑已有棋子附近的空格
+    时间预算：每步限定秒数，超时时用最近一次完整迭代的结果
+与TictactoeAI接口相同（get_solution等），可作为ai参数传给TictactoeController，搜索AI不学习，AI库相关方法为空操作。
+"""
+import random
+import time
+
+import tttengine
+
+WIN_SCORE = 1000000  # 必胜局势的评分，减去到赢棋的步数，赢得越快评分越高
+MAX_PLY = 1000
+INFINITY = WIN_SCORE + 1
+EXACT, LOWER, UPPER = 0, 1, 2  # 置换表评分的界类型：精确值、下界、上界
+NEIGHBOR_DISTANCE = 2  # 只考虑距已有棋子这么多格以内的空格
+LINE_WEIGHTS = 8  # 评估时连线中每多一个子权重乘以此数
+
+
+def neighbor_masks(rules, distance=NEIGHBOR_DISTANCE):
+    """
+    每格周围distance格以内（含本格）的位掩码
+    :return: 下标为格下标的元组
+    """
+    width, height = rules.width, rules.height
+    return tuple(
+        sum(1 << (row * width + col)
+            for row in range(max(0, i // width - distance), min(height, i // width + distance + 1))
+            for col in range(max(0, i % width - distance), min(width, i % width + distance + 1)))
+        for i in range(rules.size))
+
+
+class _Timeout(Exception):
+    """
+    搜索超时
+    """
+
+
+class TranspositionTable:
+    """
+    固定大小的置换表，每项为(键, 深度, 评分, 界类型, 最佳走法, 搜索代数)
+    """
+
+    def __init__(self, size_bits=16):
+        self.__mask = (1 << size_bits) - 1
+        self.__entries = [None] * (1 << size_bits)
+        self.__generation = 0
+        self.__used = 0
+
+    def __len__(self):
+        return self.__used
+
+    def new_search(self):
+        """
+        开始新一步的搜索，之前的表项都可被替换
+        """
+        self.__generation += 1
+
+    def probe(self, key):
+        """
+        查询局势
+        :return: 表项，没有时返回None
+        """
+        entry = self.__entries[key & self.__mask]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, score, bound, move):
+        """
+        保存局势，位置已被本次搜索中更深的其他局势占用时不保存
+        """
+        index = key & self.__mask
+        entry = self.__entries[index]
+        if entry is None:
+            self.__used += 1
+        elif entry[0] != key and entry[5] == self.__generation and entry[1] > depth:
+            return
+        self.__entries[index] = (key, depth, score, bound, move, self.__generation)
+
+
+class TictactoeSearchAI:
+    """
+    井字棋alpha-beta搜索AI
+    """
+
+    def __init__(self, rules=None, time_limit=1.0, max_depth=None, table_bits=16, seed=0):
+        """
+        :param rules: 棋盘规则，None表示标准井字棋
+        :param time_limit: 每步搜索的秒数上限，None表示不限时
+        :param max_depth: 最大搜索深度，None表示搜到棋盘下满
+        :param table_bits: 置换表大小为2的table_bits次方
+        :param seed: Zobrist随机数种子
+        """
+        self.__rules = tttengine.STANDARD_RULES if rules is None else rules
+        self.__time_limit = time_limit
+        self.__max_depth = max_depth
+        self.__table = TranspositionTable(table_bits)
+        size, width, height = self.__rules.size, self.__rules.width, self.__rules.height
+        rng = random.Random(seed)
+        self.__zobrist = tuple(tuple(rng.getrandbits(64) for _ in range(size)) for _ in range(2))  # [走棋方][格]
+        self.__neighbors = neighbor_masks(self.__rules)
+        self.__lines = self.__line_masks()
+        self.__weights = tuple(LINE_WEIGHTS ** count if count > 0 else 0 for count in range(self.__rules.win_length + 1))
+        self.__center = (height // 2) * width + width // 2 + 1
+        self.__history = [0] * (size + 1)
+        self.__nodes = 0
+        self.__deadline = None
+        self.__stats = dict()
+
+    def __line_masks(self):
+        """
+        棋盘上所有长为win_length的线段的位掩码，用于评估
+        """
+        width, height, win_length = self.__rules.width, self.__rules.height, self.__rules.win_length
+        lines = []
+        for row in range(height):
+            for col in range(width):
+                for col_step, row_step in tttengine.DIRECTIONS:
+                    end_row, end_col = row + row_step * (win_length - 1), col + col_step * (win_length - 1)
+                    if 0 <= end_row < height and 0 <= end_col < width:
+                        lines.append(sum(1 << ((row + row_step * i) * width + col + col_step * i) for i in range(win_length)))
+        return tuple(lines)
+
+    @property
+    def stats(self):
+        """
+        最近一步搜索的统计：深度、节点数、用时、评分、置换表项数
+        """
+        return dict(self.__stats)
+
+    def get_solution(self, board_key):
+        """
+        按照局势搜索走法
+        :param board_key: 轮到电脑走的局势编码
+        :return: 走格编号，若已无空格则返回None
+        """
+        player_bits, computer_bits = self.__rules.board_bits(board_key)
+        empty_bits = self.__rules.full_mask & ~(player_bits | computer_bits)
+        if not empty_bits:
+            return None
+        start_time = time.perf_counter()
+        self.__deadline = None if self.__time_limit is None else start_time + self.__time_limit
+        self.__nodes = 0
+        self.__table.new_search()
+        key = self.__key(player_bits, computer_bits)
+        empty_count = bin(empty_bits).count("1")
+        max_depth = empty_count if self.__max_depth is None else min(self.__max_depth, empty_count)
+        best_move, best_score, depth = None, 0, 0
+        for iteration in range(1, max_depth + 1):
+            try:
+                move, score = self.__search_root(computer_bits, player_bits, iteration, key, best_move)
+            except _Timeout:
+                break
+            best_move, best_score, depth = move, score, iteration
+            if abs(score) > WIN_SCORE - MAX_PLY:
+                break  # 已找到必胜或必败的走法
+        if best_move is None:
+            best_move = self.__ordered_moves(computer_bits, player_bits, empty_bits, None)[0]  # 第一层就超时
+        self.__stats = {
+            "depth": depth,
+            "nodes": self.__nodes,
+            "seconds": time.perf_counter() - start_time,
+            "score": best_score,
+            "table_size": len(self.__table)
+        }
+        return best_move
+
+    def __key(self, player_bits, computer_bits):
+        """
+        从头计算局势的Zobrist键
+        """
+        key = 0
+        for side, bits in ((0, computer_bits), (1, player_bits)):
+            for i in range(self.__rules.size):
+                if bits >> i & 1:
+                    key ^= self.__zobrist[side][i]
+        return key
+
+    def __search_root(self, own_bits, enemy_bits, depth, key, first_move):
+        """
+        根节点搜索，电脑方走棋
+        :return: (最佳走格编号, 评分)
+        """
+        empty_bits = self.__rules.full_mask & ~(own_bits | enemy_bits)
+        alpha = -INFINITY
+        best_move = None
+        for step_pos in self.__ordered_moves(own_bits, enemy_bits, empty_bits, first_move):
+            score = self.__score_move(own_bits, enemy_bits, step_pos, depth, alpha, INFINITY, 0, 0, key)
+            if best_move is None or score > alpha:
+                best_move, alpha = step_pos, score
+        self.__table.store(key, depth, alpha, EXACT, best_move)
+        return best_move, alpha
+
+    def __score_move(self, own_bits, enemy_bits, step_pos, depth, alpha, beta, ply, side, key):
+        """
+        走棋方在step_pos格落子后的评分
+        """
+        next_own_bits = own_bits | 1 << (step_pos - 1)
+        if self.__rules.is_win(next_own_bits, step_pos):
+            return WIN_SCORE - ply - 1
+        return -self.__search(enemy_bits, next_own_bits, depth - 1, -beta, -alpha, ply + 1, 1 - side,
+                              key ^ self.__zobrist[side][step_pos - 1])
+
+    def __search(self, own_bits, enemy_bits, depth, alpha, beta, ply, side, key):
+        """
+        负极大值alpha-beta搜索，对方上一步未连成一线
+        :param side: 走棋方，0=电脑，1=玩家
+        :return: 走棋方视角的评分
+        """
+        self.__nodes += 1
+        if self.__nodes & 1023 == 0 and self.__deadline is not None and time.perf_counter() > self.__deadline:
+            raise _Timeout()
+        empty_bits = self.__rules.full_mask & ~(own_bits | enemy_bits)
+        if not empty_bits:
+            return 0  # 下满判平局
+        if depth <= 0:
+            return self.__evaluate(own_bits, enemy_bits)
+        original_alpha = alpha
+        table_move = None
+        entry = self.__table.probe(key)
+        if entry is not None:
+            table_move = entry[4]
+            if entry[1] >= depth:
+                score = self.__from_table(entry[2], ply)
+                if entry[3] == EXACT:
+                    return score
+                if entry[3] == LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+        best_score, best_move = -INFINITY, None
+        for step_pos in self.__ordered_moves(own_bits, enemy_bits, empty_bits, table_move):
+            score = self.__score_move(own_bits, enemy_bits, step_pos, depth, alpha, beta, ply, side, key)
+            if score > best_score:
+                best_score, best_move = score, step_pos
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                self.__history[step_pos] += depth * depth
+                break
+        if best_score <= original_alpha:
+            bound = UPPER
+        elif best_score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.__table.store(key, depth, self.__to_table(best_score, ply), bound, best_move)
+        return best_score
+
+    @staticmethod
+    def __to_table(score, ply):
+        """
+        必胜必败评分换成相对当前局势的步数再存表
+        """
+        if score > WIN_SCORE - MAX_PLY:
+            return score + ply
+        if score < -WIN_SCORE + MAX_PLY:
+            return score - ply
+        return score
+
+    @staticmethod
+    def __from_table(score, ply):
+        if score > WIN_SCORE - MAX_PLY:
+            return score - ply
+        if score < -WIN_SCORE + MAX_PLY:
+            return score + ply
+        return score
+
+    def __ordered_moves(self, own_bits, enemy_bits, empty_bits, first_move):
+        """
+        候选走格编号：first_move优先，其余按历史启发值从高到低
+        """
+        occupied = own_bits | enemy_bits
+        if not occupied:
+            return [self.__center]
+        nearby = 0
+        bits = occupied
+        while bits:
+            low_bit = bits & -bits
+            nearby |= self.__neighbors[low_bit.bit_length() - 1]
+            bits ^= low_bit
+        candidates = nearby & empty_bits
+        moves = [i + 1 for i in range(self.__rules.size) if candidates >> i & 1]
+        moves.sort(key=self.__history.__getitem__, reverse=True)
+        if first_move is not None and first_move in moves:
+            moves.remove(first_move)
+            moves.insert(0, first_move)
+        return moves
+
+    def __evaluate(self, own_bits, enemy_bits):
+        """
+        走棋方视角的局势评估：只含一方棋子的线段按子数加权，己方减对方
+        """
+        score = 0
+        for line in self.__lines:
+            own_count = bin(own_bits & line).count("1")
+            enemy_count = bin(enemy_bits & line).count("1")
+            if enemy_count == 0:
+                score += self.__weights[own_count]
+            elif own_count == 0:
+                score -= self.__weights[enemy_count]
+        return score
+
+    """
+    搜索AI没有AI库，下列方法为空操作，以便与TictactoeAI互换
+    """
+
+    def load_dict(self, file_name):
+        pass
+
+    def save_dict(self, file_name):
+        pass
+
+    def set_journal(self, file_name):
+        pass
+
+    def set_writer(self, writer):
+        pass
+
+    def wait_saves(self):
+        pass
+
+    def flush_journal(self):
+        return 0
+
+    def compact(self, file_name):
+        pass
+
+    def remove_wrong_solution(self, board_key, step):
+        return False
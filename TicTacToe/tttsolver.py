@@ -0,0 +1,130 @@
+"""
+井字棋AI库生成器 Tic-tac-toe offline solver
+
+用带置换表的负极大值搜索求出全部局势的胜负，直接生成AI库，不必靠对局训练：
+    perfect     每个局势只保留最优走法
+    non-losing  每个局势保留全部不输的走法，必败局势不记录（电脑认输），即训练收敛后的AI库
+置换表以规范局势编码为键，互为对称的局势只搜索一次。
+AI库只收录玩家先走、电脑按AI库走棋时能遇到的局势，键为规范局势编码，可写成文本或二进制格式。
+只支持标准3×3井字棋，其他尺寸的棋盘没有AI库，游戏窗口默认用搜索走棋。
+"""
+import argparse
+import time
+
+import tttengine
+import tttstore
+
+MODES = ("perfect", "non-losing")
+
+
+def legal_moves(player_bits, computer_bits):
+    """
+    全部可走的格子编号
+    """
+    occupied = player_bits | computer_bits
+    return [i + 1 for i in range(9) if not occupied >> i & 1]
+
+
+def negamax(own_bits, enemy_bits, memo):
+    """
+    以走棋方视角评估局势：1=必胜，0=和棋，-1=必败
+    :param memo: 置换表，键为规范局势编码
+    """
+    if tttengine.WIN_TABLE[enemy_bits]:
+        return -1
+    if own_bits | enemy_bits == tttengine.FULL_MASK:
+        return 0
+    key = tttengine.canonical_board(own_bits, enemy_bits)[0]
+    if key not in memo:
+        memo[key] = max(-negamax(enemy_bits, own_bits | 1 << (pos - 1), memo)
+                        for pos in legal_moves(own_bits, enemy_bits))
+    return memo[key]
+
+
+def move_scores(own_bits, enemy_bits, memo):
+    """
+    走棋方各走法的评估值
+    :return: (评估值, 格子编号) 列表
+    """
+    return [(-negamax(enemy_bits, own_bits | 1 << (pos - 1), memo), pos) for pos in legal_moves(own_bits, enemy_bits)]
+
+
+def best_moves(own_bits, enemy_bits, memo):
+    """
+    走棋方的全部最优走法
+    :return: 格子编号列表
+    """
+    scores = move_scores(own_bits, enemy_bits, memo)
+    best_score = max(score for score, _ in scores)
+    return [pos for score, pos in scores if score == best_score]
+
+
+def solve(mode="perfect"):
+    """
+    生成AI库
+    :param mode: 生成方式，见MODES
+    :return: (AI库字典（键为规范局势编码，必败局势的走法为空列表）, 置换表大小)
+    """
+    memo = dict()
+    ai_dict = dict()
+    pending = [(0, 0)]  # 轮到玩家走的局势
+    while pending:
+        player_bits, computer_bits = pending.pop()
+        for pos in legal_moves(player_bits, computer_bits):
+            next_player_bits = player_bits | 1 << (pos - 1)
+            if tttengine.WIN_TABLE[next_player_bits] or next_player_bits | computer_bits == tttengine.FULL_MASK:
+                continue
+            key_code = tttengine.canonical_board(next_player_bits, computer_bits)[0]
+            if key_code in ai_dict:
+                continue
+            canon_player_bits, canon_computer_bits = tttengine.board_bits(key_code)  # 在规范局势上求走法
+            scores = move_scores(canon_computer_bits, canon_player_bits, memo)
+            if mode == "perfect":
+                best_score = max(score for score, _ in scores)
+                steps = [step for score, step in scores if score == best_score]
+            else:
+                steps = [step for score, step in scores if score >= 0]
+            ai_dict[key_code] = [str(step) for step in steps]
+            for step in steps:
+                next_computer_bits = canon_computer_bits | 1 << (step - 1)
+                if not tttengine.WIN_TABLE[next_computer_bits] \
+                        and canon_player_bits | next_computer_bits != tttengine.FULL_MASK:
+                    pending.append((canon_player_bits, next_computer_bits))
+    return ai_dict, len(memo)
+
+
+def generate(file_name, mode="perfect", binary=False):
+    """
+    生成AI库并写入AI文件
+    :param binary: 是否写成二进制格式
+    :return: 生成报告字典
+    """
+    start_time = time.perf_counter()
+    ai_dict, memo_size = solve(mode)
+    solve_time = time.perf_counter()
+    if binary:
+        tttstore.write_store(file_name, ai_dict, tttstore.FLAG_CANONICAL)
+    else:
+        with open(file_name, "w") as file:
+            file.write(tttstore.format_text(ai_dict))
+    end_time = time.perf_counter()
+    return {
+        "mode": mode,
+        "positions": sum(1 for val in ai_dict.values() if len(val) > 0),
+        "lost_positions": sum(1 for val in ai_dict.values() if len(val) == 0),
+        "transpositions": memo_size,
+        "solve_seconds": solve_time - start_time,
+        "write_seconds": end_time - solve_time
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="井字棋AI库生成器")
+    parser.add_argument("--mode", choices=MODES, default="perfect")
+    parser.add_argument("--binary", action="store_true", help="写成二进制AI库")
+    parser.add_argument("ai_file")
+    args = parser.parse_args()
+    report = generate(args.ai_file, args.mode, args.binary)
+    print("%d条局势已写入%s，必败局势%d条，置换表%d项" % (
+        report["positions"], args.ai_file, report["lost_positions"], report["transpositions"]))
+    print("搜索用时%.1f毫秒，写入用时%.1f毫秒" % (report["solve_seconds"] * 1000, report["write_seconds"] * 1000))
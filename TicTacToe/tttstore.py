@@ -0,0 +1,456 @@
+"""
+井字棋AI库存储 Tic-tac-toe AI store
+
+二进制AI库格式（版本1为3×3棋盘，版本2为其他尺寸的棋盘）：
+    文件头16字节：魔数(4s) 版本(H) 标志(H) 记录数(I) 键字节数(H) 掩码字节数(H)，小端
+    版本2在文件头后另有4字节：棋盘宽(B) 棋盘高(B) 连子数(B) 保留(B)
+    标志位FLAG_CANONICAL表示局势键已按对称变换规范化
+    记录区：按键升序排列的定长记录，每条为 局势键(大端无符号整数) + 走法掩码(大端无符号整数)
+局势键即局势编码：各格局势编码字串按三进制解释得到的整数，走法掩码第i位表示可走第i+1格，
+键字节数和掩码字节数随棋盘格数增长。
+文件以mmap只读映射，查询时在记录区二分查找，无需解析整个文件。
+
+学习日志：每行一条剪枝记录“局势编码字串:走法”，只追加写入，合并进AI库后清空。
+
+写AI文件时先写临时文件并落盘，再改名覆盖，写到一半出错或断电不会留下不完整的AI文件。
+BackgroundWriter在后台线程中执行写入任务，界面线程只需提交AI库的快照。
+"""
+import argparse
+import atexit
+import mmap
+import os
+import struct
+import threading
+import traceback
+
+STORE_MAGIC = b"TTTS"
+STORE_VERSION = 1
+SIZED_STORE_VERSION = 2  # 文件头带棋盘尺寸的版本
+KEY_SIZE = 4
+MASK_SIZE = 2
+BOARD_SIZE = 9
+BOARD_WIDTH = 3
+BOARD_HEIGHT = 3
+WIN_LENGTH = 3
+FLAG_CANONICAL = 1  # 标志位：局势键已按对称变换规范化
+
+_HEADER = struct.Struct("<4sHHIHH")
+_DIMENSIONS = struct.Struct("<BBBB")
+
+
+def key_size(board_size):
+    """
+    棋盘格数对应的局势键字节数，至少为KEY_SIZE
+    """
+    return max(KEY_SIZE, ((3 ** board_size - 1).bit_length() + 7) // 8)
+
+
+def mask_size(board_size):
+    """
+    棋盘格数对应的走法掩码字节数，至少为MASK_SIZE
+    """
+    return max(MASK_SIZE, (board_size + 7) // 8)
+
+
+def encode_key(board_key):
+    """
+    局势编码字串转换为局势编码
+    """
+    return int(board_key, 3)
+
+
+def decode_key(key_code, board_size=BOARD_SIZE):
+    """
+    局势编码转换为局势编码字串
+    :param board_size: 棋盘格数
+    """
+    digits = []
+    for _ in range(board_size):
+        key_code, digit = divmod(key_code, 3)
+        digits.append(str(digit))
+    return "".join(reversed(digits))
+
+
+def encode_moves(moves):
+    """
+    走法列表转换为走法掩码
+    :param moves: 走格编号字串列表
+    """
+    mask = 0
+    for move in moves:
+        mask |= 1 << (int(move) - 1)
+    return mask
+
+
+def decode_moves(mask, board_size=BOARD_SIZE):
+    """
+    走法掩码转换为走法列表
+    :param board_size: 棋盘格数
+    :return: 走格编号字串列表
+    """
+    return [str(i + 1) for i in range(board_size) if mask >> i & 1]
+
+
+def parse_text(text_data):
+    """
+    解析文本格式AI库
+    :return: AI库字典，键为局势编码
+    """
+    ai_dict = dict()
+    for pair in text_data.split("|"):
+        pair = pair.strip()  # 兼容文件中的换行
+        if pair == "":
+            continue
+        key, list_str_val = pair.split(":")
+        ai_dict[encode_key(key)] = list_str_val.split(",")
+    return ai_dict
+
+
+def format_text(ai_dict, board_size=BOARD_SIZE):
+    """
+    生成文本格式AI库，跳过已无走法的局势
+    :param board_size: 棋盘格数
+    """
+    return "|".join(decode_key(key_code, board_size) + ":" + ",".join(val)
+                    for key_code, val in ai_dict.items() if len(val) > 0)
+
+
+def is_store_file(file_name):
+    """
+    判断文件是否为二进制AI库
+    """
+    try:
+        with open(file_name, "rb") as file:
+            return file.read(len(STORE_MAGIC)) == STORE_MAGIC
+    except FileNotFoundError:
+        return False
+
+
+def append_journal(file_name, records, board_size=BOARD_SIZE):
+    """
+    追加剪枝记录到学习日志
+    :param records: (局势编码, 走格编号字串) 列表
+    :param board_size: 棋盘格数
+    """
+    with open(file_name, "a") as file:
+        file.write("".join("%s:%s\n" % (decode_key(key_code, board_size), move) for key_code, move in records))
+
+
+def read_journal(file_name):
+    """
+    读取学习日志，忽略写入中断造成的残缺行
+    :return: (局势编码, 走格编号字串) 列表
+    """
+    records = []
+    try:
+        with open(file_name, "r") as file:
+            for line in file:
+                line = line.strip()
+                if line.count(":") == 1:
+                    key, move = line.split(":")
+                    records.append((encode_key(key), move))
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def replace_file(file_name, data):
+    """
+    原子地写入文件：先写同目录的临时文件并落盘，再改名覆盖
+    :param data: 字串或字节串
+    """
+    temp_file_name = file_name + ".tmp"
+    with open(temp_file_name, "wb" if isinstance(data, bytes) else "w") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_file_name, file_name)
+
+
+def clear_journal(file_name):
+    """
+    删除已合并的学习日志
+    """
+    try:
+        os.remove(file_name)
+    except FileNotFoundError:
+        pass
+
+
+def write_store(file_name, ai_dict, flags=0, board_width=BOARD_WIDTH, board_height=BOARD_HEIGHT, win_length=WIN_LENGTH):
+    """
+    把AI库字典写成二进制AI库，跳过已无走法的局势
+    :param board_width: 棋盘宽度
+    :param board_height: 棋盘高度
+    :param win_length: 连成一线所需的子数
+    """
+    board_size = board_width * board_height
+    record_key_size, record_mask_size = key_size(board_size), mask_size(board_size)
+    records = sorted((key_code, encode_moves(val)) for key_code, val in ai_dict.items() if len(val) > 0)
+    if (board_width, board_height, win_length) == (BOARD_WIDTH, BOARD_HEIGHT, WIN_LENGTH):
+        chunks = [_HEADER.pack(STORE_MAGIC, STORE_VERSION, flags, len(records), record_key_size, record_mask_size)]
+    else:
+        chunks = [_HEADER.pack(STORE_MAGIC, SIZED_STORE_VERSION, flags, len(records), record_key_size, record_mask_size),
+                  _DIMENSIONS.pack(board_width, board_height, win_length, 0)]
+    for key_code, mask in records:
+        chunks.append(key_code.to_bytes(record_key_size, "big"))
+        chunks.append(mask.to_bytes(record_mask_size, "big"))
+    replace_file(file_name, b"".join(chunks))
+
+
+class TictactoeStore:
+    """
+    内存映射的只读二进制AI库
+    """
+
+    def __init__(self, file_name):
+        with open(file_name, "rb") as file:
+            self.__map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.__map) < _HEADER.size:
+            self.close()
+            raise ValueError("AI库文件不完整：" + file_name)
+        magic, version, flags, count, record_key_size, record_mask_size = _HEADER.unpack_from(self.__map, 0)
+        if magic != STORE_MAGIC or version not in (STORE_VERSION, SIZED_STORE_VERSION):
+            self.close()
+            raise ValueError("不支持的AI库文件：" + file_name)
+        self.__width, self.__height, self.__win_length = BOARD_WIDTH, BOARD_HEIGHT, WIN_LENGTH
+        self.__offset = _HEADER.size
+        if version == SIZED_STORE_VERSION:
+            if len(self.__map) < _HEADER.size + _DIMENSIONS.size:
+                self.close()
+                raise ValueError("AI库文件不完整：" + file_name)
+            self.__width, self.__height, self.__win_length, _ = _DIMENSIONS.unpack_from(self.__map, _HEADER.size)
+            self.__offset += _DIMENSIONS.size
+        if len(self.__map) != self.__offset + count * (record_key_size + record_mask_size):
+            self.close()
+            raise ValueError("AI库文件不完整：" + file_name)
+        self.__flags = flags
+        self.__count = count
+        self.__key_size = record_key_size
+        self.__record_size = record_key_size + record_mask_size
+
+    @property
+    def flags(self):
+        return self.__flags
+
+    @property
+    def dimensions(self):
+        """
+        (棋盘宽, 棋盘高, 连子数)
+        """
+        return self.__width, self.__height, self.__win_length
+
+    def __len__(self):
+        return self.__count
+
+    def __record(self, index):
+        start = self.__offset + index * self.__record_size
+        key_end = start + self.__key_size
+        return (int.from_bytes(self.__map[start:key_end], "big"),
+                int.from_bytes(self.__map[key_end:start + self.__record_size], "big"))
+
+    def get(self, key_code):
+        """
+        按照局势查询走法
+        :param key_code: 局势编码
+        :return: 走格编号字串列表，若无此局势则返回None
+        """
+        low, high = 0, self.__count
+        while low < high:
+            mid = (low + high) // 2
+            mid_key, mask = self.__record(mid)
+            if mid_key == key_code:
+                return decode_moves(mask, self.__width * self.__height)
+            if mid_key < key_code:
+                low = mid + 1
+            else:
+                high = mid
+        return None
+
+    def items(self):
+        """
+        按键升序遍历全部局势及走法
+        """
+        for index in range(self.__count):
+            key_code, mask = self.__record(index)
+            yield key_code, decode_moves(mask, self.__width * self.__height)
+
+    def close(self):
+        self.__map.close()
+
+
+class BackgroundWriter:
+    """
+    后台写入线程：按提交顺序执行写入任务，同一键尚未开始的任务被新任务替换，连续的保存只写最后一次，
+    进程退出时等待全部任务完成
+    """
+
+    __shared_writer = None  # 进程内共用的写入线程
+    __shared_users = 0  # 共用写入线程的引用数
+    __shared_lock = threading.Lock()
+
+    def __init__(self):
+        self.__condition = threading.Condition()
+        self.__queue = []  # [键, 任务] 列表
+        self.__running = False
+        self.__closed = False
+        self.__completed = 0  # 已执行的任务数
+        self.__coalesced = 0  # 被新任务替换掉的任务数
+        self.__errors = 0
+        self.__last_error = None
+        self.__thread = threading.Thread(target=self.__run, name="BackgroundWriter", daemon=True)
+        self.__thread.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def shared(cls):
+        """
+        获取进程内共用的写入线程并增加一次引用，用完调用release：共用同一份AI的各控制器须用同一个写入线程
+        """
+        with cls.__shared_lock:
+            if cls.__shared_writer is None:
+                cls.__shared_writer = cls()
+            cls.__shared_users += 1
+            return cls.__shared_writer
+
+    def release(self):
+        """
+        释放一次引用，最后一个引用释放时写完并关闭线程；不是共用的写入线程直接关闭
+        """
+        cls = type(self)
+        with cls.__shared_lock:
+            if self is cls.__shared_writer:
+                cls.__shared_users -= 1
+                if cls.__shared_users > 0:
+                    return
+                cls.__shared_writer = None
+        self.close()
+
+    @property
+    def busy(self):
+        """
+        是否有尚未完成的任务
+        """
+        with self.__condition:
+            return self.__running or len(self.__queue) > 0
+
+    @property
+    def last_error(self):
+        with self.__condition:
+            return self.__last_error
+
+    @property
+    def stats(self):
+        """
+        已执行、被合并、出错和排队中的任务数
+        """
+        with self.__condition:
+            return {
+                "completed": self.__completed,
+                "coalesced": self.__coalesced,
+                "errors": self.__errors,
+                "pending": len(self.__queue)
+            }
+
+    def submit(self, key, job):
+        """
+        提交写入任务
+        :param key: 任务的键，None表示不与其他任务合并（如追加日志）
+        :param job: 无参数的可调用对象，在后台线程中执行
+        """
+        with self.__condition:
+            if self.__closed:
+                raise RuntimeError("后台写入线程已关闭")
+            if key is not None:
+                for item in self.__queue:
+                    if item[0] == key:
+                        item[1] = job  # 排队中的同键任务改为执行新任务，保持原来的顺序
+                        self.__coalesced += 1
+                        return
+            self.__queue.append([key, job])
+            self.__condition.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        等待已提交的任务全部完成
+        :param timeout: 最长等待秒数，None表示一直等待
+        :return: 是否已全部完成
+        """
+        with self.__condition:
+            return self.__condition.wait_for(lambda: not self.__running and len(self.__queue) == 0, timeout)
+
+    def close(self):
+        """
+        执行完已提交的任务后结束线程，可重复调用
+        """
+        with self.__condition:
+            if self.__closed:
+                return
+            self.__closed = True
+            self.__condition.notify_all()
+        self.__thread.join()
+        atexit.unregister(self.close)
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                self.__condition.wait_for(lambda: self.__closed or len(self.__queue) > 0)
+                if len(self.__queue) == 0:
+                    return
+                _, job = self.__queue.pop(0)
+                self.__running = True
+            error = None
+            try:
+                job()
+            except Exception as job_error:
+                error = job_error
+                traceback.print_exc()
+            finally:
+                with self.__condition:
+                    if error is not None:
+                        self.__last_error = error
+                        self.__errors += 1
+                    self.__running = False
+                    self.__completed += 1
+                    self.__condition.notify_all()
+
+
+def text_to_store(text_file, store_file, board_width=BOARD_WIDTH, board_height=BOARD_HEIGHT, win_length=WIN_LENGTH):
+    """
+    文本格式AI库转换为二进制AI库
+    """
+    with open(text_file, "r") as file:
+        ai_dict = parse_text(file.read())
+    write_store(store_file, ai_dict, 0, board_width, board_height, win_length)
+    return len(ai_dict)
+
+
+def store_to_text(store_file, text_file):
+    """
+    二进制AI库转换为文本格式AI库
+    """
+    store = TictactoeStore(store_file)
+    try:
+        ai_dict = dict(store.items())
+        board_width, board_height, _ = store.dimensions
+    finally:
+        store.close()
+    with open(text_file, "w") as file:
+        file.write(format_text(ai_dict, board_width * board_height))
+    return len(ai_dict)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="井字棋AI库格式转换")
+    parser.add_argument("mode", choices=["to-bin", "to-text"])
+    parser.add_argument("source")
+    parser.add_argument("target")
+    parser.add_argument("--width", type=int, default=BOARD_WIDTH, help="文本格式AI库的棋盘宽度")
+    parser.add_argument("--height", type=int, default=BOARD_HEIGHT, help="文本格式AI库的棋盘高度")
+    parser.add_argument("--k", type=int, default=WIN_LENGTH, help="文本格式AI库连成一线所需的子数")
+    args = parser.parse_args()
+    if args.mode == "to-bin":
+        print("%d条局势已写入%s" % (text_to_store(args.source, args.target, args.width, args.height, args.k),
+                                  args.target))
+    else:
+        print("%d条局势已写入%s" % (store_to_text(args.source, args.target), args.target))
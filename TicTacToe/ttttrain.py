@@ -0,0 +1,251 @@
+"""
+井字棋AI自我训练 Tic-tac-toe headless trainer
+
+电脑方为学习中的AI，玩家方由对手引擎代走：
+    random  随机走棋
+    minimax 完美走棋（tttsolver的负极大值搜索）
+    self    另一个同样按输棋剪枝学习的AI
+训练过程中按remove_wrong_solution规则剪枝，结束时只写一次AI文件。
+只支持标准3×3井字棋，AI文件的棋盘尺寸不符时读取AI库报ValueError。
+
+多进程训练按轮进行：每轮各子进程用同一份AI库快照各下一批对局，只返回剪枝记录，
+主进程按排序后的顺序合并进AI库后开始下一轮。相同种子和进程数得到相同结果。
+"""
+import argparse
+import concurrent.futures
+import random
+import time
+
+import tttengine
+import tttsolver
+
+
+class RandomOpponent:
+    """
+    随机走棋的对手
+    """
+
+    def __init__(self, rng):
+        self.__rng = rng
+
+    def choose(self, player_bits, computer_bits):
+        return self.__rng.choice(tttsolver.legal_moves(player_bits, computer_bits))
+
+    def game_over(self, result):
+        pass
+
+
+class MinimaxOpponent:
+    """
+    完美走棋的对手，从最优走法中随机选一个
+    """
+
+    def __init__(self, rng):
+        self.__rng = rng
+        self.__memo = dict()
+
+    def choose(self, player_bits, computer_bits):
+        return self.__rng.choice(tttsolver.best_moves(player_bits, computer_bits, self.__memo))
+
+    def game_over(self, result):
+        pass
+
+
+class MatchboxOpponent:
+    """
+    与电脑AI同样学习的对手：每个局势保留全部走法，输棋后剪除最后一步
+    """
+
+    def __init__(self, rng):
+        self.__rng = rng
+        self.__matchboxes = dict()
+        self.__last_board = None
+        self.__last_step = None
+
+    def choose(self, player_bits, computer_bits):
+        board = (player_bits, computer_bits)
+        if board not in self.__matchboxes:
+            self.__matchboxes[board] = tttsolver.legal_moves(player_bits, computer_bits)
+        solutions = self.__matchboxes[board]
+        if len(solutions) == 0:
+            solutions = tttsolver.legal_moves(player_bits, computer_bits)  # 已无未输过的走法时随机走棋
+        step = self.__rng.choice(solutions)
+        self.__last_board, self.__last_step = board, step
+        return step
+
+    def game_over(self, result):
+        if result == 2 and self.__last_board is not None:
+            solutions = self.__matchboxes[self.__last_board]
+            if self.__last_step in solutions:
+                solutions.remove(self.__last_step)
+        self.__last_board = None
+        self.__last_step = None
+
+
+OPPONENTS = {
+    "random": RandomOpponent,
+    "minimax": MinimaxOpponent,
+    "self": MatchboxOpponent
+}
+
+
+def play_game(controller, opponent):
+    """
+    对手执玩家方先走，下完一局
+    :return: 2=电脑赢，1=玩家赢，-1=平局
+    """
+    return play_game_outcome(controller, opponent)[0]
+
+
+def play_game_outcome(controller, opponent):
+    """
+    同play_game，另给出电脑是否认输
+    :return: (结果, 电脑是否认输)，电脑认输时结果为1
+    """
+    controller.init_board()
+    resigned = False
+    while True:
+        controller.player_step(opponent.choose(*controller.bitboards))
+        result = controller.check_result()
+        if result != 0:
+            break
+        controller.computer_step()
+        result = controller.check_result()
+        if result != 0:
+            resigned = result == 1  # 电脑走棋后判玩家赢只能是电脑认输
+            break
+    opponent.game_over(result)
+    return result, resigned
+
+
+def train(games, opponent="random", seed=None, ai_file_name="ttt_ai_file.txt", window=1000):
+    """
+    训练电脑AI
+    :param games: 对局数
+    :param opponent: 对手引擎名称，见OPPONENTS
+    :param seed: 随机数种子，相同种子和AI文件得到相同结果
+    :param window: 收敛判定窗口：最后一次输棋（不含认输，同批量模拟）后至少连续这么多局不输才算收敛
+    :return: 训练报告字典
+    """
+    random.seed(seed)  # 电脑AI使用random模块的全局随机数
+    rng = random.Random(seed)
+    controller = tttengine.TictactoeController(ai_file_name)
+    controller.init_ai()
+    player = OPPONENTS[opponent](rng)
+    counts = {1: 0, 2: 0, -1: 0}
+    resignations = 0
+    last_loss = 0
+    start_time = time.perf_counter()
+    for game in range(1, games + 1):
+        result, resigned = play_game_outcome(controller, player)
+        counts[result] += 1
+        if resigned:
+            resignations += 1
+        elif result == 1:
+            last_loss = game  # 认输不算输棋：收敛后的AI在必败局势中一直认输，与批量模拟一致
+    elapsed = time.perf_counter() - start_time
+    controller.update_ai()
+    return {
+        "games": games,
+        "opponent": opponent,
+        "wins": counts[2],
+        "losses": counts[1] - resignations,
+        "resignations": resignations,
+        "draws": counts[-1],
+        "seconds": elapsed,
+        "games_per_second": games / elapsed if elapsed > 0 else 0.0,
+        "last_loss": last_loss,
+        "converged_after": last_loss if games - last_loss >= window else None
+    }
+
+
+def _play_batch(snapshot, opponent, seed, games):
+    """
+    子进程：用AI库快照下完一批对局
+    :return: (各局的(结果, 电脑是否认输)列表, 排序后的剪枝记录列表)
+    """
+    random.seed(seed)
+    ai = tttengine.TictactoeAI()
+    ai.load_snapshot(snapshot)
+    controller = tttengine.TictactoeController(ai=ai)
+    player = OPPONENTS[opponent](random.Random(seed))
+    results = [play_game_outcome(controller, player) for _ in range(games)]
+    learned = ai.snapshot()
+    prunes = sorted((key, solution) for key, solutions in snapshot.items()
+                    for solution in solutions if solution not in learned.get(key, ()))
+    return results, prunes
+
+
+def train_parallel(games, opponent="random", seed=None, ai_file_name="ttt_ai_file.txt", window=1000,
+                   workers=2, batch=1000):
+    """
+    多进程训练电脑AI
+    :param workers: 子进程数
+    :param batch: 每轮每个子进程的对局数，越小合并越频繁，学习越接近单进程训练
+    :return: 训练报告字典，含义同train
+    """
+    controller = tttengine.TictactoeController(ai_file_name)
+    controller.init_ai()
+    ai = tttengine.TictactoeAI.shared(ai_file_name)
+    seeds = random.Random(seed)
+    counts = {1: 0, 2: 0, -1: 0}
+    resignations = 0
+    last_loss = 0
+    played = 0
+    start_time = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        while played < games:
+            snapshot = ai.snapshot()
+            sizes = [min(batch, games - played - batch * i) for i in range(workers) if games - played - batch * i > 0]
+            futures = [executor.submit(_play_batch, snapshot, opponent, seeds.getrandbits(64), size) for size in sizes]
+            prunes = set()
+            for future in futures:  # 按提交顺序收集，保证结果与完成先后无关
+                results, batch_prunes = future.result()
+                for result, resigned in results:
+                    played += 1
+                    counts[result] += 1
+                    if resigned:
+                        resignations += 1
+                    elif result == 1:
+                        last_loss = played
+                prunes.update(batch_prunes)
+            for key, solution in sorted(prunes):
+                ai.remove_wrong_solution(key, int(solution))
+    elapsed = time.perf_counter() - start_time
+    controller.update_ai()
+    return {
+        "games": games,
+        "opponent": opponent,
+        "wins": counts[2],
+        "losses": counts[1] - resignations,
+        "resignations": resignations,
+        "draws": counts[-1],
+        "seconds": elapsed,
+        "games_per_second": games / elapsed if elapsed > 0 else 0.0,
+        "last_loss": last_loss,
+        "converged_after": last_loss if games - last_loss >= window else None,
+        "workers": workers
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="井字棋AI自我训练")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--opponent", choices=sorted(OPPONENTS), default="random")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--ai-file", default="ttt_ai_file.txt")
+    parser.add_argument("--window", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+    if args.workers > 1:
+        report = train_parallel(args.games, args.opponent, args.seed, args.ai_file, args.window, args.workers, args.batch)
+    else:
+        report = train(args.games, args.opponent, args.seed, args.ai_file, args.window)
+    print("对局%d：电脑赢%d，输%d，平%d，认输%d" % (
+        report["games"], report["wins"], report["losses"], report["draws"], report["resignations"]))
+    print("用时%.2f秒，每秒%.0f局" % (report["seconds"], report["games_per_second"]))
+    if report["converged_after"] is not None:
+        print("第%d局后不再输棋" % report["converged_after"])
+    else:
+        print("尚未收敛，最后一次输棋在第%d局" % report["last_loss"])
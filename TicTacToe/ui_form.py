@@ -15,89 +15,24 @@ from PyQt6.QtGui import (QBrush, QColor, QConicalGradient, QCursor,
     QFont, QFontDatabase, QGradient, QIcon,
     QImage, QKeySequence, QLinearGradient, QPainter,
     QPalette, QPixmap, QRadialGradient, QTransform)
-from PyQt6.QtWidgets import (QApplication, QFrame, QSizePolicy, QWidget)
+from PyQt6.QtWidgets import (QApplication, QSizePolicy, QVBoxLayout, QWidget)
 
-from qtttcellview import QTttCellView
+from qtttboardview import QTttBoardView
 
 class Ui_QTttWidget(object):
     def setupUi(self, QTttWidget):
         if not QTttWidget.objectName():
             QTttWidget.setObjectName(u"QTttWidget")
         QTttWidget.resize(301, 301)
-        QTttWidget.setMinimumSize(QSize(301, 301))
-        QTttWidget.setMaximumSize(QSize(301, 301))
-        self.tttgv_0 = QTttCellView(QTttWidget)
-        self.tttgv_0.setObjectName(u"tttgv_0")
-        self.tttgv_0.setGeometry(QRect(0, 0, 99, 99))
-        self.tttgv_0.setFrameShape(QFrame.Shape.NoFrame)
-        self.tttgv_0.setFrameShadow(QFrame.Shadow.Plain)
-        self.tttgv_0.setLineWidth(0)
-        self.tttgv_0.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.tttgv_0.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.tttgv_1 = QTttCellView(QTttWidget)
-        self.tttgv_1.setObjectName(u"tttgv_1")
-        self.tttgv_1.setGeometry(QRect(101, 0, 99, 99))
-        self.tttgv_1.setFrameShape(QFrame.Shape.NoFrame)
-        self.tttgv_1.setFrameShadow(QFrame.Shadow.Plain)
-        self.tttgv_1.setLineWidth(0)
-        self.tttgv_1.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.tttgv_1.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.tttgv_2 = QTttCellView(QTttWidget)
-        self.tttgv_2.setObjectName(u"tttgv_2")
-        self.tttgv_2.setGeometry(QRect(202, 0, 99, 99))
-        self.tttgv_2.setFrameShape(QFrame.Shape.NoFrame)
-        self.tttgv_2.setFrameShadow(QFrame.Shadow.Plain)
-        self.tttgv_2.setLineWidth(0)
-        self.tttgv_2.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.tttgv_2.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.tttgv_3 = QTttCellView(QTttWidget)
-        self.tttgv_3.setObjectName(u"tttgv_3")
-        self.tttgv_3.setGeometry(QRect(0, 101, 99, 99))
-        self.tttgv_3.setFrameShape(QFrame.Shape.NoFrame)
-        self.tttgv_3.setFrameShadow(QFrame.Shadow.Plain)
-        self.tttgv_3.setLineWidth(0)
-        self.tttgv_3.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.tttgv_3.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.tttgv_4 = QTttCellView(QTttWidget)
-        self.tttgv_4.setObjectName(u"tttgv_4")
-        self.tttgv_4.setGeometry(QRect(101, 101, 99, 99))
-        self.tttgv_4.setFrameShape(QFrame.Shape.NoFrame)
-        self.tttgv_4.setFrameShadow(QFrame.Shadow.Plain)
-        self.tttgv_4.setLineWidth(0)
-        self.tttgv_4.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.tttgv_4.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.tttgv_5 = QTttCellView(QTttWidget)
-        self.tttgv_5.setObjectName(u"tttgv_5")
-        self.tttgv_5.setGeometry(QRect(202, 101, 99, 99))
-        self.tttgv_5.setFrameShape(QFrame.Shape.NoFrame)
-        self.tttgv_5.setFrameShadow(QFrame.Shadow.Plain)
-        self.tttgv_5.setLineWidth(0)
-        self.tttgv_5.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.tttgv_5.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.tttgv_6 = QTttCellView(QTttWidget)
-        self.tttgv_6.setObjectName(u"tttgv_6")
-        self.tttgv_6.setGeometry(QRect(0, 202, 99, 99))
-        self.tttgv_6.setFrameShape(QFrame.Shape.NoFrame)
-        self.tttgv_6.setFrameShadow(QFrame.Shadow.Plain)
-        self.tttgv_6.setLineWidth(0)
-        self.tttgv_6.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.tttgv_6.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.tttgv_7 = QTttCellView(QTttWidget)
-        self.tttgv_7.setObjectName(u"tttgv_7")
-        self.tttgv_7.setGeometry(QRect(101, 202, 99, 99))
-        self.tttgv_7.setFrameShape(QFrame.Shape.NoFrame)
-        self.tttgv_7.setFrameShadow(QFrame.Shadow.Plain)
-        self.tttgv_7.setLineWidth(0)
-        self.tttgv_7.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.tttgv_7.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.tttgv_8 = QTttCellView(QTttWidget)
-        self.tttgv_8.setObjectName(u"tttgv_8")
-        self.tttgv_8.setGeometry(QRect(202, 202, 99, 99))
-        self.tttgv_8.setFrameShape(QFrame.Shape.NoFrame)
-        self.tttgv_8.setFrameShadow(QFrame.Shadow.Plain)
-        self.tttgv_8.setLineWidth(0)
-        self.tttgv_8.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.tttgv_8.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.verticalLayout = QVBoxLayout(QTttWidget)
+        self.verticalLayout.setSpacing(0)
+        self.verticalLayout.setObjectName(u"verticalLayout")
+        self.verticalLayout.setContentsMargins(0, 0, 0, 0)
+        self.tttboard = QTttBoardView(QTttWidget)
+        self.tttboard.setObjectName(u"tttboard")
+
+        self.verticalLayout.addWidget(self.tttboard)
+
 
         self.retranslateUi(QTttWidget)
 
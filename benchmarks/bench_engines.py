@@ -0,0 +1,328 @@
+"""
+引擎热点性能测试 Engine hot-path benchmarks
+
+不需要显示器，覆盖井字棋和六兵棋的：
+    read_dict / save_dict                        读写AI库，文本和二进制两种格式
+    get_solution_hit / get_solution_miss         查询AI库中有的局势和没有的局势
+    player_step / computer_step / check_result   用随附AI库随机对局时每次调用的耗时
+AI库大小：shipped为随附的AI文件（标准3×3棋盘），数字为合成AI库的局势条数。
+3×3棋盘的局势总数不到两万，合成AI库在5×5棋盘上随机生成规范局势，按(游戏, 大小, 种子)缓存在--cache-dir中。
+所有随机数都由--seed决定，种子相同的两次运行测的是完全相同的操作序列。
+
+    python benchmarks/bench_engines.py --output before.json
+    python benchmarks/bench_engines.py --output after.json
+    python benchmarks/bench_engines.py --compare before.json after.json
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+import benchutil
+import hpengine
+import hpstore
+import tttengine
+import tttstore
+
+SIZES = ("shipped", "10000", "100000", "1000000")
+QUICK_SIZES = ("shipped", "10000")
+FORMATS = ("text", "binary")
+LOOKUPS = 10000  # 每轮查询的局势数
+GAMES = 200  # 对局测试的局数
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+
+class TictactoeBench:
+    """
+    井字棋的测试对象
+    """
+    name = "tictactoe"
+    shipped_file = os.path.join(benchutil.TICTACTOE_DIR, "ttt_ai_file.txt")
+    standard_rules = tttengine.STANDARD_RULES
+    synthetic_rules = tttengine.TictactoeRules(5, 5, 4)
+
+    @staticmethod
+    def board_name(rules):
+        return "%dx%dk%d" % (rules.width, rules.height, rules.win_length)
+
+    @staticmethod
+    def new_ai(rules):
+        return tttengine.TictactoeAI(rules)
+
+    @staticmethod
+    def read_text(file_name, rules):
+        with open(file_name) as file:
+            return rules.canonical_dict(tttstore.parse_text(file.read()))
+
+    @staticmethod
+    def write_text(file_name, ai_dict, rules):
+        with open(file_name, "w") as file:
+            file.write(tttstore.format_text(ai_dict, rules.size))
+
+    @staticmethod
+    def write_binary(file_name, ai_dict, rules):
+        tttstore.write_store(file_name, ai_dict, tttstore.FLAG_CANONICAL, rules.width, rules.height, rules.win_length)
+
+    @staticmethod
+    def random_key(rng, rules):
+        """
+        随机局势的规范编码，可能没有空格
+        """
+        player_bits = rng.getrandbits(rules.size)
+        computer_bits = rng.getrandbits(rules.size) & ~player_bits
+        return rules.canonical_board(player_bits, computer_bits)[0]
+
+    @staticmethod
+    def random_solutions(rng, rules, key):
+        player_bits, computer_bits = rules.board_bits(key)
+        empty = [i + 1 for i in range(rules.size) if not (player_bits | computer_bits) >> i & 1]
+        if len(empty) == 0:
+            return None
+        return [str(step) for step in sorted(rng.sample(empty, min(len(empty), rng.randint(1, 3))))]
+
+    @staticmethod
+    def play(controller, rng, timings):
+        """
+        玩家随机走棋下完一局，记录每次调用的纳秒数
+        """
+        rules = controller.rules
+        controller.init_board()
+        while True:
+            player_bits, computer_bits = controller.bitboards
+            empty = [i + 1 for i in range(rules.size) if not (player_bits | computer_bits) >> i & 1]
+            step = rng.choice(empty)
+            start = time.perf_counter_ns()
+            controller.player_step(step)
+            timings["player_step"].append(time.perf_counter_ns() - start)
+            start = time.perf_counter_ns()
+            result = controller.check_result()
+            timings["check_result"].append(time.perf_counter_ns() - start)
+            if result != 0:
+                return result
+            start = time.perf_counter_ns()
+            controller.computer_step()
+            timings["computer_step"].append(time.perf_counter_ns() - start)
+            start = time.perf_counter_ns()
+            result = controller.check_result()
+            timings["check_result"].append(time.perf_counter_ns() - start)
+            if result != 0:
+                return result
+
+    @staticmethod
+    def new_controller(file_name, ai):
+        return tttengine.TictactoeController(file_name, ai=ai)
+
+
+class HexapawnBench:
+    """
+    六兵棋的测试对象
+    """
+    name = "hexapawn"
+    shipped_file = os.path.join(benchutil.HEXAPAWN_DIR, "hp_ai_file.txt")
+    standard_rules = hpengine.STANDARD_RULES
+    synthetic_rules = hpengine.HexapawnRules(5, 5)
+
+    @staticmethod
+    def board_name(rules):
+        return "%dx%d" % (rules.width, rules.height)
+
+    @staticmethod
+    def new_ai(rules):
+        return hpengine.HexapawnAI(rules)
+
+    @staticmethod
+    def read_text(file_name, rules):
+        with open(file_name) as file:
+            return rules.canonical_dict(hpstore.parse_text(file.read()))
+
+    @staticmethod
+    def write_text(file_name, ai_dict, rules):
+        with open(file_name, "w") as file:
+            file.write(hpstore.format_text(ai_dict))
+
+    @staticmethod
+    def write_binary(file_name, ai_dict, rules):
+        hpstore.write_store(file_name, ai_dict, hpstore.FLAG_CANONICAL, rules.width, rules.height)
+
+    @staticmethod
+    def random_key(rng, rules):
+        """
+        随机局势的规范编码字串，双方都未走到末线
+        """
+        player_bits = rng.getrandbits(rules.size) & ~rules.top_row
+        computer_bits = rng.getrandbits(rules.size) & ~player_bits & ~rules.bottom_row
+        return rules.canonical_board(rules.board_key(player_bits, computer_bits))[0]
+
+    @staticmethod
+    def random_solutions(rng, rules, key):
+        moves = rules.legal_moves(*rules.board_bits(key), 2)
+        if len(moves) == 0:
+            return None
+        return ["%d-%d" % move for move in sorted(rng.sample(moves, min(len(moves), rng.randint(1, 3))))]
+
+    @staticmethod
+    def play(controller, rng, timings):
+        """
+        玩家随机走棋下完一局，记录每次调用的纳秒数
+        """
+        rules = controller.rules
+        controller.init_board()
+        while True:
+            move = rng.choice(rules.legal_moves(*controller.bitboards, 1))
+            start = time.perf_counter_ns()
+            controller.player_step(*move)
+            timings["player_step"].append(time.perf_counter_ns() - start)
+            start = time.perf_counter_ns()
+            result = controller.check_result(1)
+            timings["check_result"].append(time.perf_counter_ns() - start)
+            if result != 0:
+                return result
+            start = time.perf_counter_ns()
+            controller.computer_step()
+            timings["computer_step"].append(time.perf_counter_ns() - start)
+            start = time.perf_counter_ns()
+            result = controller.check_result(2)
+            timings["check_result"].append(time.perf_counter_ns() - start)
+            if result != 0:
+                return result
+
+    @staticmethod
+    def new_controller(file_name, ai):
+        return hpengine.HexapawnController(file_name, ai=ai)
+
+
+BENCHES = (TictactoeBench, HexapawnBench)
+
+
+def synthetic_dict(bench, count, seed):
+    """
+    在合成棋盘上随机生成count条规范局势
+    """
+    rng = random.Random(seed)
+    rules = bench.synthetic_rules
+    ai_dict = dict()
+    while len(ai_dict) < count:
+        key = bench.random_key(rng, rules)
+        if key in ai_dict:
+            continue
+        solutions = bench.random_solutions(rng, rules, key)
+        if solutions is not None:
+            ai_dict[key] = solutions
+    return ai_dict
+
+
+def prepare_stores(bench, size, seed, cache_dir):
+    """
+    准备文本和二进制两种格式的AI库文件，合成AI库写入缓存目录
+    :return: (棋盘规则, AI库字典, {格式: 文件名})
+    """
+    if size == "shipped":
+        rules = bench.standard_rules
+        ai_dict = bench.read_text(bench.shipped_file, rules)
+        prefix = os.path.join(cache_dir, "%s_shipped" % bench.name)
+    else:
+        rules = bench.synthetic_rules
+        prefix = os.path.join(cache_dir, "%s_%s_%s_%d" % (bench.name, bench.board_name(rules), size, seed))
+        ai_dict = None
+    files = {"text": prefix + ".txt", "binary": prefix + ".bin"}
+    if size == "shipped":
+        shutil.copyfile(bench.shipped_file, files["text"])
+        bench.write_binary(files["binary"], ai_dict, rules)
+    elif all(os.path.exists(file_name) for file_name in files.values()):
+        ai_dict = bench.read_text(files["text"], rules)
+    else:
+        ai_dict = synthetic_dict(bench, int(size), seed)
+        bench.write_text(files["text"], ai_dict, rules)
+        bench.write_binary(files["binary"], ai_dict, rules)
+    return rules, ai_dict, files
+
+
+def bench_store(bench, size, seed, repeat, cache_dir, work_dir):
+    """
+    读写和查询AI库
+    """
+    results = []
+    rules, ai_dict, files = prepare_stores(bench, size, seed, cache_dir)
+    rng = random.Random(seed)
+    keys = sorted(ai_dict)
+    hit_keys = [(rng.choice(keys),) for _ in range(LOOKUPS)]
+    miss_keys = []
+    while len(miss_keys) < LOOKUPS:
+        key = bench.random_key(rng, rules)
+        if key not in ai_dict:
+            miss_keys.append((key,))
+    fields = {"store": size, "board": bench.board_name(rules)}
+    for store_format in FORMATS:
+        file_name = files[store_format]
+        min_ns, median_ns = benchutil.time_once(lambda: bench.new_ai(rules).read_dict(file_name), repeat)
+        results.append(benchutil.result(bench.name, "read_dict", min_ns, median_ns, format=store_format, **fields))
+        ai = bench.new_ai(rules)
+        ai.read_dict(file_name)
+        for case, args_list in (("get_solution_hit", hit_keys), ("get_solution_miss", miss_keys)):
+            random.seed(seed)  # get_solution用random模块随机选走法
+            min_ns, median_ns = benchutil.time_each(ai.get_solution, args_list, repeat)
+            results.append(benchutil.result(bench.name, case, min_ns, median_ns, format=store_format, **fields))
+        output_file = os.path.join(work_dir, os.path.basename(file_name))
+        min_ns, median_ns = benchutil.time_once(lambda: ai.save_dict(output_file), repeat)
+        results.append(benchutil.result(bench.name, "save_dict", min_ns, median_ns, format=store_format, **fields))
+    return results
+
+
+def bench_controller(bench, seed, games, work_dir):
+    """
+    按随附AI库随机对局，统计控制器各方法每次调用的耗时
+    """
+    file_name = os.path.join(work_dir, os.path.basename(bench.shipped_file))
+    shutil.copyfile(bench.shipped_file, file_name)
+    controller = bench.new_controller(file_name, bench.new_ai(bench.standard_rules))
+    controller.init_ai()
+    timings = {"player_step": [], "computer_step": [], "check_result": []}
+    rng = random.Random(seed)
+    random.seed(seed)
+    for _ in range(games):
+        bench.play(controller, rng, timings)
+    return [benchutil.result(bench.name, case, min(samples), statistics.median(samples), store="shipped",
+                             calls=len(samples))
+            for case, samples in sorted(timings.items())]
+
+
+def run(sizes, seed, repeat, games, cache_dir):
+    """
+    运行全部测试
+    :return: 测试结果列表
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for bench in BENCHES:
+            for size in sizes:
+                results.extend(bench_store(bench, size, seed, repeat, cache_dir, work_dir))
+            results.extend(bench_controller(bench, seed, games, work_dir))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="引擎热点性能测试")
+    parser.add_argument("--sizes", nargs="+", default=None, help="AI库大小：shipped或局势条数，默认" + " ".join(SIZES))
+    parser.add_argument("--quick", action="store_true", help="只测" + " ".join(QUICK_SIZES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复轮数，取最短和中位")
+    parser.add_argument("--games", type=int, default=GAMES, help="对局测试的局数")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="合成AI库的缓存目录")
+    parser.add_argument("--output", default=None, help="JSON结果文件，-表示标准输出")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="比较两个结果文件，不运行测试")
+    args = parser.parse_args()
+    if args.compare:
+        benchutil.print_comparison(benchutil.compare(*args.compare))
+    else:
+        run_sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+        run_results = run(run_sizes, args.seed, args.repeat, args.games, args.cache_dir)
+        if args.output is None:
+            benchutil.print_results(run_results)
+        else:
+            benchutil.write_results(args.output, benchutil.environment(
+                script="bench_engines", sizes=list(run_sizes), seed=args.seed, repeat=args.repeat, games=args.games),
+                run_results)
@@ -0,0 +1,282 @@
+"""
+棋盘绘制性能测试 Board painting benchmarks
+
+不需要显示器（默认使用Qt的offscreen平台），比较两种画法在随机对局中每一步的耗时：
+    legacy   旧的画法：每格一个QGraphicsView，每步为每格新建场景，从资源读取图片并缩放，重建画笔和画刷
+    cached   当前的画法：一个棋盘部件在paintEvent中画全部格子，缩放后的图片按(图片, 尺寸)放在QPixmapCache，
+             只重画有变化的格
+paint_*的variant为update时只计paint_cells，为render时再加上把棋盘画到图片上（grab）的耗时；
+create_*为新建棋盘、画出开局并显示一次的耗时，widgets为棋盘所用的窗口部件数。
+井字棋测3×3、7×7和15×15棋盘，六兵棋测标准3×3棋盘；cells为cached每步平均重画的格数。
+所有随机数都由--seed决定，种子相同的两次运行测的是完全相同的局势序列。
+
+    python benchmarks/bench_paint.py --output before.json
+    python benchmarks/bench_paint.py --output after.json
+    python benchmarks/bench_paint.py --compare before.json after.json
+"""
+import argparse
+import importlib
+import os
+import random
+import sys
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import benchutil
+import hpengine
+import hpresources
+import hpsearch
+import tttengine
+import tttresources
+import tttsearch
+
+from PyQt6.QtWidgets import QApplication, QFrame, QGraphicsScene, QGraphicsView, QWidget
+from PyQt6 import QtGui, QtCore
+
+TICTACTOE_BOARDS = ((3, 3, 3), (7, 7, 4), (15, 15, 5))  # (宽, 高, 连成一线的子数)
+GAMES = 20  # 每种棋盘的随机对局数
+VARIANTS = ("update", "render")
+
+
+def import_widget(game_dir, module_name):
+    """
+    导入游戏窗口模块：两个游戏都有ui_form模块，导入前先把本游戏目录放到搜索路径最前
+    """
+    sys.path.remove(game_dir)
+    sys.path.insert(0, game_dir)
+    sys.modules.pop("ui_form", None)
+    return importlib.import_module(module_name)
+
+
+def legacy_board(board, cell_count):
+    """
+    旧的棋盘：与board同样大小的窗口，每格一个QGraphicsView，位置与board的格子相同
+    :return: (窗口, 各格视图)
+    """
+    container = QWidget()
+    container.resize(board.size())
+    cells = []
+    for cell_num in range(cell_count):
+        cell = QGraphicsView(container)
+        cell.setGeometry(board.cell_rect(cell_num))
+        cell.setFrameShape(QFrame.Shape.NoFrame)
+        cell.setFrameShadow(QFrame.Shadow.Plain)
+        cell.setLineWidth(0)
+        cell.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        cell.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        cells.append(cell)
+    return container, cells
+
+
+def legacy_paint_ttt(cells, board_data):
+    """
+    旧的井字棋paint_cells
+    """
+    for cell_num in range(len(cells)):
+        scene = QGraphicsScene()
+        if board_data[cell_num] == 0:
+            pixmap = QtGui.QPixmap(":/ttt/images/blank.gif")
+            pixmap = pixmap.scaled(cells[cell_num].width(), cells[cell_num].height())
+            scene.addPixmap(pixmap)
+        if board_data[cell_num] == 1:
+            pixmap = QtGui.QPixmap(":/ttt/images/cross.gif")
+            pixmap = pixmap.scaled(cells[cell_num].width(), cells[cell_num].height())
+            scene.addPixmap(pixmap)
+        if board_data[cell_num] == 2:
+            pixmap = QtGui.QPixmap(":/ttt/images/not.gif")
+            pixmap = pixmap.scaled(cells[cell_num].width(), cells[cell_num].height())
+            scene.addPixmap(pixmap)
+        cells[cell_num].setScene(scene)
+
+
+def legacy_paint_hp(cells, board_data, player_select=-1):
+    """
+    旧的六兵棋paint_cells
+    """
+    for cell_num in range(len(cells)):
+        scene = QGraphicsScene()
+        pen = QtGui.QPen()
+        brush = QtGui.QBrush()
+        pen.setStyle(QtCore.Qt.PenStyle.SolidLine)
+        pen.setWidth(1)
+        if cell_num % 2 == 0:
+            pen.setColor(QtCore.Qt.GlobalColor.white)
+            brush.setStyle(QtCore.Qt.BrushStyle.SolidPattern)
+            brush.setColor(QtCore.Qt.GlobalColor.white)
+        else:
+            pen.setColor(QtCore.Qt.GlobalColor.lightGray)
+            brush.setStyle(QtCore.Qt.BrushStyle.SolidPattern)
+            brush.setColor(QtCore.Qt.GlobalColor.lightGray)
+        if cell_num == player_select:
+            pen.setColor(QtCore.Qt.GlobalColor.red)
+        scene.addRect(0, 0, cells[cell_num].width() - 1, cells[cell_num].height() - 1, pen, brush)
+        if board_data[cell_num] == 0:
+            pixmap = QtGui.QPixmap(":/hp/images/blank.png")
+            pixmap = pixmap.scaled(cells[cell_num].width(), cells[cell_num].height())
+            scene.addPixmap(pixmap)
+        if board_data[cell_num] == 1:
+            pixmap = QtGui.QPixmap(":/hp/images/black.png")
+            pixmap = pixmap.scaled(cells[cell_num].width(), cells[cell_num].height())
+            scene.addPixmap(pixmap)
+        if board_data[cell_num] == 2:
+            pixmap = QtGui.QPixmap(":/hp/images/white.png")
+            pixmap = pixmap.scaled(cells[cell_num].width(), cells[cell_num].height())
+            scene.addPixmap(pixmap)
+        cells[cell_num].setScene(scene)
+
+
+def board_data(rules, player_bits, computer_bits):
+    return [(player_bits >> i & 1) | (computer_bits >> i & 1) << 1 for i in range(rules.size)]
+
+
+def tictactoe_frames(rules, rng, games):
+    """
+    随机对局中每一步后的各格数字列表，每局从空棋盘开始
+    """
+    frames = []
+    for _ in range(games):
+        bits = [0, 0]
+        side = 0
+        empties = list(range(rules.size))
+        rng.shuffle(empties)
+        frames.append(board_data(rules, 0, 0))
+        while empties:
+            step = empties.pop()
+            bits[side] |= 1 << step
+            frames.append(board_data(rules, *bits))
+            if rules.is_win(bits[side], step + 1):
+                break
+            side ^= 1
+    return frames
+
+
+def hexapawn_frames(rules, rng, games):
+    """
+    随机对局中每一步后的各格数字列表，每局从开局开始
+    """
+    frames = []
+    for _ in range(games):
+        player_bits, computer_bits = rules.init_bits
+        side = 1
+        frames.append(board_data(rules, player_bits, computer_bits))
+        while rules.has_moves(player_bits, computer_bits, side):
+            start, end = rng.choice(rules.legal_moves(player_bits, computer_bits, side))
+            start_bit, end_bit = 1 << (start - 1), 1 << (end - 1)
+            if side == 1:
+                player_bits, computer_bits = player_bits ^ (start_bit | end_bit), computer_bits & ~end_bit
+            else:
+                player_bits, computer_bits = player_bits & ~end_bit, computer_bits ^ (start_bit | end_bit)
+            frames.append(board_data(rules, player_bits, computer_bits))
+            if player_bits & rules.top_row or computer_bits & rules.bottom_row:
+                break
+            side = 3 - side
+    return frames
+
+
+def bench_painter(paint, widget, frames, variant, repeat):
+    """
+    :return: (每步的最短平均纳秒, 每步的中位平均纳秒)
+    """
+    if variant == "render":
+        def step(frame):
+            paint(frame)
+            widget.grab()
+    else:
+        step = paint
+    return benchutil.time_each(step, [(frame,) for frame in frames], repeat)
+
+
+def widget_count(widget):
+    return 1 + len(widget.findChildren(QWidget))
+
+
+def bench_game(game, board_name, widget, board, columns, rows, legacy_paint, frames, repeat):
+    """
+    同一局势序列分别用旧画法和当前画法绘制
+    :param widget: 游戏窗口，paint_cells使用当前画法
+    :param board: 游戏窗口中的棋盘部件
+    """
+    results = []
+    widget.show()
+    legacy_container, legacy_cells = legacy_board(board, len(frames[0]))
+    legacy_container.show()
+    painted = [widget.paint_cells(frame) for frame in frames]
+    for variant in VARIANTS:
+        min_ns, median_ns = bench_painter(lambda frame: legacy_paint(legacy_cells, frame), legacy_container,
+                                          frames, variant, repeat)
+        results.append(benchutil.result(game, "paint_legacy", min_ns, median_ns, board=board_name, variant=variant,
+                                        frames=len(frames), cells=len(legacy_cells)))
+        min_ns, median_ns = bench_painter(widget.paint_cells, board, frames, variant, repeat)
+        results.append(benchutil.result(game, "paint_cached", min_ns, median_ns, board=board_name, variant=variant,
+                                        frames=len(frames), cells=round(sum(painted) / len(painted), 2)))
+    legacy_widgets = widget_count(legacy_container)
+
+    def create_legacy():
+        container, cells = legacy_board(board, len(frames[0]))
+        legacy_paint(cells, frames[0])
+        container.show()
+        container.grab()
+        container.close()
+
+    def create_board():
+        new_board = type(board)()
+        new_board.set_board_size(columns, rows)
+        new_board.resize(board.size())
+        new_board.set_cells(frames[0])
+        new_board.show()
+        new_board.grab()
+        new_board.close()
+
+    min_ns, median_ns = benchutil.time_once(create_legacy, repeat)
+    results.append(benchutil.result(game, "create_legacy", min_ns, median_ns, board=board_name,
+                                    widgets=legacy_widgets))
+    min_ns, median_ns = benchutil.time_once(create_board, repeat)
+    results.append(benchutil.result(game, "create_cached", min_ns, median_ns, board=board_name,
+                                    widgets=widget_count(board)))
+    legacy_container.close()
+    widget.close()
+    return results
+
+
+def run(seed, repeat, games):
+    """
+    运行全部测试
+    :return: 测试结果列表
+    """
+    qtttwidget = import_widget(benchutil.TICTACTOE_DIR, "qtttwidget")
+    qhpwidget = import_widget(benchutil.HEXAPAWN_DIR, "qhpwidget")
+    tttresources.register_resources()  # 旧画法直接从资源读取图片
+    hpresources.register_resources()
+    results = []
+    for width, height, win_length in TICTACTOE_BOARDS:
+        rules = tttengine.TictactoeRules(width, height, win_length)
+        widget = qtttwidget.QTttWidget(rules=rules, ai=tttsearch.TictactoeSearchAI(rules))
+        results.extend(bench_game("tictactoe", "%dx%dk%d" % (width, height, win_length), widget, widget.ui.tttboard,
+                                  width, height, legacy_paint_ttt, tictactoe_frames(rules, random.Random(seed), games),
+                                  repeat))
+    rules = hpengine.STANDARD_RULES
+    widget = qhpwidget.QHpWidget(ai=hpsearch.HexapawnSearchAI())
+    results.extend(bench_game("hexapawn", "%dx%d" % (rules.width, rules.height), widget, widget.ui.hpboard,
+                              rules.width, rules.height, legacy_paint_hp,
+                              hexapawn_frames(rules, random.Random(seed), games), repeat))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="棋盘绘制性能测试")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复轮数，取最短和中位")
+    parser.add_argument("--games", type=int, default=GAMES, help="每种棋盘的随机对局数")
+    parser.add_argument("--output", default=None, help="JSON结果文件，-表示标准输出")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="比较两个结果文件，不运行测试")
+    args, qt_args = parser.parse_known_args()
+    if args.compare:
+        benchutil.print_comparison(benchutil.compare(*args.compare))
+    else:
+        app = QApplication(sys.argv[:1] + qt_args)
+        run_results = run(args.seed, args.repeat, args.games)
+        if args.output is None:
+            benchutil.print_results(run_results)
+        else:
+            benchutil.write_results(args.output, benchutil.environment(
+                script="bench_paint", seed=args.seed, repeat=args.repeat, games=args.games), run_results)
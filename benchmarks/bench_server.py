@@ -0,0 +1,189 @@
+"""
+对局服务器压力测试 Game server load test
+
+为每个游戏和并发数启动一个新的tttserver / hpserver子进程（Unix套接字，AI文件为随附AI文件的临时副本），
+clients个并发客户端各自随机走棋下完--games局，测量每次move请求从发出到收到应答的延迟：
+    move    min_ns为最短延迟，median_ns即p50，另给出p99_ns、走棋次数moves和每秒走棋数moves_per_second
+客户端都在本进程的asyncio事件循环中运行，并发数高时测到的延迟也包含客户端自身的排队。
+所有随机数都由--seed决定。也可用--connect测已经在运行的服务器（Unix套接字路径或主机:端口）。
+
+    python benchmarks/bench_server.py --output before.json
+    python benchmarks/bench_server.py --compare before.json after.json
+    python benchmarks/bench_server.py --game tictactoe --connect /tmp/ttt.sock
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import benchutil
+import hpengine
+
+CLIENTS = (1, 16, 64)  # 并发客户端数
+GAMES = 50  # 每个客户端的对局数
+START_TIMEOUT = 30.0  # 等待服务器开始监听的秒数
+
+
+def tictactoe_move(rng, board):
+    """
+    随机选一个空格
+    """
+    return {"op": "move", "pos": rng.choice([index + 1 for index, value in enumerate(board) if value == 0])}
+
+
+def hexapawn_move(rng, board):
+    """
+    随机选一步合法走法，服务器使用标准3×3棋盘
+    """
+    player_bits = sum(1 << index for index, value in enumerate(board) if value == 1)
+    computer_bits = sum(1 << index for index, value in enumerate(board) if value == 2)
+    start, end = rng.choice(hpengine.STANDARD_RULES.legal_moves(player_bits, computer_bits, 1))
+    return {"op": "move", "start": start, "end": end}
+
+
+GAMES_INFO = {
+    "tictactoe": (benchutil.TICTACTOE_DIR, "tttserver.py", "ttt_ai_file.txt", tictactoe_move),
+    "hexapawn": (benchutil.HEXAPAWN_DIR, "hpserver.py", "hp_ai_file.txt", hexapawn_move)
+}
+
+
+def percentile(values, fraction):
+    """
+    :param values: 已排序的列表
+    """
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def open_connection(address):
+    """
+    :param address: Unix套接字路径或"主机:端口"
+    """
+    if os.path.exists(address) or ":" not in address:
+        return await asyncio.open_unix_connection(address)
+    host, port = address.rsplit(":", 1)
+    return await asyncio.open_connection(host, int(port))
+
+
+async def play_client(address, games, rng, make_move, latencies):
+    """
+    一个客户端：下完games局，每次move请求的延迟追加到latencies
+    """
+    reader, writer = await open_connection(address)
+
+    async def call(request):
+        writer.write(json.dumps(request).encode("utf-8") + b"\n")
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        if not response["ok"]:
+            raise RuntimeError("服务器拒绝了请求%s：%s" % (request, response["error"]))
+        return response
+
+    for _ in range(games):
+        response = await call({"op": "new"})
+        while response.get("result", 0) == 0:
+            request = make_move(rng, response["board"])
+            start = time.perf_counter_ns()
+            response = await call(request)
+            latencies.append(time.perf_counter_ns() - start)
+    await call({"op": "bye"})
+    writer.close()
+
+
+async def load(address, clients, games, seed, make_move):
+    """
+    并发运行clients个客户端
+    :return: (排序后的move延迟列表, 总秒数)
+    """
+    seeds = random.Random(seed)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*[play_client(address, games, random.Random(seeds.getrandbits(64)), make_move, latencies)
+                           for _ in range(clients)])
+    return sorted(latencies), time.perf_counter() - start
+
+
+def measure(game, address, clients, games, seed):
+    """
+    :return: 一条测试结果
+    """
+    latencies, elapsed = asyncio.run(load(address, clients, games, seed, GAMES_INFO[game][3]))
+    return benchutil.result(game, "move", latencies[0], percentile(latencies, 0.5), clients=clients,
+                            p99_ns=percentile(latencies, 0.99), moves=len(latencies),
+                            moves_per_second=round(len(latencies) / elapsed, 1))
+
+
+def start_server(game, work_dir, clients):
+    """
+    启动服务器子进程，AI文件用随附AI文件的副本，等到开始监听
+    :return: (子进程, 套接字路径)
+    """
+    game_dir, script, ai_file_name, _ = GAMES_INFO[game]
+    ai_file = os.path.join(work_dir, ai_file_name)
+    shutil.copyfile(os.path.join(game_dir, ai_file_name), ai_file)
+    path = os.path.join(work_dir, game + ".sock")
+    process = subprocess.Popen([sys.executable, os.path.join(game_dir, script), "--unix", path, "--ai-file", ai_file,
+                                "--max-sessions", str(max(clients, 1))], cwd=work_dir)
+    deadline = time.perf_counter() + START_TIMEOUT
+    while not os.path.exists(path):
+        if process.poll() is not None or time.perf_counter() > deadline:
+            process.kill()
+            raise RuntimeError("服务器未能启动：" + script)
+        time.sleep(0.01)
+    return process, path
+
+
+def stop_server(process):
+    process.send_signal(signal.SIGINT)
+    process.wait(timeout=START_TIMEOUT)
+
+
+def run(seed, games, client_counts):
+    """
+    运行全部测试
+    :return: 测试结果列表
+    """
+    results = []
+    for game in GAMES_INFO:
+        for clients in client_counts:
+            with tempfile.TemporaryDirectory() as work_dir:
+                process, path = start_server(game, work_dir, clients)
+                try:
+                    results.append(measure(game, path, clients, games, seed))
+                finally:
+                    stop_server(process)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="对局服务器压力测试")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--games", type=int, default=GAMES, help="每个客户端的对局数")
+    parser.add_argument("--clients", type=int, nargs="+", default=list(CLIENTS), help="并发客户端数，可给多个")
+    parser.add_argument("--game", choices=GAMES_INFO, default=None, help="只测一个游戏，与--connect一起使用")
+    parser.add_argument("--connect", default=None, help="测已在运行的服务器：Unix套接字路径或主机:端口")
+    parser.add_argument("--output", default=None, help="JSON结果文件，-表示标准输出")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="比较两个结果文件，不运行测试")
+    args = parser.parse_args()
+    if args.compare:
+        benchutil.print_comparison(benchutil.compare(*args.compare))
+    else:
+        if args.connect is not None:
+            if args.game is None:
+                parser.error("--connect须与--game一起使用")
+            run_results = [measure(args.game, args.connect, clients, args.games, args.seed) for clients in args.clients]
+        else:
+            run_results = run(args.seed, args.games, args.clients)
+        if args.output is None:
+            for item in run_results:
+                print("%-24s clients %-4d p50 %10d ns  p99 %10d ns  %10.1f moves/s" % (
+                    item["game"], item["clients"], item["median_ns"], item["p99_ns"], item["moves_per_second"]))
+        else:
+            benchutil.write_results(args.output, benchutil.environment(
+                script="bench_server", seed=args.seed, games=args.games), run_results)
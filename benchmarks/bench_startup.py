@@ -0,0 +1,158 @@
+"""
+启动性能测试 Startup benchmarks
+
+每次测量在新的Python进程中进行（默认使用Qt的offscreen平台），比较图片资源的两种注册方式：
+    module   导入rc_tttres / rc_hpres（图片数据为Python字节串）
+    rcc      用QResource.registerResource注册二进制资源文件tttres.rcc / hpres.rcc
+variant为warm时使用已有的.pyc，为cold时每个进程都用空的字节码缓存目录，rc模块须重新编译。
+测试项（每项取多个进程的最短和中位）：
+    register        注册图片资源，rss_delta为注册前后常驻内存之差（字节）
+    import_widget   导入窗口模块（不含资源）
+    first_paint     新建窗口并显示，画出第一帧
+    process         从启动子进程到画出第一帧，max_rss为子进程常驻内存峰值（字节）
+
+    python benchmarks/bench_startup.py --output before.json
+    python benchmarks/bench_startup.py --compare before.json after.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import benchutil
+
+GAMES = {
+    "tictactoe": (benchutil.TICTACTOE_DIR, "qtttwidget", "tttresources"),
+    "hexapawn": (benchutil.HEXAPAWN_DIR, "qhpwidget", "hpresources")
+}
+MODES = ("module", "rcc")
+VARIANTS = ("warm", "cold")
+PHASES = ("register", "import_widget", "first_paint")
+
+
+def current_rss():
+    """
+    :return: 当前常驻内存字节数，不支持时为None
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def max_rss():
+    """
+    :return: 常驻内存峰值字节数，不支持时为None
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+def child(game, mode):
+    """
+    子进程：依次导入Qt、导入窗口模块、注册资源、新建窗口画出第一帧，把各阶段耗时以JSON写到标准输出
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    game_dir, widget_module, resource_module = GAMES[game]
+    sys.path.insert(0, game_dir)
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication(sys.argv[:1])
+    timings = dict()
+    start = time.perf_counter_ns()
+    widget_module = __import__(widget_module)
+    timings["import_widget"] = time.perf_counter_ns() - start
+    resources = __import__(resource_module)
+    resources.set_mode(mode)
+    rss_before = current_rss()
+    start = time.perf_counter_ns()
+    resources.register_resources()
+    timings["register"] = time.perf_counter_ns() - start
+    rss_after = current_rss()
+    start = time.perf_counter_ns()
+    if game == "tictactoe":
+        import tttsearch
+        widget = widget_module.QTttWidget(ai=tttsearch.TictactoeSearchAI())
+    else:
+        import hpsearch
+        widget = widget_module.QHpWidget(ai=hpsearch.HexapawnSearchAI())
+    widget.show()
+    widget.grab()
+    timings["first_paint"] = time.perf_counter_ns() - start
+    json.dump({
+        "timings": timings,
+        "rss_delta": None if rss_before is None else rss_after - rss_before,
+        "max_rss": max_rss()
+    }, sys.stdout)
+    widget.close()
+    app.quit()
+
+
+def run_child(game, mode, variant):
+    """
+    在新进程中测一次
+    :return: (从启动到退出的纳秒, 子进程的测量结果)
+    """
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        if variant == "cold":
+            env["PYTHONPYCACHEPREFIX"] = cache_dir  # 空的字节码缓存目录，导入的模块都要重新编译
+        start = time.perf_counter_ns()
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", game, mode],
+                                env=env, check=True, capture_output=True, text=True).stdout
+        elapsed = time.perf_counter_ns() - start
+    return elapsed, json.loads(output)
+
+
+def run(repeat):
+    """
+    运行全部测试
+    :return: 测试结果列表
+    """
+    results = []
+    for game in GAMES:
+        for mode in MODES:
+            run_child(game, mode, "warm")  # 先生成.pyc
+            for variant in VARIANTS:
+                samples = [run_child(game, mode, variant) for _ in range(repeat)]
+                for phase in PHASES:
+                    values = [sample["timings"][phase] for _, sample in samples]
+                    fields = dict(mode=mode, variant=variant)
+                    if phase == "register" and samples[0][1]["rss_delta"] is not None:
+                        fields["rss_delta"] = int(statistics.median(sample["rss_delta"] for _, sample in samples))
+                    results.append(benchutil.result(game, phase, min(values), statistics.median(values), **fields))
+                values = [elapsed for elapsed, _ in samples]
+                fields = dict(mode=mode, variant=variant)
+                if samples[0][1]["max_rss"] is not None:
+                    fields["max_rss"] = int(statistics.median(sample["max_rss"] for _, sample in samples))
+                results.append(benchutil.result(game, "process", min(values), statistics.median(values), **fields))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="启动性能测试")
+    parser.add_argument("--repeat", type=int, default=5, help="每项启动的进程数，取最短和中位")
+    parser.add_argument("--output", default=None, help="JSON结果文件，-表示标准输出")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="比较两个结果文件，不运行测试")
+    parser.add_argument("--child", nargs=2, metavar=("GAME", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+    elif args.compare:
+        benchutil.print_comparison(benchutil.compare(*args.compare))
+    else:
+        run_results = run(args.repeat)
+        if args.output is None:
+            benchutil.print_results(run_results)
+        else:
+            benchutil.write_results(args.output, benchutil.environment(script="bench_startup", repeat=args.repeat),
+                                    run_results)
@@ -0,0 +1,128 @@
+"""
+性能测试公用工具 Benchmark helpers
+
+各性能测试脚本共用：把两个游戏目录加入模块搜索路径、计时、写JSON结果、比较两次结果。
+结果文件为JSON，meta记录运行环境和参数，results为按固定顺序排列的测试项列表，
+每项以(game, case, 其他标识字段)区分，计时字段以_ns结尾（纳秒），不同运行的结果可直接diff或用compare比较。
+"""
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TICTACTOE_DIR = os.path.join(ROOT_DIR, "TicTacToe")
+HEXAPAWN_DIR = os.path.join(ROOT_DIR, "Hexapawn")
+IDENTITY_FIELDS = ("game", "case", "store", "format", "board", "mode", "variant", "clients")  # 区分测试项的字段
+
+for _game_dir in (TICTACTOE_DIR, HEXAPAWN_DIR):
+    if _game_dir not in sys.path:
+        sys.path.insert(0, _game_dir)
+
+
+def time_each(func, args_list, repeat=3):
+    """
+    对参数列表逐个调用func，重复repeat轮
+    :return: (每次调用的最短平均纳秒, 每次调用的中位平均纳秒)
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for args in args_list:
+            func(*args)
+        samples.append((time.perf_counter_ns() - start) / max(1, len(args_list)))
+    return min(samples), statistics.median(samples)
+
+
+def time_once(func, repeat=3, setup=None):
+    """
+    调用func重复repeat次，每次调用前先调用setup（不计时）
+    :return: (最短纳秒, 中位纳秒)
+    """
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter_ns()
+        func()
+        samples.append(time.perf_counter_ns() - start)
+    return min(samples), statistics.median(samples)
+
+
+def result(game, case, min_ns, median_ns, **fields):
+    """
+    生成一条测试结果
+    """
+    item = {"game": game, "case": case, "min_ns": int(min_ns), "median_ns": int(median_ns)}
+    item.update(fields)
+    return item
+
+
+def environment(**params):
+    """
+    运行环境和参数，写入结果文件的meta
+    """
+    meta = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count()
+    }
+    meta.update(params)
+    return meta
+
+
+def write_results(file_name, meta, results):
+    """
+    写JSON结果文件，file_name为"-"时写到标准输出
+    """
+    text = json.dumps({"meta": meta, "results": results}, indent=2, sort_keys=True, ensure_ascii=False) + "\n"
+    if file_name == "-":
+        sys.stdout.write(text)
+    else:
+        with open(file_name, "w") as file:
+            file.write(text)
+
+
+def identity(item):
+    return tuple(item.get(field) for field in IDENTITY_FIELDS)
+
+
+def compare(old_file, new_file):
+    """
+    比较两次结果的中位耗时
+    :return: (测试项标识, 旧中位纳秒, 新中位纳秒, 新/旧) 列表，只含两次都有的测试项
+    """
+    with open(old_file) as file:
+        old_results = {identity(item): item for item in json.load(file)["results"]}
+    with open(new_file) as file:
+        new_results = json.load(file)["results"]
+    rows = []
+    for item in new_results:
+        old_item = old_results.get(identity(item))
+        if old_item is not None:
+            ratio = item["median_ns"] / old_item["median_ns"] if old_item["median_ns"] > 0 else float("inf")
+            rows.append((identity(item), old_item["median_ns"], item["median_ns"], ratio))
+    return rows
+
+
+def print_results(results):
+    """
+    按行打印测试结果
+    """
+    for item in results:
+        label = " ".join(str(value) for value in identity(item) if value is not None)
+        print("%-64s %14.0f ns (min %.0f)" % (label, item["median_ns"], item["min_ns"]))
+
+
+def print_comparison(rows, threshold=1.1):
+    """
+    打印比较结果，变慢超过threshold倍的测试项标出
+    """
+    for key, old_ns, new_ns, ratio in rows:
+        label = " ".join(str(value) for value in key if value is not None)
+        mark = "  <-- 变慢" if ratio > threshold else ""
+        print("%-64s %14.0f -> %14.0f ns  x%.2f%s" % (label, old_ns, new_ns, ratio, mark))